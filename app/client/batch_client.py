@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.client.response_formats import response_format as registered_format
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Limits of the Batch API input files.
+MAX_REQUESTS_PER_FILE = 50000
+MAX_BYTES_PER_FILE = 190 * 1024 * 1024
+
+
+class BatchRequest(BaseModel):
+    custom_id: str = Field(..., description="Identifier used to map the result back to its source")
+    body: Dict[str, Any] = Field(..., description="Chat completions request body")
+
+    def to_line(self) -> str:
+        return json.dumps({
+            "custom_id": self.custom_id,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": self.body,
+        }, ensure_ascii=False)
+
+
+class BatchOutcome(BaseModel):
+    results: Dict[str, Any] = Field(default_factory=dict, description="Decoded results by custom ID")
+    errors: Dict[str, str] = Field(default_factory=dict, description="Failure reason by custom ID")
+    batch_ids: List[str] = Field(default_factory=list, description="Submitted batch IDs, in order")
+
+
+def chat_request(custom_id: str, model: str, messages: list, response_format=None,
+                 temperature: float = 0) -> BatchRequest:
+    body = {
+        "model": model,
+        "messages": [dict(m) for m in messages],
+        "temperature": temperature,
+    }
+    if response_format is not None:
+        body["response_format"] = registered_format(response_format).param
+    return BatchRequest(custom_id=custom_id, body=body)
+
+
+def chat_content(body: Dict[str, Any]) -> str:
+    """
+    Extract the assistant message from a chat completion body, rejecting refusals and truncation.
+    """
+    choice = body["choices"][0]
+    message = choice["message"]
+    if message.get("refusal"):
+        raise ValueError(f"Model refused: {message['refusal']}")
+    if choice.get("finish_reason") == "length":
+        raise ValueError("Completion truncated by max tokens")
+    if message.get("content") is None:
+        raise ValueError("Completion has no content")
+    return message["content"]
+
+
+def write_batch_files(requests: Iterable[BatchRequest],
+                      directory: str,
+                      prefix: str = "batch",
+                      max_requests: int = MAX_REQUESTS_PER_FILE,
+                      max_bytes: int = MAX_BYTES_PER_FILE) -> List[str]:
+    """
+    Serialize requests into JSONL files that respect the per-file request and size limits.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    handle = None
+    count = size = 0
+
+    try:
+        for request in requests:
+            line = (request.to_line() + "\n").encode("utf-8")
+            if handle is None or count >= max_requests or size + len(line) > max_bytes:
+                if handle is not None:
+                    handle.close()
+                path = os.path.join(directory, f"{prefix}_{len(paths):04d}.jsonl")
+                handle = open(path, "wb")
+                paths.append(path)
+                count = size = 0
+            handle.write(line)
+            count += 1
+            size += len(line)
+    finally:
+        if handle is not None:
+            handle.close()
+    return paths
+
+
+class BatchRunner:
+    """
+    Submits JSONL files through the batch interface of an OpenAI client (or LocalBatchClient),
+    polls them to completion and resubmits only the requests that failed.
+    """
+
+    def __init__(self,
+                 client,
+                 workdir: str,
+                 poll_interval: float = 30,
+                 completion_window: str = "24h",
+                 max_attempts: int = 3,
+                 max_requests_per_file: int = MAX_REQUESTS_PER_FILE):
+        self.client = client
+        self.workdir = workdir
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.max_attempts = max_attempts
+        self.max_requests_per_file = max_requests_per_file
+
+    def submit_file(self, path: str) -> str:
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+            metadata={"source_file": os.path.basename(path)}
+        )
+        logger.info(f"Submitted batch {batch.id} from {path}")
+        return batch.id
+
+    def wait(self, batch_id: str):
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                logger.info(f"Batch {batch_id} finished with status {batch.status}")
+                return batch
+            time.sleep(self.poll_interval)
+
+    def _read_lines(self, file_id: Optional[str]) -> List[dict]:
+        if not file_id:
+            return []
+        text = self.client.files.content(file_id).text
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def collect(self, batch) -> BatchOutcome:
+        """
+        Split a finished batch into successful response bodies and per-request errors.
+        """
+        outcome = BatchOutcome(batch_ids=[batch.id])
+        for line in self._read_lines(batch.output_file_id) + self._read_lines(batch.error_file_id):
+            custom_id = line["custom_id"]
+            response = line.get("response") or {}
+            if line.get("error"):
+                outcome.errors[custom_id] = str(line["error"])
+            elif response.get("status_code") != 200:
+                outcome.errors[custom_id] = f"HTTP {response.get('status_code')}: {response.get('body')}"
+            else:
+                outcome.results[custom_id] = response["body"]
+        return outcome
+
+    def run(self,
+            requests: List[BatchRequest],
+            decode: Callable[[str, Dict[str, Any]], Any]) -> BatchOutcome:
+        """
+        Run all requests to completion. `decode` turns a response body into a result and raises
+        when the body is unusable; such requests are resubmitted like transport failures.
+        """
+        pending = {request.custom_id: request for request in requests}
+        outcome = BatchOutcome()
+
+        for attempt in range(1, self.max_attempts + 1):
+            if not pending:
+                break
+            logger.info(f"Batch attempt {attempt}: {len(pending)} requests")
+            paths = write_batch_files(pending.values(), self.workdir, prefix=f"attempt{attempt}",
+                                      max_requests=self.max_requests_per_file)
+            batch_ids = [self.submit_file(path) for path in paths]
+            outcome.batch_ids.extend(batch_ids)
+
+            errors: Dict[str, str] = {}
+            for batch_id in batch_ids:
+                batch = self.wait(batch_id)
+                partial = self.collect(batch)
+                errors.update(partial.errors)
+                for custom_id, body in partial.results.items():
+                    try:
+                        outcome.results[custom_id] = decode(custom_id, body)
+                    except Exception as e:
+                        errors[custom_id] = f"Invalid response: {e}"
+
+            for custom_id in pending:
+                if custom_id not in outcome.results and custom_id not in errors:
+                    errors[custom_id] = "Missing from batch output"
+
+            pending = {custom_id: pending[custom_id] for custom_id in errors if custom_id in pending}
+            outcome.errors = errors
+
+        return outcome
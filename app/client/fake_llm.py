@@ -0,0 +1,211 @@
+"""
+Latency-simulating stand-in for the OpenAI SDK, for load tests and offline runs.
+
+FakeTextProcessor is a real OpenAITextProcessor with its SDK clients swapped out, so
+routing, coalescing, deadlines and the scheduler behave as in production; only the network
+call is simulated. Inject it with `provider.configure(llm_client=FakeTextProcessor())`.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.client.llm_client import OpenAITextProcessor
+from app.client.model_router import ModelRouter
+from app.models.processing_models import TranslateFieldsResponse
+
+WORDS = (
+    "learning", "model", "data", "student", "course", "lesson", "example", "skill", "objective",
+    "practice", "network", "function", "value", "system", "process", "result", "question", "answer",
+    "concept", "method", "analysis", "design", "feature", "training", "problem", "solution",
+)
+
+EMBEDDING_DIMENSION = 1536
+
+
+class LatencyModel(BaseModel):
+    base: float = Field(0.8, description="Seconds per chat completion before any prompt cost")
+    per_1k_prompt_chars: float = Field(0.05, description="Extra seconds per 1000 prompt characters")
+    per_1k_completion_chars: float = Field(0.0, description="Extra seconds per 1000 generated characters")
+    embedding_base: float = Field(0.08, description="Seconds per embedding request")
+    jitter: float = Field(0.3, description="Sigma of the log-normal latency multiplier")
+    error_rate: float = Field(0.0, description="Share of calls that fail with a simulated error")
+    list_items: Tuple[int, int] = Field((2, 5), description="Range of generated list lengths")
+    text_words: Tuple[int, int] = Field((4, 18), description="Range of words in generated strings")
+
+
+def fake_from_schema(schema: Dict[str, Any], rng: random.Random, latency: LatencyModel,
+                     defs: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Build a random value of realistic size that satisfies a JSON schema.
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_from_schema(defs[schema["$ref"].split("/")[-1]], rng, latency, defs)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if "const" in schema:
+        return schema["const"]
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"] or schema["anyOf"]
+        return fake_from_schema(options[0], rng, latency, defs)
+
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return {name: fake_from_schema(prop, rng, latency, defs)
+                for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return [fake_from_schema(schema.get("items", {}), rng, latency, defs)
+                for _ in range(rng.randint(*latency.list_items))]
+    if schema_type == "boolean":
+        return rng.random() < 0.5
+    if schema_type in ("integer", "number"):
+        return rng.randint(1, 6)
+    return " ".join(rng.choices(WORDS, k=rng.randint(*latency.text_words)))
+
+
+def _sleep(seconds: float, timeout: Optional[float]) -> None:
+    if timeout is not None and seconds > timeout:
+        time.sleep(timeout)
+        raise TimeoutError("Simulated call timed out")
+    time.sleep(seconds)
+
+
+def _answer_from_options(value: Any, rng: random.Random) -> None:
+    """
+    Make generated questions consistent: the correct answer is one of the options.
+    """
+    if isinstance(value, dict):
+        if value.get("options") and "correct_answer" in value:
+            value["correct_answer"] = rng.choice(value["options"])
+        for child in value.values():
+            _answer_from_options(child, rng)
+    elif isinstance(value, list):
+        for child in value:
+            _answer_from_options(child, rng)
+
+
+class FakeOpenAI:
+    """
+    Implements the parts of the OpenAI client OpenAITextProcessor uses, sleeping for a
+    simulated latency and honouring per-call `timeout`.
+    """
+
+    def __init__(self, latency: LatencyModel, seed: int = 0):
+        self.latency = latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        completions = SimpleNamespace(parse=self._parse, create=self._create)
+        self.chat = SimpleNamespace(completions=completions)
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        self.embeddings = SimpleNamespace(create=self._embed)
+
+    def rng(self) -> random.Random:
+        # Calls come from many threads; each gets its own generator seeded from the shared one.
+        with self._lock:
+            self.calls += 1
+            return random.Random(self._random.random())
+
+    def delay(self, rng: random.Random, seconds: float) -> float:
+        if rng.random() < self.latency.error_rate:
+            raise RuntimeError("Simulated LLM failure")
+        return seconds * rng.lognormvariate(0, self.latency.jitter)
+
+    def chat_delay(self, rng: random.Random, messages: list, completion_chars: int = 0) -> float:
+        prompt_chars = sum(len(str(message["content"])) for message in messages)
+        return self.delay(rng, self.latency.base + self.latency.per_1k_prompt_chars * prompt_chars / 1000
+                          + self.latency.per_1k_completion_chars * completion_chars / 1000)
+
+    def _completion(self, message: SimpleNamespace, messages: list) -> SimpleNamespace:
+        prompt_tokens = sum(len(str(m["content"])) for m in messages) // 4
+        completion_tokens = len(message.content) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens)
+        )
+
+    def parsed_response(self, rng: random.Random, messages: list, response_format) -> BaseModel:
+        if response_format is TranslateFieldsResponse:
+            fields = json.loads(messages[-1]["content"])
+            return TranslateFieldsResponse(translations=[{"path": f["path"], "text": f"[tr] {f['text']}"}
+                                                         for f in fields])
+        value = fake_from_schema(response_format.model_json_schema(), rng, self.latency)
+        _answer_from_options(value, rng)
+        return response_format.model_validate(value)
+
+    def _parse(self, model: str, messages: list, response_format, temperature: float = 0,
+               timeout: Optional[float] = None, **kwargs):
+        rng = self.rng()
+        parsed = self.parsed_response(rng, messages, response_format)
+        message = SimpleNamespace(role="assistant", content=parsed.model_dump_json(), parsed=parsed, refusal=None)
+        _sleep(self.chat_delay(rng, messages, len(message.content)), timeout)
+        return self._completion(message, messages)
+
+    def structured_content(self, rng: random.Random, messages: list, response_format: Dict[str, Any]) -> str:
+        """
+        JSON content for a `response_format={"type": "json_schema", ...}` request.
+        """
+        json_schema = response_format["json_schema"]
+        if json_schema["name"] == TranslateFieldsResponse.__name__:
+            return self.parsed_response(rng, messages, TranslateFieldsResponse).model_dump_json()
+        value = fake_from_schema(json_schema["schema"], rng, self.latency)
+        _answer_from_options(value, rng)
+        return json.dumps(value)
+
+    def _create(self, model: str, messages: list, temperature: float = 0,
+                timeout: Optional[float] = None, response_format: Optional[Dict[str, Any]] = None, **kwargs):
+        rng = self.rng()
+        if response_format and response_format.get("type") == "json_schema":
+            content = self.structured_content(rng, messages, response_format)
+        else:
+            content = f"[tr] {messages[-1]['content']}"
+        message = SimpleNamespace(role="assistant", content=content, refusal=None)
+        _sleep(self.chat_delay(rng, messages, len(message.content)), timeout)
+        return self._completion(message, messages)
+
+    def embedding_response(self, rng: random.Random, inputs) -> SimpleNamespace:
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[rng.random() for _ in range(EMBEDDING_DIMENSION)])
+            for i in range(len(inputs))
+        ])
+
+    def _embed(self, input, model: str, timeout: Optional[float] = None, **kwargs):
+        rng = self.rng()
+        _sleep(self.delay(rng, self.latency.embedding_base), timeout)
+        return self.embedding_response(rng, input)
+
+
+class FakeAsyncOpenAI:
+    """
+    Async embeddings on top of a FakeOpenAI, sleeping on the event loop instead of a thread.
+    """
+
+    def __init__(self, fake: FakeOpenAI):
+        self.fake = fake
+        self.embeddings = SimpleNamespace(create=self._embed)
+
+    async def _embed(self, input, model: str, timeout: Optional[float] = None, **kwargs):
+        rng = self.fake.rng()
+        seconds = self.fake.delay(rng, self.fake.latency.embedding_base)
+        if timeout is not None and seconds > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError("Simulated call timed out")
+        await asyncio.sleep(seconds)
+        return self.fake.embedding_response(rng, input)
+
+
+class FakeTextProcessor(OpenAITextProcessor):
+    def __init__(self, latency: Optional[LatencyModel] = None, seed: int = 0, model: str = "fake-model",
+                 max_workers: int = 5, router: Optional[ModelRouter] = None):
+        super().__init__(api_key="sk-fake", model=model, max_workers=max_workers, router=router)
+        self.fake = FakeOpenAI(latency or LatencyModel(), seed)
+        self.client = self.fake
+        self._async_client = FakeAsyncOpenAI(self.fake)
@@ -0,0 +1,170 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _Usage:
+    """
+    Requests currently holding a pooled connection, from send until the body is closed.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.total = 0
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.active += 1
+            self.total += 1
+            self.peak = max(self.peak, self.active)
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, usage: _Usage):
+        self._stream = stream
+        self._usage = usage
+        self._closed = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._usage.release()
+        self._stream.close()
+
+
+class _TrackedAsyncStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, usage: _Usage):
+        self._stream = stream
+        self._usage = usage
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._usage.release()
+        await self._stream.aclose()
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    def __init__(self, usage: _Usage, **kwargs):
+        super().__init__(**kwargs)
+        self.usage = usage
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.usage.acquire()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self.usage.release()
+            raise
+        return httpx.Response(status_code=response.status_code, headers=response.headers,
+                              stream=_TrackedStream(response.stream, self.usage),
+                              extensions=response.extensions)
+
+
+class InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, usage: _Usage, **kwargs):
+        super().__init__(**kwargs)
+        self.usage = usage
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.usage.acquire()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.usage.release()
+            raise
+        return httpx.Response(status_code=response.status_code, headers=response.headers,
+                              stream=_TrackedAsyncStream(response.stream, self.usage),
+                              extensions=response.extensions)
+
+
+def _transport_kwargs(settings) -> dict:
+    http2 = settings.http2
+    if http2 and not _h2_available():
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        "http2": http2,
+        "retries": settings.connect_retries,
+    }
+
+
+def build_timeout(settings) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.connect_timeout,
+        read=settings.read_timeout,
+        write=settings.write_timeout,
+        pool=settings.pool_timeout,
+    )
+
+
+def build_http_client(settings) -> httpx.Client:
+    """
+    Sync client over one bounded, keepalive-tuned connection pool. `settings` is an HttpPoolSettings.
+    """
+    transport = InstrumentedTransport(_Usage("sync"), **_transport_kwargs(settings))
+    return httpx.Client(transport=transport, timeout=build_timeout(settings), follow_redirects=True)
+
+
+def build_async_http_client(settings) -> httpx.AsyncClient:
+    transport = InstrumentedAsyncTransport(_Usage("async"), **_transport_kwargs(settings))
+    return httpx.AsyncClient(transport=transport, timeout=build_timeout(settings), follow_redirects=True)
+
+
+def pool_stats(client: Optional[httpx.Client | httpx.AsyncClient], max_connections: int) -> Dict[str, float]:
+    """
+    Connection counts and utilization of a client built here; also published as metrics gauges.
+    """
+    if client is None:
+        return {}
+    transport = client._transport
+    usage: _Usage = transport.usage
+    connections = list(getattr(transport._pool, "connections", []))
+    idle = sum(1 for connection in connections if connection.is_idle())
+
+    stats = {
+        "connections": len(connections),
+        "idle_connections": idle,
+        "busy_connections": len(connections) - idle,
+        "active_requests": usage.active,
+        "peak_active_requests": usage.peak,
+        "total_requests": usage.total,
+        "utilization": (len(connections) - idle) / max_connections if max_connections else 0.0,
+    }
+    for name, value in stats.items():
+        metrics.set_gauge(f"http_pool_{name}", value, pool=usage.name)
+    return stats
@@ -1,270 +1,379 @@
+import json
 import os
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, ContentFilterFinishReasonError, LengthFinishReasonError, OpenAI
 from openai.types.chat import ChatCompletionSystemMessageParam, ChatCompletionUserMessageParam
+from pydantic import ValidationError
 
 from app.contant_manager import paragraph_generator, simplify_prompt, question_generation_prompt, paragraph_level, \
-    EMBEDDING_MODEL, quiz_note, translate_quiz_prompt, translate_content, translate_video_metadata
-from app.models.llm_response_model import ParagraphResponse, SimplifyResponse, QuizResponse
-from app.models.processing_models import SimplifyResults, TranslateP1Response, TranslateP2Response
+    EMBEDDING_MODEL, quiz_note, translate_quiz_prompt, translate_content, translate_video_metadata, \
+    translate_fields_prompt, simplify_quiz_prompt
+from app.models.llm_response_model import ParagraphResponse, SimplifyResponse, QuizResponse, SimplifyQuizResponse
+from app.models.processing_models import SimplifyResults, TranslateP1Response, TranslateP2Response, \
+    TranslateFieldsResponse
+from app.client.response_formats import response_format as registered_format
+from app.client.model_router import ModelRouter, RoutePolicy, TASK_SEGMENTATION, TASK_SIMPLIFICATION, \
+    TASK_QUIZ_GENERATION, TASK_SIMPLIFY_QUIZ, TASK_STRUCTURED_TRANSLATION, TASK_SHORT_TRANSLATION, TASKS
 from app.models.translate_video_metadata import CourseWrapper, Chapter
+from app.utils import deadline, tracing
+from app.utils.loop_local import LoopLocal
+from app.utils.metrics import metrics
+from app.utils.single_flight import SingleFlight, canonical_hash
+
+
+# Raised when a structured-output call returns but its content is unusable (truncated,
+# filtered or not matching the schema), as opposed to the call itself failing.
+STRUCTURED_OUTPUT_ERRORS = (ValidationError, LengthFinishReasonError, ContentFilterFinishReasonError)
+
+
+def _messages(system: str, user: str) -> list:
+    return [
+        ChatCompletionSystemMessageParam(
+            role="system",
+            content=system
+        ),
+        ChatCompletionUserMessageParam(
+            role="user",
+            content=user
+        )
+    ]
+
+
+def paragraph_messages(video: str, objective: list, skills: list) -> list:
+    return _messages(
+        paragraph_generator,
+        f"##Script: {video}\n"
+        f"##Paragraph Level: {paragraph_level}\n"
+        f"##Objectives: {objective}\n"
+        f"##Skills: {skills}\n##\n"
+    )
+
+
+def simplify_messages(paragraph: str, language: str) -> list:
+    return _messages(
+        simplify_prompt,
+        f"##Script: {paragraph}\n##\n##Answer in {language} language:\n##\n"
+    )
+
+
+def quiz_messages(paragraph_content, skills: list, objective: list, language: str) -> list:
+    return _messages(
+        question_generation_prompt,
+        f"{quiz_note}\n"
+        f"##Script: {paragraph_content}\n"
+        f"##Skills: {skills}\n##Objectives: {objective}\n##\n"
+        f"##Answer in {language} language:\n##\n"
+    )
+
+
+def simplify_quiz_messages(paragraph: str, skills: list, objective: list, language: str) -> list:
+    return _messages(
+        simplify_quiz_prompt,
+        f"##Script: {paragraph}\n"
+        f"##Skills: {skills}\n##Objectives: {objective}\n##\n"
+        f"##Answer in {language} language:\n##\n"
+    )
+
+
+def translate_quiz_messages(quiz: str, language: str) -> list:
+    return _messages(translate_quiz_prompt.replace("{language}", language), quiz)
+
+
+def translate_content_payloads(video_data: dict, language: str) -> Tuple[dict, dict]:
+    """
+    Split a dumped QuizResults item into the two payloads sent for translation.
+    """
+    p1_translate = {
+        "objective": video_data['objective'],
+        "language": language,
+        "paragraph": video_data['paragraph'],
+        "paragraph_level": video_data['paragraph_level'],
+        "skills": video_data['skills'],
+        "simplify1": video_data['simplify1']
+    }
+    p2_translate = {
+        "simplify2": video_data['simplify2'],
+        "simplify3": video_data['simplify3']
+    }
+    return p1_translate, p2_translate
+
+
+def translate_content_messages(payload: dict, language: str) -> list:
+    return _messages(translate_content.replace("{language}", language), str(payload))
+
+
+def merge_content_translation(p1_translate_response: TranslateP1Response,
+                              p2_translate_response: TranslateP2Response,
+                              language: str) -> SimplifyResults:
+    return SimplifyResults(
+        objective=p1_translate_response.objective,
+        language=language,
+        paragraph=p1_translate_response.paragraph,
+        paragraph_level=p1_translate_response.paragraph_level,
+        skills=p1_translate_response.skills,
+        simplify1=p1_translate_response.simplify1,
+        simplify2=p2_translate_response.simplify2,
+        simplify3=p2_translate_response.simplify3
+    )
+
+
+def translate_metadata_messages(data, language: str) -> list:
+    return _messages(translate_video_metadata.replace("{language}", language), str(data))
+
+
+def translate_fields_messages(fields: Dict[str, str], language: str) -> list:
+    return _messages(
+        translate_fields_prompt.replace("{language}", language),
+        json.dumps([{"path": path, "text": text} for path, text in fields.items()], ensure_ascii=False)
+    )
+
+
+def record_usage(task: str, model: str, usage) -> None:
+    """
+    Count the tokens a call used, by task and model.
+    """
+    if usage is None:
+        return
+    metrics.increment("llm_prompt_tokens", usage.prompt_tokens or 0, task=task, model=model)
+    metrics.increment("llm_completion_tokens", usage.completion_tokens or 0, task=task, model=model)
+
+
+def prompt_size(messages: list) -> int:
+    return sum(len(message["content"]) for message in messages)
+
+
+def translate_text_messages(text: str, language: str) -> list:
+    return [
+        {"role": "system", "content": f"Translate the following text to {language}."},
+        {"role": "user", "content": text}
+    ]
 
 
 class OpenAITextProcessor:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini", max_workers: int = 5):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini", max_workers: int = 5,
+                 router: Optional[ModelRouter] = None,
+                 http_client: Optional[httpx.Client] = None,
+                 async_http_client_factory: Optional[Callable[[], httpx.AsyncClient]] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        # A shared http_client carries the pool limits and the connect/read timeouts.
+        self.client = OpenAI(api_key=self.api_key, http_client=http_client)
+        self._async_http_client_factory = async_http_client_factory
+        # Set to serve every event loop from one client (e.g. a fake); otherwise one per loop.
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._async_clients: LoopLocal[AsyncOpenAI] = LoopLocal(self._build_async_client)
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Without an explicit router every task is pinned to `model`, as before.
+        self.router = router or ModelRouter(
+            policies={task: RoutePolicy(model=model) for task in TASKS},
+            default_model=model
+        )
+        # Identical requests already in flight share one API call.
+        self._flight = SingleFlight("llm_call")
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """
+        Async SDK client for the running event loop, over the same pool configuration.
+        """
+        if self._async_client is not None:
+            return self._async_client
+        return self._async_clients.get()
+
+    def _build_async_client(self) -> AsyncOpenAI:
+        http_client = self._async_http_client_factory() if self._async_http_client_factory else None
+        return AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+
+    def _parse(self, task: str, messages: list, response_format, temperature: float = 0):
+        key = canonical_hash("parse", task, messages, response_format, temperature)
+        return self._flight.do(key, self._parse_once, task, messages, response_format, temperature)
+
+    def _parse_once(self, task: str, messages: list, response_format, temperature: float):
+        # Schema and validator come from the registry instead of being rebuilt by the SDK per call.
+        response_format = registered_format(response_format)
+        # The remaining request budget replaces the pool's read timeout for this call.
+        options = deadline.request_options(task, cost=prompt_size(messages))
+        with self.router.route(task) as model, tracing.span(f"llm.{task}", model=model):
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                response_format=response_format.param,
+                **options
+            )
+        record_usage(task, model, getattr(response, "usage", None))
+        return response_format.parse_completion(response)
 
     def get_embed(self, arabic_text: str):
-        embed = self.client.embeddings.create(
-            input=arabic_text,
-            model=EMBEDDING_MODEL
-        )
+        return self._flight.do(canonical_hash("embed", arabic_text), self._embed_once, arabic_text)
+
+    def _embed_once(self, arabic_text: str):
+        with tracing.span("llm.embedding", inputs=1):
+            embed = self.client.embeddings.create(
+                input=arabic_text,
+                model=EMBEDDING_MODEL,
+                **deadline.request_options("embedding", cost=len(arabic_text))
+            )
+
+        return embed.data[0].embedding
+
+    def get_embeds(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many texts in one request; vectors are returned in input order.
+        """
+        with tracing.span("llm.embedding", inputs=len(texts)):
+            embed = self.client.embeddings.create(
+                input=texts,
+                model=EMBEDDING_MODEL,
+                **deadline.request_options("embedding", cost=sum(len(text) for text in texts))
+            )
+        return [item.embedding for item in sorted(embed.data, key=lambda item: item.index)]
+
+    async def aget_embed(self, arabic_text: str):
+        with tracing.span("llm.embedding", inputs=1):
+            embed = await self.async_client.embeddings.create(
+                input=arabic_text,
+                model=EMBEDDING_MODEL,
+                **deadline.request_options("embedding", cost=len(arabic_text))
+            )
 
         return embed.data[0].embedding
 
     def get_paragraph(self, video: str, objective: list, skills: list) -> ParagraphResponse | None:
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=paragraph_generator
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=f"##Script: {video}\n"
-                                f"##Paragraph Level: {paragraph_level}\n"
-                                f"##Objectives: {objective}\n"
-                                f"##Skills: {skills}\n##\n"
-                    )
-                ],
-                temperature=0,
+            return self._parse(
+                TASK_SEGMENTATION,
+                messages=paragraph_messages(video, objective, skills),
                 response_format=ParagraphResponse,
-                timeout=600
+                temperature=0
             )
-            return response.choices[0].message.parsed
         except Exception as e:
             raise e
 
     def simplify(self, paragraph: str, language: str) -> SimplifyResponse | None:
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=simplify_prompt
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=f"##Script: {paragraph}\n##\n##Answer in {language} language:\n##\n"
-                    )
-                ],
-                temperature=0,
+            return self._parse(
+                TASK_SIMPLIFICATION,
+                messages=simplify_messages(paragraph, language),
                 response_format=SimplifyResponse,
-                timeout=600
+                temperature=0
             )
-            return response.choices[0].message.parsed
         except Exception as e:
             raise e
 
     def generate_quiz(self, paragraph_content, skills: list, objective: list, language: str) -> QuizResponse:
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=question_generation_prompt
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=f"{quiz_note}\n"
-                                f"##Script: {paragraph_content}\n"
-                                f"##Skills: {skills}\n##Objectives: {objective}\n##\n"
-                                f"##Answer in {language} language:\n##\n"
-                    )
-                ],
-                temperature=0.1,
+            return self._parse(
+                TASK_QUIZ_GENERATION,
+                messages=quiz_messages(paragraph_content, skills, objective, language),
                 response_format=QuizResponse,
-                timeout=600
+                temperature=0.1
             )
-            return response.choices[0].message.parsed
         except Exception as e:
             raise e
 
+    def simplify_and_quiz(self, paragraph: str, skills: list, objective: list, language: str) -> SimplifyQuizResponse:
+        """
+        Simplifications and quiz for one paragraph in a single call. Output that is truncated,
+        filtered or off-schema raises ValueError so callers can fall back to the split calls.
+        """
+        try:
+            return self._parse(
+                TASK_SIMPLIFY_QUIZ,
+                messages=simplify_quiz_messages(paragraph, skills, objective, language),
+                response_format=SimplifyQuizResponse,
+                temperature=0.1
+            )
+        except STRUCTURED_OUTPUT_ERRORS as e:
+            raise ValueError(f"Unusable fused output: {type(e).__name__}: {e}") from e
+
     def translate_quiz(self, quiz, language: str) -> QuizResponse:
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=translate_quiz_prompt.replace("{language}", language)
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=quiz
-                    )
-                ],
-                temperature=0,
+            return self._parse(
+                TASK_STRUCTURED_TRANSLATION,
+                messages=translate_quiz_messages(quiz, language),
                 response_format=QuizResponse,
-                timeout=600
+                temperature=0
             )
-            return response.choices[0].message.parsed
         except Exception as e:
             raise e
 
     def translate_content(self, video_data, language: str) -> SimplifyResults | None:
         try:
-            p1_translate = {
-                "video_id": video_data['video_id'],
-                "objective": video_data['objective'],
-                "language": language,
-                "paragraph_id": video_data['paragraph_id'],
-                "paragraph": video_data['paragraph'],
-                "paragraph_level": video_data['paragraph_level'],
-                "start_word": video_data['start_word'],
-                "end_word": video_data['end_word'],
-                "skills": video_data['skills'],
-                "simplify1_id": video_data['simplify1_id'],
-                "simplify1": video_data['simplify1'],
-                "simplify1_first_word": video_data['simplify1_first_word'],
-                "simplify1_last_word": video_data['simplify1_last_word']
-            }
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=translate_content.replace("{language}", language)
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=str(p1_translate)
-                    )
-                ],
-                temperature=0,
+            p1_translate, p2_translate = translate_content_payloads(video_data, language)
+            p1_translate_response = self._parse(
+                TASK_STRUCTURED_TRANSLATION,
+                messages=translate_content_messages(p1_translate, language),
                 response_format=TranslateP1Response,
-                timeout=600
+                temperature=0
             )
-
-            # Extract the translated content from the response
-            p1_translate_response = response.choices[0].message.parsed
-
-            p2_translate = {
-                "simplify2_id": video_data['simplify2_id'],
-                "simplify2": video_data['simplify2'],
-                "simplify2_first_word": video_data['simplify2_first_word'],
-                "simplify2_last_word": video_data['simplify2_last_word'],
-                "simplify3_id": video_data['simplify3_id'],
-                "simplify3": video_data['simplify3'],
-                "simplify3_first_word": video_data['simplify3_first_word'],
-                "simplify3_last_word": video_data['simplify3_last_word']
-            }
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=translate_content.replace("{language}", language)
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=str(p2_translate)
-                    )
-                ],
-                temperature=0,
+            p2_translate_response = self._parse(
+                TASK_STRUCTURED_TRANSLATION,
+                messages=translate_content_messages(p2_translate, language),
                 response_format=TranslateP2Response,
-                timeout=600
+                temperature=0
             )
-            p2_translate_response = response.choices[0].message.parsed
-            return SimplifyResults(
-                video_id=p1_translate_response.video_id,
-                objective=p1_translate_response.objective,
-                language=language,
-                paragraph_id=p1_translate_response.paragraph_id,
-                paragraph=p1_translate_response.paragraph,
-                paragraph_level=p1_translate_response.paragraph_level,
-                start_word=p1_translate_response.start_word,
-                end_word=p1_translate_response.end_word,
-                skills=p1_translate_response.skills,
-                simplify1_id=p1_translate_response.simplify1_id,
-                simplify1=p1_translate_response.simplify1,
-                simplify1_first_word=p1_translate_response.simplify1_first_word,
-                simplify1_last_word=p1_translate_response.simplify1_last_word,
-                simplify2_id=p2_translate_response.simplify2_id,
-                simplify2=p2_translate_response.simplify2,
-                simplify2_first_word=p2_translate_response.simplify2_first_word,
-                simplify2_last_word=p2_translate_response.simplify2_last_word,
-                simplify3_id=p2_translate_response.simplify3_id,
-                simplify3=p2_translate_response.simplify3,
-                simplify3_first_word=p2_translate_response.simplify3_first_word,
-                simplify3_last_word=p2_translate_response.simplify3_last_word
+            return merge_content_translation(p1_translate_response, p2_translate_response, language)
+        except Exception as e:
+            raise e
+
+    def translate_fields(self, fields: Dict[str, str], language: str) -> Dict[str, str]:
+        """
+        Translate a flat {path: text} mapping; paths the model leaves out are absent from the result.
+        """
+        try:
+            response = self._parse(
+                TASK_STRUCTURED_TRANSLATION,
+                messages=translate_fields_messages(fields, language),
+                response_format=TranslateFieldsResponse,
+                temperature=0
             )
+            return {item.path: item.text for item in response.translations if item.path in fields}
         except Exception as e:
             raise e
 
     def translate_chapter_meta(self, chapter_data: Chapter, language: str) -> Chapter:
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=translate_video_metadata.replace("{language}", language)
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=str(chapter_data)
-                    )
-                ],
-                temperature=0,
+            return self._parse(
+                TASK_STRUCTURED_TRANSLATION,
+                messages=translate_metadata_messages(chapter_data, language),
                 response_format=Chapter,
-                timeout=600
+                temperature=0
             )
-            return response.choices[0].message.parsed
         except Exception as e:
             raise e
 
     def translate_text(self, text: str, language: str) -> str:
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": f"Translate the following text to {language}."},
-                    {"role": "user", "content": text}
-                ],
-                temperature=0
-            )
-            return response.choices[0].message.content.strip()
+            return self._flight.do(canonical_hash("translate_text", text, language),
+                                   self._translate_text_once, text, language)
         except Exception as e:
             raise e
 
+    def _translate_text_once(self, text: str, language: str) -> str:
+        messages = translate_text_messages(text, language)
+        options = deadline.request_options(TASK_SHORT_TRANSLATION, cost=prompt_size(messages))
+        with self.router.route(TASK_SHORT_TRANSLATION) as model, \
+                tracing.span(f"llm.{TASK_SHORT_TRANSLATION}", model=model):
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                **options
+            )
+        record_usage(TASK_SHORT_TRANSLATION, model, getattr(response, "usage", None))
+        return response.choices[0].message.content.strip()
+
     def translate_video_meta(self, video_data, language: str) -> CourseWrapper | None:
         try:
-            response = self.client.beta.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    ChatCompletionSystemMessageParam(
-                        role="system",
-                        content=translate_video_metadata.replace("{language}", language)
-                    ),
-                    ChatCompletionUserMessageParam(
-                        role="user",
-                        content=str(video_data)
-                    )
-                ],
-                temperature=0,
+            return self._parse(
+                TASK_STRUCTURED_TRANSLATION,
+                messages=translate_metadata_messages(video_data, language),
                 response_format=CourseWrapper,
-                timeout=600
+                temperature=0
             )
-            return response.choices[0].message.parsed
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
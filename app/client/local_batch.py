@@ -0,0 +1,153 @@
+import json
+import random
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+
+def stub_from_schema(schema: Dict[str, Any], defs: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Build the smallest value that satisfies a strict JSON schema.
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return stub_from_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return stub_from_schema(schema["anyOf"][0], defs)
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = schema_type[0]
+    if schema_type == "object":
+        return {name: stub_from_schema(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return []
+    if schema_type == "boolean":
+        return False
+    if schema_type in ("integer", "number"):
+        return 0
+    if schema_type == "null":
+        return None
+    return "stub"
+
+
+def stub_handler(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer a chat completion request offline: structured requests get a schema-valid stub,
+    free-text requests echo the last user message.
+    """
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        content = json.dumps(stub_from_schema(response_format["json_schema"]["schema"]))
+    else:
+        content = body["messages"][-1]["content"]
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "model": body.get("model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content, "refusal": None},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class _LocalFiles:
+    def __init__(self, owner: "LocalBatchClient"):
+        self._owner = owner
+
+    def create(self, file, purpose: str):
+        data = file.read() if hasattr(file, "read") else file[1]
+        file_id = f"file-{uuid.uuid4().hex}"
+        self._owner.storage[file_id] = data if isinstance(data, bytes) else data.encode("utf-8")
+        return SimpleNamespace(id=file_id, purpose=purpose, bytes=len(self._owner.storage[file_id]))
+
+    def content(self, file_id: str):
+        data = self._owner.storage[file_id]
+        return SimpleNamespace(content=data, text=data.decode("utf-8"))
+
+
+class _LocalBatches:
+    def __init__(self, owner: "LocalBatchClient"):
+        self._owner = owner
+
+    def create(self, input_file_id: str, endpoint: str, completion_window: str, metadata=None):
+        batch_id = f"batch-{uuid.uuid4().hex}"
+        batch = SimpleNamespace(id=batch_id, status="validating", endpoint=endpoint,
+                                input_file_id=input_file_id, output_file_id=None, error_file_id=None,
+                                completion_window=completion_window, metadata=metadata, polls=0)
+        self._owner.batches_by_id[batch_id] = batch
+        return batch
+
+    def retrieve(self, batch_id: str):
+        batch = self._owner.batches_by_id[batch_id]
+        if batch.status in ("validating", "in_progress"):
+            batch.polls += 1
+            if batch.polls >= self._owner.polls_until_complete:
+                self._owner.process(batch)
+            else:
+                batch.status = "in_progress"
+        return batch
+
+
+class LocalBatchClient:
+    """
+    Offline stand-in for the `files` and `batches` endpoints of the OpenAI client.
+
+    Requests are answered by `handler` once a batch has been polled `polls_until_complete` times.
+    `failure_rate` fails that share of requests the first time they are seen, so resubmission
+    paths can be exercised deterministically with `seed`.
+    """
+
+    def __init__(self,
+                 handler: Callable[[Dict[str, Any]], Dict[str, Any]] = stub_handler,
+                 polls_until_complete: int = 1,
+                 failure_rate: float = 0.0,
+                 seed: int = 0):
+        self.handler = handler
+        self.polls_until_complete = polls_until_complete
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.storage: Dict[str, bytes] = {}
+        self.batches_by_id: Dict[str, SimpleNamespace] = {}
+        self.seen = set()
+        self.files = _LocalFiles(self)
+        self.batches = _LocalBatches(self)
+
+    def _store(self, lines) -> Optional[str]:
+        if not lines:
+            return None
+        file_id = f"file-{uuid.uuid4().hex}"
+        self.storage[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        return file_id
+
+    def process(self, batch: SimpleNamespace) -> None:
+        outputs, errors = [], []
+        for raw in self.storage[batch.input_file_id].decode("utf-8").splitlines():
+            if not raw.strip():
+                continue
+            request = json.loads(raw)
+            custom_id = request["custom_id"]
+            first_attempt = custom_id not in self.seen
+            self.seen.add(custom_id)
+
+            line = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": custom_id, "error": None}
+            try:
+                if first_attempt and self.random.random() < self.failure_rate:
+                    raise RuntimeError("Simulated failure")
+                line["response"] = {"status_code": 200, "request_id": uuid.uuid4().hex,
+                                    "body": self.handler(request["body"])}
+                outputs.append(line)
+            except Exception as e:
+                line["response"] = {"status_code": 500, "request_id": uuid.uuid4().hex,
+                                    "body": {"error": {"message": str(e)}}}
+                errors.append(line)
+
+        batch.output_file_id = self._store(outputs)
+        batch.error_file_id = self._store(errors)
+        batch.status = "completed"
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.contant_manager import DEFAULT_MODEL, FAST_MODEL
+from app.utils.metrics import metrics, percentile
+
+TASK_SEGMENTATION = "segmentation"
+TASK_SIMPLIFICATION = "simplification"
+TASK_QUIZ_GENERATION = "quiz_generation"
+TASK_SIMPLIFY_QUIZ = "simplify_quiz"
+TASK_STRUCTURED_TRANSLATION = "structured_translation"
+TASK_SHORT_TRANSLATION = "short_translation"
+
+TASKS = (
+    TASK_SEGMENTATION,
+    TASK_SIMPLIFICATION,
+    TASK_QUIZ_GENERATION,
+    TASK_SIMPLIFY_QUIZ,
+    TASK_STRUCTURED_TRANSLATION,
+    TASK_SHORT_TRANSLATION,
+)
+
+
+class RoutePolicy(BaseModel):
+    model: str = Field(..., description="Primary model for the task")
+    fallback_model: Optional[str] = Field(None, description="Faster model used while the primary is slow")
+    latency_threshold: Optional[float] = Field(
+        None, description="Median primary latency in seconds above which the fallback is used")
+
+
+DEFAULT_POLICIES: Dict[str, RoutePolicy] = {
+    TASK_SEGMENTATION: RoutePolicy(model=DEFAULT_MODEL, fallback_model=FAST_MODEL),
+    TASK_SIMPLIFICATION: RoutePolicy(model=DEFAULT_MODEL, fallback_model=FAST_MODEL),
+    TASK_QUIZ_GENERATION: RoutePolicy(model=DEFAULT_MODEL, fallback_model=FAST_MODEL),
+    TASK_SIMPLIFY_QUIZ: RoutePolicy(model=DEFAULT_MODEL, fallback_model=FAST_MODEL),
+    TASK_STRUCTURED_TRANSLATION: RoutePolicy(model=DEFAULT_MODEL, fallback_model=FAST_MODEL),
+    TASK_SHORT_TRANSLATION: RoutePolicy(model=FAST_MODEL),
+}
+
+
+class ModelRouter:
+    """
+    Maps each pipeline task to a model and falls back to a faster model while the
+    primary's observed median latency is above the task's threshold.
+
+    Latency is recorded per (task, model) route. While a route is degraded, every
+    `probe_interval`-th call still goes to the primary so recovery is noticed.
+    """
+
+    def __init__(self,
+                 policies: Optional[Dict[str, RoutePolicy]] = None,
+                 default_model: str = DEFAULT_MODEL,
+                 window: int = 50,
+                 min_samples: int = 5,
+                 probe_interval: int = 10):
+        self.policies = dict(policies or {})
+        self.default_model = default_model
+        self.window = window
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._degraded_calls: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, default_model: str = DEFAULT_MODEL) -> "ModelRouter":
+        """
+        Build a router from DEFAULT_POLICIES with per-task overrides:
+        LLM_MODEL_<TASK>, LLM_FALLBACK_MODEL_<TASK> and LLM_LATENCY_THRESHOLD_<TASK>.
+        LLM_FALLBACK_MODEL and LLM_LATENCY_THRESHOLD apply to every task.
+        """
+        global_fallback = os.getenv("LLM_FALLBACK_MODEL")
+        global_threshold = os.getenv("LLM_LATENCY_THRESHOLD")
+
+        policies = {}
+        for task in TASKS:
+            base = DEFAULT_POLICIES.get(task, RoutePolicy(model=default_model))
+            suffix = task.upper()
+            threshold = os.getenv(f"LLM_LATENCY_THRESHOLD_{suffix}", global_threshold)
+            policies[task] = RoutePolicy(
+                model=os.getenv(f"LLM_MODEL_{suffix}", base.model),
+                fallback_model=os.getenv(f"LLM_FALLBACK_MODEL_{suffix}", global_fallback or base.fallback_model),
+                latency_threshold=float(threshold) if threshold else base.latency_threshold,
+            )
+        return cls(policies=policies, default_model=default_model)
+
+    def policy(self, task: str) -> RoutePolicy:
+        return self.policies.get(task) or RoutePolicy(model=self.default_model)
+
+    def _median_latency(self, task: str, model: str) -> Optional[float]:
+        samples = self._latencies.get((task, model))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return percentile(samples, 50)
+
+    def is_degraded(self, task: str) -> bool:
+        policy = self.policy(task)
+        if not policy.fallback_model or policy.latency_threshold is None:
+            return False
+        with self._lock:
+            median = self._median_latency(task, policy.model)
+        return median is not None and median > policy.latency_threshold
+
+    def select(self, task: str) -> str:
+        policy = self.policy(task)
+        if not self.is_degraded(task):
+            return policy.model
+
+        with self._lock:
+            calls = self._degraded_calls.get(task, 0) + 1
+            self._degraded_calls[task] = calls
+        if calls % self.probe_interval == 0:
+            return policy.model
+        return policy.fallback_model
+
+    def record(self, task: str, model: str, elapsed: float, error: bool = False) -> None:
+        key = (task, model)
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.window)
+            samples.append(elapsed)
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+        metrics.observe("llm_route_latency_seconds", elapsed, task=task, model=model)
+        if error:
+            metrics.increment("llm_route_errors", task=task, model=model)
+
+    @contextmanager
+    def route(self, task: str) -> Iterator[str]:
+        """
+        Yield the model to use for `task` and record the latency of the wrapped call.
+        """
+        model = self.select(task)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield model
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(task, model, time.perf_counter() - start, error=error)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            routes = {key: list(samples) for key, samples in self._latencies.items()}
+            errors = dict(self._errors)
+
+        result = {}
+        for (task, model), samples in routes.items():
+            result[f"{task}:{model}"] = {
+                "task": task,
+                "model": model,
+                "count": len(samples),
+                "errors": errors.get((task, model), 0),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "mean": sum(samples) / len(samples) if samples else 0.0,
+            }
+        return {
+            "routes": result,
+            "degraded": {task: self.is_degraded(task) for task in self.policies},
+        }
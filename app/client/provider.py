@@ -0,0 +1,295 @@
+"""
+Lazily constructed, per-process clients.
+
+Nothing here touches the network, reads .env or imports the OpenAI/Qdrant SDKs until a
+client is first requested, so importing the services stays cheap. Clients are cached per
+process and rebuilt after a fork. Call `configure` once at startup to set explicit
+settings or inject prebuilt clients (e.g. fakes for load tests).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+
+from pydantic import BaseModel, Field
+
+from app.contant_manager import DEFAULT_MODEL
+from app.utils.loop_local import LoopLocal
+
+if TYPE_CHECKING:
+    import httpx
+
+    from app.client.llm_client import OpenAITextProcessor
+    from app.client.model_router import ModelRouter
+    from app.client.vector_db import AsyncQdrantDBClient, QdrantDBClient
+    from app.utils.scheduler import LLMScheduler
+
+
+class HttpPoolSettings(BaseModel):
+    max_connections: int = Field(100, description="Upper bound on open connections per pool")
+    max_keepalive_connections: int = Field(20, description="Idle connections kept for reuse")
+    keepalive_expiry: float = Field(30.0, description="Seconds an idle connection is kept")
+    http2: bool = Field(False, description="Multiplex requests over HTTP/2 connections")
+    connect_timeout: float = Field(10.0, description="Seconds to establish a connection")
+    read_timeout: float = Field(600.0, description="Seconds to wait for response data")
+    write_timeout: float = Field(30.0, description="Seconds to send the request body")
+    pool_timeout: float = Field(30.0, description="Seconds to wait for a free pooled connection")
+    connect_retries: int = Field(0, description="Transport-level retries of failed connects")
+
+    @classmethod
+    def from_env(cls) -> "HttpPoolSettings":
+        return cls(
+            max_connections=int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("OPENAI_HTTP2", "false").lower() in ("1", "true", "yes"),
+            connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10")),
+            read_timeout=float(os.getenv("OPENAI_READ_TIMEOUT", "600")),
+            write_timeout=float(os.getenv("OPENAI_WRITE_TIMEOUT", "30")),
+            pool_timeout=float(os.getenv("OPENAI_POOL_TIMEOUT", "30")),
+            connect_retries=int(os.getenv("OPENAI_CONNECT_RETRIES", "0")),
+        )
+
+
+class ClientSettings(BaseModel):
+    openai_api_key: Optional[str] = Field(None, description="Falls back to OPENAI_API_KEY in the SDK")
+    llm_model: str = Field(DEFAULT_MODEL, description="Default model for tasks without a route override")
+    llm_max_workers: int = Field(5, description="Worker threads owned by the LLM client")
+    executor_max_workers: int = Field(16, description="Worker threads for blocking service calls")
+    llm_max_concurrency: int = Field(16, description="LLM calls in flight at once across all requests")
+    llm_interactive_weight: float = Field(4.0, description="Share of contended LLM slots given to interactive calls")
+    llm_bulk_weight: float = Field(1.0, description="Share of contended LLM slots given to bulk calls")
+    llm_reserved_interactive: int = Field(2, description="LLM slots bulk calls may never occupy")
+    llm_priority_aging_seconds: float = Field(30.0, description="Queue wait after which a call is served next")
+    qdrant_url: Optional[str] = Field(None, description="Qdrant URL; vector search is unavailable without it")
+    qdrant_port: int = Field(6333, description="Qdrant REST port")
+    qdrant_grpc_port: int = Field(6334, description="Qdrant gRPC port")
+    qdrant_prefer_grpc: bool = Field(False, description="Use gRPC instead of REST where supported")
+    qdrant_api_key: Optional[str] = Field(None, description="Qdrant API key")
+    http: HttpPoolSettings = Field(default_factory=HttpPoolSettings, description="Shared OpenAI connection pool")
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        return cls(
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            llm_model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+            llm_max_workers=int(os.getenv("LLM_MAX_WORKERS", "5")),
+            executor_max_workers=int(os.getenv("EXECUTOR_MAX_WORKERS", "16")),
+            llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            llm_interactive_weight=float(os.getenv("LLM_INTERACTIVE_WEIGHT", "4")),
+            llm_bulk_weight=float(os.getenv("LLM_BULK_WEIGHT", "1")),
+            llm_reserved_interactive=int(os.getenv("LLM_RESERVED_INTERACTIVE", "2")),
+            llm_priority_aging_seconds=float(os.getenv("LLM_PRIORITY_AGING_SECONDS", "30")),
+            qdrant_url=os.getenv("QDRANT_URL"),
+            qdrant_port=int(os.getenv("QDRANT_PORT", "6333")),
+            qdrant_grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+            qdrant_prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes"),
+            qdrant_api_key=os.getenv("QDRANT_API_KEY"),
+            http=HttpPoolSettings.from_env(),
+        )
+
+
+_lock = threading.RLock()
+_pid: Optional[int] = None
+_settings: Optional[ClientSettings] = None
+_router: Optional["ModelRouter"] = None
+_llm_client: Optional["OpenAITextProcessor"] = None
+_vectordb_client: Optional["QdrantDBClient"] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_scheduler: Optional["LLMScheduler"] = None
+_http_client: Optional["httpx.Client"] = None
+_async_http_clients: Optional[LoopLocal["httpx.AsyncClient"]] = None
+
+
+def _check_fork() -> None:
+    """
+    Drop clients inherited from a parent process; their connections and threads are not usable here.
+    """
+    global _pid, _router, _llm_client, _vectordb_client, _executor, _scheduler, _http_client, _async_http_clients
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _router = _llm_client = _vectordb_client = _executor = _scheduler = None
+        _http_client = _async_http_clients = None
+
+
+def configure(settings: Optional[ClientSettings] = None,
+              llm_client: Optional["OpenAITextProcessor"] = None,
+              vectordb_client: Optional["QdrantDBClient"] = None,
+              executor: Optional[ThreadPoolExecutor] = None) -> None:
+    """
+    Set explicit settings and/or inject clients. Injected clients replace cached ones;
+    anything not injected is built from `settings` on first use.
+    """
+    global _settings, _llm_client, _vectordb_client, _executor
+    with _lock:
+        _check_fork()
+        if settings is not None:
+            _settings = settings
+        if llm_client is not None:
+            _llm_client = llm_client
+        if vectordb_client is not None:
+            _vectordb_client = vectordb_client
+        if executor is not None:
+            _executor = executor
+
+
+def reset() -> None:
+    """
+    Forget settings and clients, shutting down the executor we created.
+    """
+    global _settings, _router, _llm_client, _vectordb_client, _executor, _scheduler, _http_client, _async_http_clients
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        if _http_client is not None:
+            _http_client.close()
+        _settings = _router = _llm_client = _vectordb_client = _executor = _scheduler = None
+        _http_client = _async_http_clients = None
+
+
+def get_settings() -> ClientSettings:
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = ClientSettings.from_env()
+        return _settings
+
+
+def get_router() -> "ModelRouter":
+    global _router
+    with _lock:
+        _check_fork()
+        if _router is None:
+            from app.client.model_router import ModelRouter
+
+            _router = ModelRouter.from_env(default_model=get_settings().llm_model)
+        return _router
+
+
+def get_llm_client() -> "OpenAITextProcessor":
+    global _llm_client
+    with _lock:
+        _check_fork()
+        if _llm_client is None:
+            from app.client.llm_client import OpenAITextProcessor
+
+            settings = get_settings()
+            _llm_client = OpenAITextProcessor(settings.openai_api_key, model=settings.llm_model,
+                                              max_workers=settings.llm_max_workers, router=get_router(),
+                                              http_client=get_http_client(),
+                                              async_http_client_factory=get_async_http_client)
+        return _llm_client
+
+
+def get_http_client() -> "httpx.Client":
+    """
+    The process-wide connection pool for sync OpenAI calls, chat and embeddings alike.
+    """
+    global _http_client
+    with _lock:
+        _check_fork()
+        if _http_client is None:
+            from app.client.http_pool import build_http_client
+
+            _http_client = build_http_client(get_settings().http)
+        return _http_client
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """
+    The connection pool for async OpenAI calls on the running event loop; its connections
+    cannot be reused from another loop, so each loop gets its own.
+    """
+    global _async_http_clients
+    with _lock:
+        _check_fork()
+        if _async_http_clients is None:
+            from app.client.http_pool import build_async_http_client
+
+            _async_http_clients = LoopLocal(lambda: build_async_http_client(get_settings().http))
+        clients = _async_http_clients
+    return clients.get()
+
+
+def http_pool_stats() -> dict:
+    """
+    Utilization of the pools created so far (for async, the running loop's); empty until the
+    first OpenAI call.
+    """
+    async_http_client = _async_http_clients.current() if _async_http_clients is not None else None
+    if _http_client is None and async_http_client is None:
+        return {}
+    from app.client.http_pool import pool_stats
+
+    max_connections = get_settings().http.max_connections
+    return {
+        "sync": pool_stats(_http_client, max_connections),
+        "async": pool_stats(async_http_client, max_connections),
+    }
+
+
+def get_vectordb_client() -> "QdrantDBClient":
+    global _vectordb_client
+    with _lock:
+        _check_fork()
+        if _vectordb_client is None:
+            settings = get_settings()
+            if not settings.qdrant_url:
+                raise RuntimeError("QDRANT_URL is not configured")
+            from app.client.vector_db import QdrantDBClient
+
+            _vectordb_client = QdrantDBClient.for_endpoint(host=settings.qdrant_url,
+                                                           port=settings.qdrant_port,
+                                                           grpc_port=settings.qdrant_grpc_port,
+                                                           prefer_grpc=settings.qdrant_prefer_grpc,
+                                                           api_key=settings.qdrant_api_key)
+        return _vectordb_client
+
+
+def get_async_vectordb_client() -> "AsyncQdrantDBClient":
+    """
+    Async Qdrant client for the running event loop, pooled per endpoint and loop.
+    """
+    settings = get_settings()
+    if not settings.qdrant_url:
+        raise RuntimeError("QDRANT_URL is not configured")
+    from app.client.vector_db import AsyncQdrantDBClient
+
+    return AsyncQdrantDBClient.for_endpoint(host=settings.qdrant_url,
+                                            port=settings.qdrant_port,
+                                            grpc_port=settings.qdrant_grpc_port,
+                                            prefer_grpc=settings.qdrant_prefer_grpc,
+                                            api_key=settings.qdrant_api_key)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        _check_fork()
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_settings().executor_max_workers,
+                                           thread_name_prefix="service")
+        return _executor
+
+
+def get_scheduler() -> "LLMScheduler":
+    """
+    The single scheduler all LLM work in this process goes through.
+    """
+    global _scheduler
+    with _lock:
+        _check_fork()
+        if _scheduler is None:
+            from app.utils.scheduler import LLMScheduler
+
+            settings = get_settings()
+            _scheduler = LLMScheduler(max_concurrency=settings.llm_max_concurrency,
+                                      executor_factory=get_executor,
+                                      weights={"interactive": settings.llm_interactive_weight,
+                                               "bulk": settings.llm_bulk_weight},
+                                      reserved_interactive=settings.llm_reserved_interactive,
+                                      aging_seconds=settings.llm_priority_aging_seconds)
+        return _scheduler
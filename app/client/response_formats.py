@@ -0,0 +1,133 @@
+"""
+Registry of structured-output response formats.
+
+`client.beta.chat.completions.parse(response_format=Model)` turns the model into a strict
+JSON schema on every call and rebuilds the parsed completion object around the result.
+For nested models such as QuizResponse that is measurable CPU per call. Here each model's
+request parameter and TypeAdapter are built once. Calls then go through
+`chat.completions.create`, and the message content is validated with the cached adapter.
+Refusals, truncation and content-filter stops are handled the way the SDK handles them.
+Batch requests use the same cached schema.
+
+The request parameter is built from the adapter's JSON schema with `strict_json_schema`,
+which applies the rules strict structured outputs require, as the SDK does internally.
+"""
+import threading
+from typing import Any, Dict, Generic, Optional, Type, TypeVar
+
+from openai import ContentFilterFinishReasonError, LengthFinishReasonError
+from pydantic import BaseModel, TypeAdapter
+
+from app.utils.metrics import metrics
+
+T = TypeVar("T", bound=BaseModel)
+
+
+def _resolve_ref(root: Dict[str, Any], ref: str) -> Dict[str, Any]:
+    if not ref.startswith("#/"):
+        raise ValueError(f"Unexpected $ref {ref!r}; only local references are supported")
+    resolved = root
+    for key in ref[2:].split("/"):
+        resolved = resolved[key]
+    return resolved
+
+
+def _strict(schema: Dict[str, Any], root: Dict[str, Any]) -> Dict[str, Any]:
+    for defs_key in ("$defs", "definitions"):
+        for definition in schema.get(defs_key, {}).values():
+            _strict(definition, root)
+    if schema.get("type") == "object" and "additionalProperties" not in schema:
+        schema["additionalProperties"] = False
+    properties = schema.get("properties")
+    if isinstance(properties, dict):
+        # Strict mode requires every property; optional ones stay nullable in their own schema.
+        schema["required"] = list(properties)
+        schema["properties"] = {key: _strict(value, root) for key, value in properties.items()}
+    if isinstance(schema.get("items"), dict):
+        schema["items"] = _strict(schema["items"], root)
+    if isinstance(schema.get("anyOf"), list):
+        schema["anyOf"] = [_strict(variant, root) for variant in schema["anyOf"]]
+    all_of = schema.get("allOf")
+    if isinstance(all_of, list):
+        if len(all_of) == 1:
+            schema.update(_strict(schema.pop("allOf")[0], root))
+        else:
+            schema["allOf"] = [_strict(entry, root) for entry in all_of]
+    if "default" in schema and schema["default"] is None:
+        del schema["default"]
+    ref = schema.get("$ref")
+    if ref and len(schema) > 1:
+        # A $ref may not have sibling keywords such as a description, so the target is inlined.
+        schema.update({**_resolve_ref(root, ref), **schema})
+        del schema["$ref"]
+        return _strict(schema, root)
+    return schema
+
+
+def strict_json_schema(adapter: TypeAdapter) -> Dict[str, Any]:
+    """
+    The adapter's JSON schema in the form strict structured outputs accept: closed objects,
+    every property required, no null defaults and no $ref with sibling keywords.
+    """
+    schema = adapter.json_schema()
+    return _strict(schema, schema)
+
+
+class ResponseFormat(Generic[T]):
+    def __init__(self, model: Type[T]):
+        self.model = model
+        self.name = model.__name__
+        self.adapter: TypeAdapter[T] = TypeAdapter(model)
+        self.param: Dict[str, Any] = {
+            "type": "json_schema",
+            "json_schema": {"name": self.name, "schema": strict_json_schema(self.adapter), "strict": True},
+        }
+
+    def validate_json(self, content: str) -> T:
+        return self.adapter.validate_json(content)
+
+    def parse_completion(self, completion) -> Optional[T]:
+        """
+        The validated first choice of a chat completion; None when the model refused.
+        """
+        choice = completion.choices[0]
+        if choice.finish_reason == "length":
+            raise LengthFinishReasonError(completion=completion)
+        if choice.finish_reason == "content_filter":
+            raise ContentFilterFinishReasonError()
+        message = choice.message
+        if getattr(message, "refusal", None):
+            metrics.increment("llm_refusals", response_format=self.name)
+            return None
+        return self.validate_json(message.content)
+
+
+_lock = threading.Lock()
+_formats: Dict[type, ResponseFormat] = {}
+
+
+def response_format(model: Type[T]) -> ResponseFormat[T]:
+    """
+    The cached format of `model`, built on first use.
+    """
+    cached = _formats.get(model)
+    if cached is None:
+        with _lock:
+            cached = _formats.get(model)
+            if cached is None:
+                cached = _formats[model] = ResponseFormat(model)
+    return cached
+
+
+def warm() -> None:
+    """
+    Build the formats of every structured response the pipeline requests, e.g. at startup.
+    """
+    from app.models.llm_response_model import ParagraphResponse, QuizResponse, SimplifyQuizResponse, \
+        SimplifyResponse
+    from app.models.processing_models import TranslateFieldsResponse, TranslateP1Response, TranslateP2Response
+    from app.models.translate_video_metadata import Chapter, CourseWrapper
+
+    for model in (ParagraphResponse, SimplifyResponse, QuizResponse, SimplifyQuizResponse, TranslateP1Response,
+                  TranslateP2Response, TranslateFieldsResponse, Chapter, CourseWrapper):
+        response_format(model)
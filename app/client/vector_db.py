@@ -1,5 +1,9 @@
-from qdrant_client import QdrantClient
-from typing import List, Any, Dict, Optional
+import math
+import os
+import threading
+from pydantic import BaseModel, Field
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from typing import List, Any, Dict, Iterator, Literal, Optional, Sequence, Tuple
 from qdrant_client import models
 from qdrant_client.http.models import (
     ScoredPoint
@@ -8,33 +12,127 @@ from qdrant_client.conversions.common_types import (
     UpdateResult,
 )
 
+from app.utils import deadline, tracing
+from app.utils.loop_local import LoopLocal
 
-class QdrantDBClient:
+EndpointKey = Tuple[Any, ...]
+
+
+class CollectionConfig(BaseModel):
     """
-    Singleton class for managing interactions with a Qdrant vector database.
+    Storage and index settings applied when a collection is created.
     """
-    _instance = None
+    distance: models.Distance = Field(models.Distance.COSINE, description="Vector distance metric")
+    quantization: Optional[Literal["scalar", "binary"]] = Field(
+        None, description="int8 scalar or 1-bit binary quantization of stored vectors")
+    quantization_quantile: Optional[float] = Field(0.99, description="Scalar quantization clipping quantile")
+    quantization_always_ram: bool = Field(True, description="Keep quantized vectors in RAM")
+    on_disk_vectors: bool = Field(False, description="Store original vectors on disk (mmap)")
+    hnsw_m: Optional[int] = Field(None, description="HNSW edges per node")
+    hnsw_ef_construct: Optional[int] = Field(None, description="HNSW build-time candidate list size")
+    hnsw_on_disk: Optional[bool] = Field(None, description="Store the HNSW graph on disk")
+    payload_indexes: Dict[str, models.PayloadSchemaType] = Field(
+        default_factory=dict, description="Payload fields to index, with their schema type")
 
-    def __new__(cls,
-                **_kwargs: Any):
-        """
-        Ensures only one instance of QdrantDatabaseClientServer is created (Singleton pattern).
-        """
-        if cls._instance is None:
-            cls._instance = super(QdrantDBClient, cls).__new__(cls)
-        return cls._instance
+    def vectors_config(self, size: int) -> models.VectorParams:
+        return models.VectorParams(size=size, distance=self.distance, on_disk=self.on_disk_vectors or None)
+
+    def hnsw_config(self) -> Optional[models.HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None and self.hnsw_on_disk is None:
+            return None
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == "scalar":
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=self.quantization_quantile,
+                always_ram=self.quantization_always_ram))
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+                always_ram=self.quantization_always_ram))
+        return None
+
+
+def search_params(hnsw_ef: Optional[int] = None,
+                  exact: bool = False,
+                  rescore: Optional[bool] = None,
+                  oversampling: Optional[float] = None) -> Optional[models.SearchParams]:
+    """
+    Build query-time search params; rescore/oversampling only apply to quantized collections.
+    """
+    quantization = None
+    if rescore is not None or oversampling is not None:
+        quantization = models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+    if hnsw_ef is None and not exact and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=hnsw_ef, exact=exact, quantization=quantization)
+
+
+def match_filter(**conditions: Any) -> Optional[models.Filter]:
+    """
+    Filter requiring each payload field to equal the given value, e.g. match_filter(language="en").
+    """
+    must = [models.FieldCondition(key=key, match=models.MatchValue(value=value))
+            for key, value in conditions.items() if value is not None]
+    return models.Filter(must=must) if must else None
+
+
+def _search_timeout() -> Dict[str, int]:
+    # Qdrant takes whole seconds; round the remaining request budget up.
+    seconds = deadline.timeout("qdrant_search")
+    return {} if seconds is None else {"timeout": max(1, math.ceil(seconds))}
+
+
+def _endpoint_key(host: str, port: int, grpc_port: int, prefer_grpc: bool, **kwargs: Any) -> EndpointKey:
+    return (os.getpid(), host, port, grpc_port, prefer_grpc, tuple(sorted(kwargs.items())))
+
+
+class QdrantDBClient:
+    """
+    Client for managing interactions with a Qdrant vector database.
+
+    Use `for_endpoint` to share one client per (host, port, transport) in a process;
+    constructing the class directly always creates a new connection.
+    """
+    _pool: Dict[EndpointKey, "QdrantDBClient"] = {}
+    _pool_lock = threading.Lock()
 
     def __init__(self,
                  host: str,
-                 port: int):
-        if not hasattr(self, 'initialized') or not self.initialized:
-            try:
-                self.client = QdrantClient(url=host,
-                                           port=port)
-                self.initialized = True
-            except Exception as e:
-                raise e
+                 port: int = 6333,
+                 grpc_port: int = 6334,
+                 prefer_grpc: bool = False,
+                 timeout: Optional[int] = None,
+                 api_key: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.grpc_port = grpc_port
+        self.prefer_grpc = prefer_grpc
+        self.client = QdrantClient(url=host,
+                                   port=port,
+                                   grpc_port=grpc_port,
+                                   prefer_grpc=prefer_grpc,
+                                   timeout=timeout,
+                                   api_key=api_key)
+
+    @classmethod
+    def for_endpoint(cls,
+                     host: str,
+                     port: int = 6333,
+                     grpc_port: int = 6334,
+                     prefer_grpc: bool = False,
+                     **kwargs: Any) -> "QdrantDBClient":
+        key = _endpoint_key(host, port, grpc_port, prefer_grpc, **kwargs)
+        with cls._pool_lock:
+            instance = cls._pool.get(key)
+            if instance is None:
+                instance = cls._pool[key] = cls(host, port=port, grpc_port=grpc_port,
+                                                prefer_grpc=prefer_grpc, **kwargs)
+            return instance
 
+    def close(self) -> None:
+        self.client.close()
 
     def insert_point(self,
                      collection_name: str,
@@ -59,26 +157,203 @@ class QdrantDBClient:
             vector: List[float],
             limit: int,
             query_filter: Optional[models.Filter] = None,
-
+            params: Optional[models.SearchParams] = None,
+            with_payload: Any = True,
     ) -> List[ScoredPoint]:
         try:
-            result = self.client.search(
-                collection_name=collection_name,
-                query_vector=vector,
-                limit=limit,
-                query_filter=query_filter
-            )
+            with tracing.span("qdrant.search", collection=collection_name, limit=limit):
+                result = self.client.search(
+                    collection_name=collection_name,
+                    query_vector=vector,
+                    limit=limit,
+                    query_filter=query_filter,
+                    search_params=params,
+                    with_payload=with_payload,
+                    **_search_timeout()
+                )
             return result
         except Exception as e:
             raise e
 
+    def upsert_points(self,
+                      collection_name: str,
+                      points: Sequence[models.PointStruct],
+                      batch_size: int = 256,
+                      wait: bool = True) -> int:
+        """
+        Upsert points in batches; returns the number of points written.
+        """
+        for start in range(0, len(points), batch_size):
+            with tracing.span("qdrant.upsert", collection=collection_name, points=min(batch_size, len(points) - start)):
+                self.client.upsert(
+                    collection_name=collection_name,
+                    points=list(points[start:start + batch_size]),
+                    wait=wait
+                )
+        return len(points)
+
+    def delete_points(self,
+                      collection_name: str,
+                      point_ids: Sequence[str],
+                      batch_size: int = 1000) -> int:
+        for start in range(0, len(point_ids), batch_size):
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=list(point_ids[start:start + batch_size]))
+            )
+        return len(point_ids)
+
+    def iter_payloads(self,
+                      collection_name: str,
+                      fields: Optional[List[str]] = None,
+                      page_size: int = 1000) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yield (point id, payload) for every point, without vectors.
+        """
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=fields if fields is not None else True,
+                with_vectors=False
+            )
+            for point in points:
+                yield str(point.id), point.payload or {}
+            if offset is None:
+                break
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return self.client.collection_exists(collection_name)
+
     def create_collection(self,
                           collection_name: str,
-                          collection_size: int ) -> None:
-
+                          collection_size: int,
+                          config: Optional[CollectionConfig] = None) -> None:
+        config = config or CollectionConfig()
         self.client.create_collection(
             collection_name=collection_name,
-            vectors_config=models.VectorParams(
-                size=collection_size,
-                distance=models.Distance.COSINE),
+            vectors_config=config.vectors_config(collection_size),
+            hnsw_config=config.hnsw_config(),
+            quantization_config=config.quantization_config(),
+        )
+        for field_name, field_schema in config.payload_indexes.items():
+            self.create_payload_index(collection_name, field_name, field_schema)
+
+    def create_payload_index(self,
+                             collection_name: str,
+                             field_name: str,
+                             field_schema: models.PayloadSchemaType = models.PayloadSchemaType.KEYWORD) -> None:
+        self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema
+        )
+
+
+class AsyncQdrantDBClient:
+    """
+    Async counterpart of QdrantDBClient, for services that run on the event loop.
+
+    gRPC channels are bound to the loop they were created on, so `for_endpoint`
+    pools one client per endpoint and running loop; clients of closed loops are dropped.
+    """
+    _pool: Dict[EndpointKey, LoopLocal["AsyncQdrantDBClient"]] = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self,
+                 host: str,
+                 port: int = 6333,
+                 grpc_port: int = 6334,
+                 prefer_grpc: bool = False,
+                 timeout: Optional[int] = None,
+                 api_key: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.grpc_port = grpc_port
+        self.prefer_grpc = prefer_grpc
+        self.client = AsyncQdrantClient(url=host,
+                                        port=port,
+                                        grpc_port=grpc_port,
+                                        prefer_grpc=prefer_grpc,
+                                        timeout=timeout,
+                                        api_key=api_key)
+
+    @classmethod
+    def for_endpoint(cls,
+                     host: str,
+                     port: int = 6333,
+                     grpc_port: int = 6334,
+                     prefer_grpc: bool = False,
+                     **kwargs: Any) -> "AsyncQdrantDBClient":
+        key = _endpoint_key(host, port, grpc_port, prefer_grpc, **kwargs)
+        with cls._pool_lock:
+            clients = cls._pool.get(key)
+            if clients is None:
+                clients = cls._pool[key] = LoopLocal(lambda: cls(host, port=port, grpc_port=grpc_port,
+                                                                 prefer_grpc=prefer_grpc, **kwargs))
+        return clients.get()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def insert_point(self,
+                           collection_name: str,
+                           uuid: str,
+                           vector: List[float],
+                           payload: Dict
+                           ) -> UpdateResult:
+        return await self.client.upsert(
+            collection_name=collection_name,
+            points=[models.PointStruct(
+                id=str(uuid),
+                payload=payload,
+                vector=vector)
+            ]
+        )
+
+    async def query(
+            self,
+            collection_name: str,
+            vector: List[float],
+            limit: int,
+            query_filter: Optional[models.Filter] = None,
+            params: Optional[models.SearchParams] = None,
+            with_payload: Any = True,
+    ) -> List[ScoredPoint]:
+        with tracing.span("qdrant.search", collection=collection_name, limit=limit):
+            return await self.client.search(
+                collection_name=collection_name,
+                query_vector=vector,
+                limit=limit,
+                query_filter=query_filter,
+                search_params=params,
+                with_payload=with_payload,
+                **_search_timeout()
+            )
+
+    async def create_collection(self,
+                                collection_name: str,
+                                collection_size: int,
+                                config: Optional[CollectionConfig] = None) -> None:
+        config = config or CollectionConfig()
+        await self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=config.vectors_config(collection_size),
+            hnsw_config=config.hnsw_config(),
+            quantization_config=config.quantization_config(),
+        )
+        for field_name, field_schema in config.payload_indexes.items():
+            await self.create_payload_index(collection_name, field_name, field_schema)
+
+    async def create_payload_index(self,
+                                   collection_name: str,
+                                   field_name: str,
+                                   field_schema: models.PayloadSchemaType = models.PayloadSchemaType.KEYWORD
+                                   ) -> None:
+        await self.client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema
         )
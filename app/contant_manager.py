@@ -1,4 +1,7 @@
 EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_MODEL = "gpt-4o"
+FAST_MODEL = "gpt-4o-mini"
+SKILLS_COLLECTION = "skills_en"
 
 paragraph_generator = """
 You are a helpful assistant specialized in processing video scripts. You will be provided with a script, along with a list of associated objectives, skills and levels list.
@@ -107,6 +110,19 @@ quiz_note = """
     - Just write the questions as **independent**, clear, factual statements with **no source references**.
 """
 
+simplify_quiz_prompt = f"""
+You will receive one paragraph of a video script together with its skills and objectives. Complete BOTH tasks
+below from that paragraph alone and return them together: `simplify` holds the three simplified versions and
+`quiz` holds the questions. The tasks are independent — the questions are about the original paragraph, not
+about the simplified versions.
+
+########## TASK 1 — SIMPLIFY ##########
+{simplify_prompt}
+########## TASK 2 — QUESTIONS ##########
+{question_generation_prompt}
+{quiz_note}
+"""
+
 translate_quiz_prompt = """
 You are a helpful assistant specialized in translating educational content.
 Your task is to translate the quiz questions and options from English to {language}.
@@ -123,7 +139,6 @@ Ensure the original meaning and context remain intact in the translation.
 
 translate_content = """
 You are a helpful assistant specialized in translating educational content.
-Update the `start word` and `end word` fields based on the translated text.
 Your task is to translate the video and content details from English to {language}.
 Translate only the English text without making any other changes:
 - Do not modify the structure, order, or formatting of the text.
@@ -146,6 +161,18 @@ Translate only the English text without making any other changes:
 Ensure the original meaning and context remain intact in the translation.
 """
 
+translate_fields_prompt = """
+You are a helpful assistant specialized in translating educational content.
+You will receive a list of fields, each with a `path` and a `text`.
+Your task is to translate every `text` from English to {language}.
+- Return every path exactly once, unchanged, together with its translation.
+- Do not change the meaning or context of the content.
+- Do not add or remove any content.
+- Keep each translation consistent in terminology with the other fields.
+
+Ensure the original meaning and context remain intact in the translation.
+"""
+
 
 paragraph_level = [
     {"id": "E591A6CA-ED9D-41C7-BADB-FA8527B6EE94", "name": "Difficult"},
@@ -50,3 +50,8 @@ class QuizMetaData(BaseModel):
 
 class QuizResponse(BaseModel):
     quiz: List[QuizMetaData] = Field(..., description="Generated quiz for the paragraph")
+
+
+class SimplifyQuizResponse(BaseModel):
+    simplify: SimplifyResponse = Field(..., description="Simplified versions of the paragraph")
+    quiz: List[QuizMetaData] = Field(..., description="Generated quiz for the paragraph")
@@ -24,19 +24,29 @@ class QuizResults(SimplifyResults):
     quiz: List[QuizMetaData]
 
 
+class StoredQuestion(BaseModel):
+    question_id: str = Field(..., description="Stable ID of the question in the artifact store")
+    video_id: str = Field(..., description="Content hash of the video request the question was generated from")
+    language: str = Field(..., description="Language of the question")
+    prompt_version: str = Field(..., description="Hash of the generation prompt")
+    model: str = Field(..., description="Model the question was generated for")
+    created_at: float = Field(..., description="Generation time (Unix seconds)")
+    quiz: QuizMetaData
+
+
 class TranslateP1Response(ProcessedParagraph):
-    simplify1_id: str
     simplify1: str = Field(..., description="Basic explanation")
-    simplify1_first_word: str = Field(..., description="First word of the simplification")
-    simplify1_last_word: str = Field(..., description="Last word of the simplification")
 
 
 class TranslateP2Response(BaseModel):
-    simplify2_id: str
     simplify2: str = Field(..., description="More simplified explanation")
-    simplify2_first_word: str = Field(..., description="First word of the simplification")
-    simplify2_last_word: str = Field(..., description="Last word of the simplification")
-    simplify3_id: str
     simplify3: str = Field(..., description="Child-friendly explanation")
-    simplify3_first_word: str = Field(..., description="First word of the simplification")
-    simplify3_last_word: str = Field(..., description="Last word of the simplification")
+
+
+class FieldTranslation(BaseModel):
+    path: str = Field(..., description="Path of the field, returned unchanged")
+    text: str = Field(..., description="Translated text")
+
+
+class TranslateFieldsResponse(BaseModel):
+    translations: List[FieldTranslation] = Field(..., description="One translation per requested field")
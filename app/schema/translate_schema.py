@@ -0,0 +1,16 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from app.models.processing_models import QuizResults
+from app.models.translate_video_metadata import CourseWrapper
+
+
+class MultiTranslateVideoRequest(BaseModel):
+    languages: List[str] = Field(..., min_length=1, description="Target languages")
+    items: List[QuizResults] = Field(..., description="Source items, translated once per language")
+
+
+class MultiTranslateCourseRequest(BaseModel):
+    languages: List[str] = Field(..., min_length=1, description="Target languages")
+    course: CourseWrapper = Field(..., description="Source course metadata")
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.client.model_router import TASK_QUIZ_GENERATION, TASK_SEGMENTATION, TASK_SIMPLIFICATION
+from app.contant_manager import paragraph_generator, paragraph_level, question_generation_prompt, quiz_note, \
+    simplify_prompt
+from app.models.llm_response_model import QuizMetaData, QuizResponse
+from app.models.processing_models import ProcessedParagraph, SimplifyResults, StoredQuestion
+from app.schema.video_schema import MetaDataSchema, VideoRequestSchema
+from app.utils.single_flight import canonical_hash
+
+if TYPE_CHECKING:
+    from app.client.llm_client import OpenAITextProcessor
+
+KIND_PARAGRAPHS = "paragraphs"
+KIND_SIMPLIFICATION = "simplification"
+KIND_QUIZ = "quiz"
+
+# Everything that shapes a task's output besides its input; editing a prompt retires stored results.
+_PROMPTS = {
+    TASK_SEGMENTATION: (paragraph_generator, str(paragraph_level)),
+    TASK_SIMPLIFICATION: (simplify_prompt,),
+    TASK_QUIZ_GENERATION: (question_generation_prompt, quiz_note),
+}
+
+
+class ArtifactVersion(NamedTuple):
+    prompt_version: str
+    model: str
+
+
+def prompt_version(task: str) -> str:
+    return hashlib.sha256("\0".join(_PROMPTS[task]).encode("utf-8")).hexdigest()[:12]
+
+
+def artifact_version(task: str, llm_client: "OpenAITextProcessor") -> ArtifactVersion:
+    """
+    Version of `task`'s output: its prompt hash and the task's primary model. Results from a
+    latency fallback model are stored under the primary, like the request that asked for them.
+    """
+    return ArtifactVersion(prompt_version(task), llm_client.router.policy(task).model)
+
+
+def video_id(video: VideoRequestSchema) -> str:
+    return canonical_hash("video", video)
+
+
+def paragraph_hash(paragraph: str, language: str) -> str:
+    return canonical_hash("paragraph", paragraph, language)
+
+
+def _names(items: Iterable[MetaDataSchema]) -> List[str]:
+    return [item.name for item in items]
+
+
+class ArtifactStore:
+    """
+    SQLite store of generated paragraphs, simplifications and quizzes.
+
+    Each generation is a run keyed by (kind, content hash, prompt version, model) that keeps
+    the full output for reuse. Its paragraphs and questions are also stored row by row,
+    with their skills and objectives in `tags`, so question banks can be queried by video,
+    skill, objective, level, language and post_assessment.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                video_id TEXT,
+                language TEXT,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                latest INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS runs_content ON runs (kind, content_hash, latest);
+            CREATE INDEX IF NOT EXISTS runs_video ON runs (video_id, kind);
+
+            CREATE TABLE IF NOT EXISTS paragraphs (
+                paragraph_id TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                ordinal INTEGER NOT NULL,
+                paragraph_hash TEXT NOT NULL,
+                level TEXT NOT NULL,
+                language TEXT NOT NULL,
+                paragraph TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS paragraphs_video ON paragraphs (video_id, ordinal);
+            CREATE INDEX IF NOT EXISTS paragraphs_level ON paragraphs (level, language);
+            CREATE INDEX IF NOT EXISTS paragraphs_hash ON paragraphs (paragraph_hash);
+
+            CREATE TABLE IF NOT EXISTS questions (
+                question_id TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                ordinal INTEGER NOT NULL,
+                question_type TEXT NOT NULL,
+                question_level TEXT NOT NULL,
+                post_assessment INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS questions_run ON questions (run_id, ordinal);
+            CREATE INDEX IF NOT EXISTS questions_video ON questions (video_id);
+            CREATE INDEX IF NOT EXISTS questions_level ON questions (question_level, language);
+            CREATE INDEX IF NOT EXISTS questions_language ON questions (language, post_assessment);
+            CREATE INDEX IF NOT EXISTS questions_post_assessment ON questions (post_assessment);
+
+            CREATE TABLE IF NOT EXISTS tags (
+                artifact_id TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (tag, name, artifact_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS tags_artifact ON tags (artifact_id);
+        """)
+        self._conn.commit()
+
+    def get_many(self, kind: str, content_hashes: Iterable[str], version: ArtifactVersion) -> Dict[str, str]:
+        """
+        Stored output (JSON) by content hash, for the hashes generated at this version.
+        """
+        run_ids = {canonical_hash(kind, hashed, *version): hashed for hashed in content_hashes}
+        found: Dict[str, str] = {}
+        keys = list(run_ids)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT run_id, payload FROM runs WHERE run_id IN ({','.join('?' * len(chunk))})", chunk)
+                for run_id, payload in rows:
+                    found[run_ids[run_id]] = payload
+        return found
+
+    def _put_run(self, kind: str, content_hash: str, version: ArtifactVersion, payload: str,
+                 video: Optional[str], language: Optional[str]) -> str:
+        run_id = canonical_hash(kind, content_hash, *version)
+        self._conn.execute("UPDATE runs SET latest=0 WHERE kind=? AND content_hash=? AND run_id<>?",
+                           (kind, content_hash, run_id))
+        self._conn.execute("""
+            INSERT INTO runs (run_id, kind, content_hash, video_id, language, prompt_version, model,
+                              payload, latest, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (run_id) DO UPDATE SET payload=excluded.payload, latest=1, created_at=excluded.created_at
+        """, (run_id, kind, content_hash, video, language, version.prompt_version, version.model, payload,
+              time.time()))
+        return run_id
+
+    def _put_tags(self, artifact_id: str, skills: Iterable[str], objectives: Iterable[str]) -> None:
+        self._conn.execute("DELETE FROM tags WHERE artifact_id=?", (artifact_id,))
+        self._conn.executemany("INSERT OR IGNORE INTO tags (artifact_id, tag, name) VALUES (?, ?, ?)",
+                               [(artifact_id, "skill", name) for name in skills] +
+                               [(artifact_id, "objective", name) for name in objectives])
+
+    def put_paragraphs(self, video: str, language: str, version: ArtifactVersion,
+                       paragraphs: List[ProcessedParagraph]) -> None:
+        payload = json.dumps([p.model_dump(mode="json") for p in paragraphs], ensure_ascii=False)
+        with self._lock, self._conn:
+            run_id = self._put_run(KIND_PARAGRAPHS, video, version, payload, video, language)
+            self._conn.execute("DELETE FROM paragraphs WHERE run_id=?", (run_id,))
+            for ordinal, p in enumerate(paragraphs):
+                paragraph_id = canonical_hash(run_id, ordinal)[:32]
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO paragraphs
+                        (paragraph_id, run_id, video_id, ordinal, paragraph_hash, level, language, paragraph)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (paragraph_id, run_id, video, ordinal, paragraph_hash(p.paragraph, p.language),
+                      p.paragraph_level.name, p.language, p.paragraph))
+                self._put_tags(paragraph_id, _names(p.skills), _names(p.objective))
+
+    def put_simplifications(self, version: ArtifactVersion, results: List[SimplifyResults]) -> None:
+        with self._lock, self._conn:
+            for result in results:
+                self._put_run(KIND_SIMPLIFICATION, paragraph_hash(result.paragraph, result.language), version,
+                              result.model_dump_json(), None, result.language)
+
+    def put_quiz(self, video: str, language: str, version: ArtifactVersion, quiz: QuizResponse) -> None:
+        with self._lock, self._conn:
+            run_id = self._put_run(KIND_QUIZ, video, version, quiz.model_dump_json(), video, language)
+            self._conn.execute("DELETE FROM questions WHERE run_id=?", (run_id,))
+            for ordinal, question in enumerate(quiz.quiz):
+                question_id = canonical_hash(run_id, ordinal)[:32]
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO questions
+                        (question_id, run_id, video_id, ordinal, question_type, question_level,
+                         post_assessment, language, payload)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (question_id, run_id, video, ordinal, question.question_type, question.question_level,
+                      int(question.post_assessment), language, question.model_dump_json()))
+                self._put_tags(question_id, _names(question.related_skills), _names(question.related_objectives))
+
+    def questions(self,
+                  video: Optional[str] = None,
+                  skill: Optional[str] = None,
+                  objective: Optional[str] = None,
+                  level: Optional[str] = None,
+                  language: Optional[str] = None,
+                  post_assessment: Optional[bool] = None,
+                  latest: bool = True,
+                  limit: int = 100,
+                  offset: int = 0) -> List[StoredQuestion]:
+        """
+        Stored questions matching every given filter, in video and generation order. With
+        latest=True only questions from each video's most recent prompt/model version are returned.
+        """
+        clauses: List[str] = []
+        params: List[object] = []
+        for column, value in (("q.video_id", video), ("q.question_level", level), ("q.language", language)):
+            if value is not None:
+                clauses.append(f"{column}=?")
+                params.append(value)
+        if post_assessment is not None:
+            clauses.append("q.post_assessment=?")
+            params.append(int(post_assessment))
+        for tag, name in (("skill", skill), ("objective", objective)):
+            if name is not None:
+                clauses.append("q.question_id IN (SELECT artifact_id FROM tags WHERE tag=? AND name=?)")
+                params.extend((tag, name))
+        if latest:
+            clauses.append("r.latest=1")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT q.question_id, q.video_id, q.language, r.prompt_version, r.model, r.created_at, q.payload
+                FROM questions q JOIN runs r ON r.run_id = q.run_id
+                {where}
+                ORDER BY q.video_id, r.created_at, q.ordinal
+                LIMIT ? OFFSET ?
+            """, (*params, limit, offset)).fetchall()
+        return [StoredQuestion(question_id=question_id, video_id=video_id_, language=language_,
+                               prompt_version=prompt, model=model, created_at=created_at,
+                               quiz=QuizMetaData.model_validate_json(payload))
+                for question_id, video_id_, language_, prompt, model, created_at, payload in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            runs: List[Tuple[str, int]] = self._conn.execute(
+                "SELECT kind, COUNT(*) FROM runs GROUP BY kind").fetchall()
+            questions = self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        return {"runs": dict(runs), "questions": questions}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """
+    The process-wide store, or None unless ARTIFACT_STORE_PATH names its database file.
+    """
+    global _store
+    path = os.getenv("ARTIFACT_STORE_PATH")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore(path)
+        return _store
@@ -0,0 +1,202 @@
+import argparse
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from app.client.batch_client import BatchRequest, BatchRunner, chat_content, chat_request
+from app.client.llm_client import translate_quiz_messages, translate_content_payloads, translate_content_messages, \
+    merge_content_translation, translate_metadata_messages, translate_text_messages
+from app.client.model_router import ModelRouter, TASK_STRUCTURED_TRANSLATION, TASK_SHORT_TRANSLATION
+from app.client.response_formats import response_format as registered_format
+from app.models.llm_response_model import QuizResponse
+from app.models.processing_models import QuizResults, TranslateP1Response, TranslateP2Response
+from app.models.translate_video_metadata import CourseWrapper, Chapter
+from app.service.translate_service import build_translated_item, build_translated_course
+
+logger = logging.getLogger(__name__)
+
+
+class BulkCatalog(BaseModel):
+    videos: Dict[str, List[QuizResults]] = Field(
+        default_factory=dict, description="translate_video inputs keyed by catalog entry")
+    courses: Dict[str, CourseWrapper] = Field(
+        default_factory=dict, description="translate_course_meta_data inputs keyed by catalog entry")
+
+
+class BulkResult(BaseModel):
+    videos: Dict[str, Dict[str, List[QuizResults]]] = Field(
+        default_factory=dict, description="Translated videos by language, then catalog entry")
+    courses: Dict[str, Dict[str, CourseWrapper]] = Field(
+        default_factory=dict, description="Translated course metadata by language, then catalog entry")
+    failed: Dict[str, str] = Field(default_factory=dict, description="Requests that failed every attempt")
+    batch_ids: List[str] = Field(default_factory=list)
+
+
+# custom_id -> response model, or None for free-text responses
+ResponseFormats = Dict[str, Optional[type]]
+
+
+def _video_id(language: str, key: str, index: int, part: str) -> str:
+    return f"{language}|video|{key}|{index}|{part}"
+
+
+def _course_id(language: str, key: str, part: str) -> str:
+    return f"{language}|course|{key}|{part}"
+
+
+def build_video_requests(key: str, video: List[QuizResults], language: str, router: ModelRouter
+                         ) -> Tuple[List[BatchRequest], ResponseFormats]:
+    """
+    Serialize the calls translate_video makes for one catalog entry into batch requests.
+    """
+    model = router.policy(TASK_STRUCTURED_TRANSLATION).model
+    requests, formats = [], {}
+
+    def add(custom_id: str, messages: list, response_format) -> None:
+        requests.append(chat_request(custom_id, model, messages, response_format))
+        formats[custom_id] = response_format
+
+    for index, video_item in enumerate(video):
+        p1_translate, p2_translate = translate_content_payloads(video_item.model_dump(exclude={'quiz'}), language)
+        add(_video_id(language, key, index, "quiz"),
+            translate_quiz_messages(str(video_item.quiz), language), QuizResponse)
+        add(_video_id(language, key, index, "p1"),
+            translate_content_messages(p1_translate, language), TranslateP1Response)
+        add(_video_id(language, key, index, "p2"),
+            translate_content_messages(p2_translate, language), TranslateP2Response)
+    return requests, formats
+
+
+def build_course_requests(key: str, course_wrapper: CourseWrapper, language: str, router: ModelRouter
+                          ) -> Tuple[List[BatchRequest], ResponseFormats]:
+    """
+    Serialize the calls translate_course_meta_data makes for one catalog entry into batch requests.
+    """
+    course = course_wrapper.course
+    text_model = router.policy(TASK_SHORT_TRANSLATION).model
+    structured_model = router.policy(TASK_STRUCTURED_TRANSLATION).model
+
+    requests = [
+        chat_request(_course_id(language, key, "name"), text_model,
+                     translate_text_messages(course.name, language)),
+        chat_request(_course_id(language, key, "description"), text_model,
+                     translate_text_messages(course.description, language)),
+    ]
+    formats: ResponseFormats = {request.custom_id: None for request in requests}
+    for index, chapter in enumerate(course.chapters):
+        custom_id = _course_id(language, key, f"chapter{index}")
+        requests.append(chat_request(custom_id, structured_model,
+                                     translate_metadata_messages(chapter, language), Chapter))
+        formats[custom_id] = Chapter
+    return requests, formats
+
+
+def make_decoder(formats: ResponseFormats) -> Callable[[str, Dict[str, Any]], Any]:
+    def decode(custom_id: str, body: Dict[str, Any]) -> Any:
+        content = chat_content(body)
+        response_format = formats[custom_id]
+        if response_format is None:
+            return content.strip()
+        return registered_format(response_format).validate_json(content)
+
+    return decode
+
+
+def assemble_results(catalog: BulkCatalog, languages: List[str], results: Dict[str, Any]) -> BulkResult:
+    """
+    Map decoded batch results back into QuizResults / CourseWrapper objects by custom ID.
+    Catalog entries with any missing part are left out; their failures are reported separately.
+    """
+    bulk_result = BulkResult()
+    for language in languages:
+        for key, video in catalog.videos.items():
+            translated = []
+            for index, video_item in enumerate(video):
+                parts = [results.get(_video_id(language, key, index, part)) for part in ("quiz", "p1", "p2")]
+                if any(part is None for part in parts):
+                    break
+                translated_quiz, p1_response, p2_response = parts
+                translated_content = merge_content_translation(p1_response, p2_response, language)
+                translated.append(build_translated_item(video_item, translated_content, translated_quiz.quiz, language))
+            else:
+                bulk_result.videos.setdefault(language, {})[key] = translated
+
+        for key, course_wrapper in catalog.courses.items():
+            course = course_wrapper.course
+            name = results.get(_course_id(language, key, "name"))
+            description = results.get(_course_id(language, key, "description"))
+            chapters = [results.get(_course_id(language, key, f"chapter{index}"))
+                        for index in range(len(course.chapters))]
+            if name is None or description is None or any(chapter is None for chapter in chapters):
+                continue
+            bulk_result.courses.setdefault(language, {})[key] = build_translated_course(
+                course, name, description, chapters)
+    return bulk_result
+
+
+def run_bulk_translation(catalog: BulkCatalog,
+                         languages: List[str],
+                         runner: BatchRunner,
+                         router: Optional[ModelRouter] = None) -> BulkResult:
+    router = router or ModelRouter.from_env()
+    requests: List[BatchRequest] = []
+    formats: ResponseFormats = {}
+
+    for language in languages:
+        for key, video in catalog.videos.items():
+            video_requests, video_formats = build_video_requests(key, video, language, router)
+            requests.extend(video_requests)
+            formats.update(video_formats)
+        for key, course_wrapper in catalog.courses.items():
+            course_requests, course_formats = build_course_requests(key, course_wrapper, language, router)
+            requests.extend(course_requests)
+            formats.update(course_formats)
+
+    logger.info(f"Bulk translation: {len(requests)} requests for {len(languages)} language(s)")
+    outcome = runner.run(requests, make_decoder(formats))
+
+    bulk_result = assemble_results(catalog, languages, outcome.results)
+    bulk_result.failed = outcome.errors
+    bulk_result.batch_ids = outcome.batch_ids
+    logger.info(f"Bulk translation finished: {len(outcome.results)} succeeded, {len(outcome.errors)} failed")
+    return bulk_result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Translate a whole catalog through the Batch API.")
+    parser.add_argument("catalog", help="JSON file with 'videos' and/or 'courses' entries")
+    parser.add_argument("--language", action="append", required=True, help="Target language, repeatable")
+    parser.add_argument("--output", required=True, help="Where to write the translated catalog")
+    parser.add_argument("--workdir", default="batch_work", help="Directory for the JSONL batch files")
+    parser.add_argument("--poll-interval", type=float, default=60)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--local", action="store_true", help="Use the offline batch stand-in")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.local:
+        from app.client.local_batch import LocalBatchClient
+        client = LocalBatchClient()
+    else:
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    with open(args.catalog, encoding="utf-8") as f:
+        catalog = BulkCatalog.model_validate_json(f.read())
+
+    runner = BatchRunner(client, workdir=args.workdir, poll_interval=args.poll_interval,
+                         max_attempts=args.max_attempts)
+    bulk_result = run_bulk_translation(catalog, args.language, runner)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(bulk_result.model_dump_json(indent=2))
+    if bulk_result.failed:
+        logger.warning(f"{len(bulk_result.failed)} request(s) failed: {json.dumps(bulk_result.failed)[:1000]}")
+
+
+if __name__ == "__main__":
+    main()
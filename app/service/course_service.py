@@ -1,36 +1,111 @@
-import os
-import uuid
 import asyncio
+import json
 import logging
-from typing import List, Any, Coroutine
-
-from dotenv import load_dotenv
+import os
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
-from app.client.llm_client import OpenAITextProcessor
-from app.client.vector_db import QdrantDBClient
-from app.models.llm_response_model import QuizResponse
+from app.contant_manager import SKILLS_COLLECTION
+from app.client.model_router import TASK_QUIZ_GENERATION, TASK_SEGMENTATION, TASK_SIMPLIFICATION
+from app.client.provider import get_llm_client, get_scheduler, get_vectordb_client, get_async_vectordb_client
+from app.models.llm_response_model import QuizMetaData, QuizResponse, SimplifyQuizResponse, SimplifyResponse
 from app.models.processing_models import ProcessedParagraph, SimplifyResults, QuizResults
 from app.schema.video_schema import VideoRequestSchema, MetaDataSchema
+from app.service.artifact_store import ArtifactStore, ArtifactVersion, KIND_PARAGRAPHS, KIND_QUIZ, \
+    KIND_SIMPLIFICATION, artifact_version, get_artifact_store, paragraph_hash, video_id
+from app.service.semantic_cache import Probe, get_semantic_cache
+from app.utils.deadline import RequestCancelled
+from app.utils.metrics import metrics
+from app.utils.tracing import span, traced
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from app.client.llm_client import OpenAITextProcessor
+    from app.client.vector_db import AsyncQdrantDBClient, QdrantDBClient
 
-# Setup logger
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Initialize the LLM client
-llm_client = OpenAITextProcessor(os.getenv(" "), model="gpt-4o", max_workers=5)
-vectordb_client = QdrantDBClient(host=os.getenv("QDRANT_URL"), port=6333)
+FUSED_SIMPLIFY_QUIZ = os.getenv("FUSED_SIMPLIFY_QUIZ", "false").lower() in ("1", "true", "yes")
+
+
+async def _stored(store: Optional[ArtifactStore], kind: str, hashes: Iterable[str], version: ArtifactVersion,
+                  reuse: bool) -> Dict[str, str]:
+    """
+    Stored outputs for unchanged content, counting hits and misses.
+    """
+    hashes = list(hashes)
+    if store is None or not reuse:
+        return {}
+    with span("artifact_store.lookup", kind=kind):
+        stored = await asyncio.to_thread(store.get_many, kind, hashes, version)
+    metrics.increment("artifact_store_hits", len(stored), kind=kind)
+    metrics.increment("artifact_store_misses", len(set(hashes)) - len(stored), kind=kind)
+    return stored
+
+
+async def _near_duplicates(kind: str, videos: List[VideoRequestSchema], hashes: List[str],
+                           version: ArtifactVersion, llm_client: "OpenAITextProcessor",
+                           store: Optional[ArtifactStore], stored: Dict[str, str], reuse: bool) -> Dict[str, Probe]:
+    """
+    Add to `stored` the results of near-duplicate scripts for requests without an exact match.
+    Returns the semantic cache probes of the remaining requests, to index once they are generated.
+    """
+    cache = get_semantic_cache()
+    if cache is None or store is None or not reuse:
+        return {}
+    pending = {hashed: video for video, hashed in zip(videos, hashes) if hashed not in stored}
+    probes: Dict[str, Probe] = {}
+    matches: Dict[str, str] = {}
+
+    async def lookup(hashed: str, video: VideoRequestSchema) -> None:
+        try:
+            probes[hashed], match = await cache.lookup(kind, video, version, llm_client)
+        except RequestCancelled:
+            raise
+        except Exception:
+            # The cache is an optimization; a failed embedding just means generating as usual.
+            logger.exception("Semantic cache lookup failed")
+            return
+        if match is not None:
+            matches[hashed] = match
 
+    await asyncio.gather(*(lookup(hashed, video) for hashed, video in pending.items()))
+    if matches:
+        found = await asyncio.to_thread(store.get_many, kind, set(matches.values()), version)
+        for hashed, match in matches.items():
+            if match in found:
+                stored[hashed] = found[match]
+                probe = probes.pop(hashed)
+                if probe.vector is not None:
+                    # Index this wording too, so it matches without an embedding next time.
+                    cache.add(probe, match)
+        metrics.increment("semantic_cache_reused", len(matches.keys() & stored.keys()), kind=kind)
+    return probes
 
-async def get_paragraph(video: VideoRequestSchema) -> List[ProcessedParagraph]:
+
+@traced("stage.get_paragraph")
+async def get_paragraph(video: VideoRequestSchema,
+                        llm_client: Optional["OpenAITextProcessor"] = None,
+                        store: Optional[ArtifactStore] = None,
+                        reuse: bool = False) -> List[ProcessedParagraph]:
+    """
+    Split the video into paragraphs. With `reuse`, the stored split is returned when the
+    request content, prompt and model are unchanged.
+    """
+    llm_client = llm_client or get_llm_client()
+    store = store or get_artifact_store()
+    content_hash = video_id(video)
+    version = artifact_version(TASK_SEGMENTATION, llm_client)
     try:
+        stored = await _stored(store, KIND_PARAGRAPHS, [content_hash], version, reuse)
+        probes = await _near_duplicates(KIND_PARAGRAPHS, [video], [content_hash], version, llm_client,
+                                        store, stored, reuse)
+        if content_hash in stored:
+            return [ProcessedParagraph.model_validate(p) for p in json.loads(stored[content_hash])]
+
         logger.info("Generating paragraphs from video...")
-        response = await asyncio.to_thread(llm_client.get_paragraph,
-                                           objective=video.objective,
-                                           skills=video.skills,
-                                           video=video.video)
+        response = await get_scheduler().run(llm_client.get_paragraph,
+                                             objective=video.objective,
+                                             skills=video.skills,
+                                             video=video.video)
         logger.info(f"Received {len(response.paragraph)} paragraphs.")
 
         paragraph_with_id = [
@@ -43,17 +118,28 @@ async def get_paragraph(video: VideoRequestSchema) -> List[ProcessedParagraph]:
             )
             for p in response.paragraph
         ]
+        if store is not None:
+            with span("artifact_store.save", kind=KIND_PARAGRAPHS):
+                await asyncio.to_thread(store.put_paragraphs, content_hash, video.language, version,
+                                        paragraph_with_id)
+        if content_hash in probes:
+            get_semantic_cache().add(probes[content_hash], content_hash)
 
         return paragraph_with_id
     except Exception as e:
         logger.exception("Error while generating paragraphs")
         raise e
 
-def get_similar_skills(paragraph: str):
+@traced("stage.similar_skills")
+def get_similar_skills(paragraph: str,
+                       llm_client: Optional["OpenAITextProcessor"] = None,
+                       vectordb_client: Optional["QdrantDBClient"] = None):
+    llm_client = llm_client or get_llm_client()
+    vectordb_client = vectordb_client or get_vectordb_client()
     try:
         embedding = llm_client.get_embed(paragraph)
         skills_result = vectordb_client.query(
-            collection_name='skills_en',
+            collection_name=SKILLS_COLLECTION,
             vector=embedding,
             limit=1
         )
@@ -68,6 +154,26 @@ def get_similar_skills(paragraph: str):
     except Exception as e:
         raise e
 
+
+@traced("stage.similar_skills")
+async def get_similar_skills_async(paragraph: str,
+                                   llm_client: Optional["OpenAITextProcessor"] = None,
+                                   vectordb_client: Optional["AsyncQdrantDBClient"] = None):
+    llm_client = llm_client or get_llm_client()
+    vectordb_client = vectordb_client or get_async_vectordb_client()
+    embedding = await llm_client.aget_embed(paragraph)
+    skills_result = await vectordb_client.query(
+        collection_name=SKILLS_COLLECTION,
+        vector=embedding,
+        limit=1
+    )
+    for item in skills_result:
+        return MetaDataSchema(
+            name=item.payload.get('skill_en'),
+            id=item.payload.get('skill_id'),
+        )
+    return None
+
 # def get_skills(paragraph_list: List[ProcessedParagraph]):
 #     try:
 #         paragraph_list_with_skills = []
@@ -93,13 +199,28 @@ def get_similar_skills(paragraph: str):
 #         raise e
 
 
-async def simplify_paragraph_v1(paragraphs: List[ProcessedParagraph]) -> List[SimplifyResults]:
+@traced("stage.simplify")
+async def simplify_paragraph_v1(paragraphs: List[ProcessedParagraph],
+                                llm_client: Optional["OpenAITextProcessor"] = None,
+                                store: Optional[ArtifactStore] = None,
+                                reuse: bool = False) -> List[SimplifyResults]:
+    llm_client = llm_client or get_llm_client()
+    store = store or get_artifact_store()
     logger.info("Starting paragraph simplification...")
+    scheduler = get_scheduler()
+    version = artifact_version(TASK_SIMPLIFICATION, llm_client)
+    hashes = [paragraph_hash(p.paragraph, p.language) for p in paragraphs]
+    stored = await _stored(store, KIND_SIMPLIFICATION, hashes, version, reuse)
 
-    async def simplify_single(paragraph: ProcessedParagraph) -> SimplifyResults:
+    async def simplify_single(paragraph: ProcessedParagraph, hashed: str) -> SimplifyResults:
+        if hashed in stored:
+            # Simplifications depend only on the paragraph text; skills/objectives come from this paragraph.
+            result = SimplifyResults.model_validate_json(stored[hashed])
+            return result.model_copy(update={"skills": paragraph.skills, "objective": paragraph.objective,
+                                             "paragraph_level": paragraph.paragraph_level})
         try:
-            result = await asyncio.to_thread(llm_client.simplify, paragraph=paragraph.paragraph,
-                                                language=paragraph.language)
+            result = await scheduler.run(llm_client.simplify, paragraph=paragraph.paragraph,
+                                         language=paragraph.language)
             return SimplifyResults(
                 paragraph=paragraph.paragraph,
                 paragraph_level=paragraph.paragraph_level,
@@ -113,20 +234,16 @@ async def simplify_paragraph_v1(paragraphs: List[ProcessedParagraph]) -> List[Si
         except Exception as e:
             raise e
 
-    results = await asyncio.gather(*(simplify_single(p) for p in paragraphs))
-    logger.info(f"Simplified {len(results)} paragraphs.")
+    results = await asyncio.gather(*(simplify_single(p, h) for p, h in zip(paragraphs, hashes)))
+    new = [result for result, hashed in zip(results, hashes) if hashed not in stored]
+    if store is not None:
+        with span("artifact_store.save", kind=KIND_SIMPLIFICATION):
+            await asyncio.to_thread(store.put_simplifications, version, new)
+    logger.info(f"Simplified {len(results)} paragraphs ({len(results) - len(new)} reused).")
     return results
 
 
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
-from typing import List
-
-
-executor = ThreadPoolExecutor()
-
-
-def _generate_quiz_sync(paragraph: VideoRequestSchema) -> QuizResponse:
+def _generate_quiz_sync(paragraph: VideoRequestSchema, llm_client: "OpenAITextProcessor") -> QuizResponse:
     return llm_client.generate_quiz(
         skills=paragraph.skills,
         objective=paragraph.objective,
@@ -135,13 +252,110 @@ def _generate_quiz_sync(paragraph: VideoRequestSchema) -> QuizResponse:
     )
 
 
-async def generate_quiz(paragraphs: List[VideoRequestSchema]) -> List[QuizResponse]:
+@traced("stage.generate_quiz")
+async def generate_quiz(paragraphs: List[VideoRequestSchema],
+                        llm_client: Optional["OpenAITextProcessor"] = None,
+                        store: Optional[ArtifactStore] = None,
+                        reuse: bool = False) -> List[QuizResponse]:
+    """
+    Generate a quiz per request. With `reuse`, requests whose content hash, prompt and model
+    match a stored quiz return it without calling the model, as do near-duplicate scripts when
+    the semantic cache is enabled. New quizzes are recorded in the artifact store when one is
+    configured.
+    """
+    llm_client = llm_client or get_llm_client()
+    store = store or get_artifact_store()
     logger.info("Starting parallel quiz generation...")
-    loop = asyncio.get_running_loop()
+    scheduler = get_scheduler()
+    version = artifact_version(TASK_QUIZ_GENERATION, llm_client)
+    hashes = [video_id(paragraph) for paragraph in paragraphs]
+    stored = await _stored(store, KIND_QUIZ, hashes, version, reuse)
+    probes = await _near_duplicates(KIND_QUIZ, paragraphs, hashes, version, llm_client, store, stored, reuse)
+
+    async def quiz_single(paragraph: VideoRequestSchema, hashed: str) -> QuizResponse:
+        if hashed in stored:
+            return QuizResponse.model_validate_json(stored[hashed])
+        quiz = await scheduler.run(_generate_quiz_sync, paragraph, llm_client, task="generate_quiz")
+        if store is not None:
+            with span("artifact_store.save", kind=KIND_QUIZ):
+                await asyncio.to_thread(store.put_quiz, hashed, paragraph.language, version, quiz)
+        if hashed in probes:
+            get_semantic_cache().add(probes[hashed], hashed)
+        return quiz
+
+    return await asyncio.gather(*(quiz_single(p, h) for p, h in zip(paragraphs, hashes)))
+
+
+def _quiz_request(paragraph: ProcessedParagraph) -> VideoRequestSchema:
+    return VideoRequestSchema(video=paragraph.paragraph, objective=paragraph.objective,
+                              skills=paragraph.skills, language=paragraph.language)
+
+
+def fused_problems(response: Optional[SimplifyQuizResponse]) -> List[str]:
+    """
+    Reasons a fused response cannot be used; empty when it is acceptable.
+    """
+    if response is None:
+        return ["no parsed output (refusal)"]
+    problems = [f"empty {name}" for name in ("simplify1", "simplify2", "simplify3")
+                if not getattr(response.simplify, name).strip()]
+    if not response.quiz:
+        problems.append("empty quiz")
+    unanswerable = sum(1 for question in response.quiz if question.correct_answer not in question.options)
+    if unanswerable:
+        problems.append(f"{unanswerable} questions whose answer is not one of the options")
+    return problems
 
-    tasks = [
-        loop.run_in_executor(executor, _generate_quiz_sync, paragraph)
-        for paragraph in paragraphs
-    ]
-    return await asyncio.gather(*tasks)
 
+@traced("stage.simplify_quiz")
+async def simplify_and_quiz(paragraphs: List[ProcessedParagraph],
+                            llm_client: Optional["OpenAITextProcessor"] = None,
+                            fused: Optional[bool] = None) -> List[QuizResults]:
+    """
+    Simplifications and quiz for each paragraph.
+
+    With `fused` (default FUSED_SIMPLIFY_QUIZ) both come from one call per paragraph, which sends
+    the paragraph once and saves a round trip. A paragraph whose fused output fails validation
+    falls back to separate simplify and generate_quiz calls, which also run concurrently.
+    """
+    llm_client = llm_client or get_llm_client()
+    fused = FUSED_SIMPLIFY_QUIZ if fused is None else fused
+    scheduler = get_scheduler()
+
+    async def split(paragraph: ProcessedParagraph) -> Tuple[SimplifyResponse, List[QuizMetaData]]:
+        simplified, quiz = await asyncio.gather(
+            scheduler.run(llm_client.simplify, paragraph=paragraph.paragraph, language=paragraph.language),
+            scheduler.run(_generate_quiz_sync, _quiz_request(paragraph), llm_client, task="generate_quiz"),
+        )
+        return simplified, quiz.quiz
+
+    async def fused_single(paragraph: ProcessedParagraph) -> Tuple[SimplifyResponse, List[QuizMetaData]]:
+        try:
+            response = await scheduler.run(llm_client.simplify_and_quiz, paragraph=paragraph.paragraph,
+                                           skills=paragraph.skills, objective=paragraph.objective,
+                                           language=paragraph.language)
+            problems = fused_problems(response)
+        except ValueError as e:
+            problems = [str(e)]
+        if not problems:
+            metrics.increment("fused_stage_calls", result="ok")
+            return response.simplify, response.quiz
+        metrics.increment("fused_stage_calls", result="fallback")
+        logger.warning(f"Fused simplify/quiz output rejected ({'; '.join(problems)[:300]}); using split calls")
+        return await split(paragraph)
+
+    async def single(paragraph: ProcessedParagraph) -> QuizResults:
+        simplified, quiz = await (fused_single(paragraph) if fused else split(paragraph))
+        return QuizResults(
+            paragraph=paragraph.paragraph,
+            paragraph_level=paragraph.paragraph_level,
+            objective=paragraph.objective,
+            skills=paragraph.skills,
+            language=paragraph.language,
+            simplify1=simplified.simplify1,
+            simplify2=simplified.simplify2,
+            simplify3=simplified.simplify3,
+            quiz=quiz,
+        )
+
+    return await asyncio.gather(*(single(p) for p in paragraphs))
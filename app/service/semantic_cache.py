@@ -0,0 +1,190 @@
+"""
+Near-duplicate lookup for video scripts.
+
+Exact caching in the artifact store misses scripts that differ only in punctuation, a typo
+fix or a reordered sentence. This cache maps a new script to a previously processed one
+so its stored paragraphs or quiz can be reused:
+
+1. Scripts that are equal after normalization (case, punctuation, whitespace) match
+   without an embedding call.
+2. Otherwise the script is embedded and compared, by cosine similarity, with earlier
+   scripts of the same kind, language, skills, objectives and prompt/model version. The
+   nearest one matches if it is at least SEMANTIC_CACHE_MIN_SIMILARITY similar and its
+   length differs by at most SEMANTIC_CACHE_MAX_LENGTH_DIFF.
+
+The index is in-process, bounded to SEMANTIC_CACHE_MAX_ENTRIES with LRU eviction, and
+only enabled with SEMANTIC_CACHE_ENABLED=true.
+"""
+import collections
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.schema.video_schema import VideoRequestSchema
+from app.utils.metrics import metrics
+from app.utils.single_flight import canonical_hash
+from app.utils.tracing import span
+
+if TYPE_CHECKING:
+    from app.client.llm_client import OpenAITextProcessor
+    from app.service.artifact_store import ArtifactVersion
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+class Probe:
+    """
+    A looked-up script: its bucket, normalized hash and (once computed) embedding, kept so
+    a miss can be added to the index without embedding the script again.
+    """
+
+    def __init__(self, kind: str, video: VideoRequestSchema, version: "ArtifactVersion"):
+        self.context = canonical_hash(kind, video.language, video.objective, video.skills, *version)
+        self.normalized = normalize(video.video)
+        self.normalized_hash = canonical_hash(self.normalized)
+        self.length = len(self.normalized)
+        self.vector: Optional[np.ndarray] = None
+
+
+class _Entry:
+    __slots__ = ("key", "context", "normalized_hash", "content_hash", "length", "vector")
+
+    def __init__(self, key: str, context: str, normalized_hash: str, content_hash: str, length: int,
+                 vector: Optional[np.ndarray]):
+        self.key = key
+        self.context = context
+        self.normalized_hash = normalized_hash
+        self.content_hash = content_hash
+        self.length = length
+        self.vector = vector
+
+
+class SemanticCache:
+    def __init__(self, min_similarity: float = 0.97, max_length_diff: float = 0.05,
+                 max_entries: int = 5000, max_chars: int = 24000):
+        self.min_similarity = min_similarity
+        self.max_length_diff = max_length_diff
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._entries: "collections.OrderedDict[str, _Entry]" = collections.OrderedDict()
+        self._buckets: Dict[str, Dict[str, _Entry]] = collections.defaultdict(dict)
+        self._matrices: Dict[str, tuple] = {}
+
+    @classmethod
+    def from_env(cls) -> "SemanticCache":
+        return cls(min_similarity=float(os.getenv("SEMANTIC_CACHE_MIN_SIMILARITY", "0.97")),
+                   max_length_diff=float(os.getenv("SEMANTIC_CACHE_MAX_LENGTH_DIFF", "0.05")),
+                   max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000")),
+                   max_chars=int(os.getenv("SEMANTIC_CACHE_MAX_CHARS", "24000")))
+
+    def _touch(self, entry: _Entry) -> None:
+        self._entries.move_to_end(entry.key)
+
+    def _matrix(self, context: str):
+        """
+        Stacked unit vectors of a bucket, rebuilt only after the bucket changes.
+        """
+        cached = self._matrices.get(context)
+        if cached is None:
+            entries = [e for e in self._buckets.get(context, {}).values() if e.vector is not None]
+            matrix = np.stack([e.vector for e in entries]) if entries else None
+            cached = self._matrices[context] = (entries, matrix)
+        return cached
+
+    def _nearest(self, probe: Probe) -> Optional[_Entry]:
+        with self._lock:
+            entries, matrix = self._matrix(probe.context)
+            if matrix is None:
+                return None
+            similarities = matrix @ probe.vector
+            lengths = np.fromiter((e.length for e in entries), dtype=np.float64, count=len(entries))
+            length_ok = np.abs(lengths - probe.length) <= self.max_length_diff * np.maximum(lengths, probe.length)
+            similarities = np.where(length_ok, similarities, -1.0)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            metrics.observe("semantic_cache_similarity", max(similarity, 0.0))
+            if similarity < self.min_similarity:
+                return None
+            entry = entries[best]
+            self._touch(entry)
+            return entry
+
+    async def lookup(self, kind: str, video: VideoRequestSchema, version: "ArtifactVersion",
+                     llm_client: "OpenAITextProcessor") -> Tuple[Probe, Optional[str]]:
+        """
+        Content hash of a previously processed near-duplicate of `video`, or None.
+        """
+        probe = Probe(kind, video, version)
+        with self._lock:
+            entry = self._buckets.get(probe.context, {}).get(probe.normalized_hash)
+            if entry is not None:
+                self._touch(entry)
+        if entry is not None:
+            metrics.increment("semantic_cache_lookups", kind=kind, result="hit_normalized")
+            return probe, entry.content_hash
+
+        with span("semantic_cache.embed", kind=kind):
+            vector = np.asarray(await llm_client.aget_embed(probe.normalized[:self.max_chars]), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        probe.vector = vector / norm if norm else vector
+        entry = self._nearest(probe)
+        if entry is None:
+            metrics.increment("semantic_cache_lookups", kind=kind, result="miss")
+            return probe, None
+        metrics.increment("semantic_cache_lookups", kind=kind, result="hit_semantic")
+        logger.info(f"Semantic cache hit for {kind}: reusing results of {entry.content_hash[:12]}")
+        return probe, entry.content_hash
+
+    def add(self, probe: Probe, content_hash: str) -> None:
+        key = canonical_hash(probe.context, probe.normalized_hash)
+        with self._lock:
+            self._entries.pop(key, None)
+            entry = _Entry(key, probe.context, probe.normalized_hash, content_hash, probe.length, probe.vector)
+            self._entries[key] = entry
+            self._buckets[probe.context][probe.normalized_hash] = entry
+            self._matrices.pop(probe.context, None)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                bucket = self._buckets[evicted.context]
+                bucket.pop(evicted.normalized_hash, None)
+                if not bucket:
+                    del self._buckets[evicted.context]
+                self._matrices.pop(evicted.context, None)
+                metrics.increment("semantic_cache_evictions")
+            metrics.set_gauge("semantic_cache_entries", len(self._entries))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "contexts": len(self._buckets),
+                    "max_entries": self.max_entries, "min_similarity": self.min_similarity,
+                    "max_length_diff": self.max_length_diff}
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    The process-wide cache, or None unless SEMANTIC_CACHE_ENABLED is set.
+    """
+    global _cache
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache.from_env()
+        return _cache
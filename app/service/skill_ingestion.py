@@ -0,0 +1,239 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.client.provider import get_llm_client, get_vectordb_client
+from app.contant_manager import EMBEDDING_MODEL, SKILLS_COLLECTION
+
+if TYPE_CHECKING:
+    from app.client.llm_client import OpenAITextProcessor
+    from app.client.vector_db import CollectionConfig, QdrantDBClient
+
+logger = logging.getLogger(__name__)
+
+# Stable point IDs, so re-ingesting a skill overwrites its previous point.
+SKILL_NAMESPACE = uuid.UUID("6f1c4c1e-8d0a-4d4b-9a55-2f7c3c1b9e10")
+
+ID_COLUMNS = ("skill_id", "id", "skillid")
+TEXT_COLUMNS = ("skill_en", "skill", "name", "skill_name")
+
+
+class SkillRecord(BaseModel):
+    skill_id: str = Field(..., description="Taxonomy identifier of the skill")
+    skill_en: str = Field(..., description="Skill text that is embedded")
+    language: str = Field("en", description="Language of the skill text")
+    taxonomy_version: Optional[str] = Field(None, description="Taxonomy release the skill belongs to")
+
+    @property
+    def point_id(self) -> str:
+        return str(uuid.uuid5(SKILL_NAMESPACE, self.skill_id))
+
+    @property
+    def text_hash(self) -> str:
+        # The embedding model is part of the hash so switching models re-embeds everything.
+        source = f"{EMBEDDING_MODEL}\n{self.language}\n{self.taxonomy_version}\n{self.skill_en.strip()}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def payload(self) -> Dict:
+        return {
+            "skill_id": self.skill_id,
+            "skill_en": self.skill_en,
+            "language": self.language,
+            "taxonomy_version": self.taxonomy_version,
+            "text_hash": self.text_hash,
+        }
+
+
+def skills_collection_config() -> "CollectionConfig":
+    """
+    Default layout for skill collections: quantized vectors in RAM, originals on disk and
+    keyword indexes on the fields queries filter by. SKILLS_QUANTIZATION=none disables quantization.
+    """
+    from qdrant_client import models
+
+    from app.client.vector_db import CollectionConfig
+
+    quantization = os.getenv("SKILLS_QUANTIZATION", "scalar").lower()
+    return CollectionConfig(
+        quantization=None if quantization == "none" else quantization,
+        on_disk_vectors=os.getenv("SKILLS_ON_DISK", "true").lower() in ("1", "true", "yes"),
+        hnsw_m=int(os.getenv("SKILLS_HNSW_M", "16")),
+        hnsw_ef_construct=int(os.getenv("SKILLS_HNSW_EF_CONSTRUCT", "128")),
+        payload_indexes={
+            "skill_id": models.PayloadSchemaType.KEYWORD,
+            "language": models.PayloadSchemaType.KEYWORD,
+            "taxonomy_version": models.PayloadSchemaType.KEYWORD,
+        },
+    )
+
+
+class IngestionReport(BaseModel):
+    collection: str
+    total: int = 0
+    unchanged: int = 0
+    new: int = 0
+    changed: int = 0
+    deleted: int = 0
+    embed_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    delete_seconds: float = 0.0
+    total_seconds: float = 0.0
+    embeddings_per_second: float = 0.0
+    skills_per_second: float = 0.0
+
+
+def _pick(row: Dict, columns) -> Optional[str]:
+    normalized = {str(k).strip().lower(): v for k, v in row.items()}
+    for column in columns:
+        value = normalized.get(column)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def _records_from_rows(rows) -> List[SkillRecord]:
+    records: Dict[str, SkillRecord] = {}
+    for row in rows:
+        skill_id, skill_en = _pick(row, ID_COLUMNS), _pick(row, TEXT_COLUMNS)
+        if skill_id and skill_en:
+            # Later rows win when a skill ID is repeated.
+            records[skill_id] = SkillRecord(skill_id=skill_id,
+                                            skill_en=skill_en,
+                                            language=_pick(row, ("language",)) or "en",
+                                            taxonomy_version=_pick(row, ("taxonomy_version", "version")))
+    return list(records.values())
+
+
+def parse_skills(content: bytes, filename: str) -> List[SkillRecord]:
+    """
+    Parse a CSV, XLSX or JSON skills file. Rows need a skill ID column and a skill text column.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        rows = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    elif extension in (".xlsx", ".xls"):
+        import pandas as pd
+
+        rows = pd.read_excel(io.BytesIO(content), dtype=str).to_dict(orient="records")
+    elif extension == ".json":
+        data = json.loads(content)
+        rows = data.get("skills", []) if isinstance(data, dict) else data
+    else:
+        raise ValueError(f"Unsupported skills file type: {extension}")
+    return _records_from_rows(rows)
+
+
+def read_skills_file(path: str) -> List[SkillRecord]:
+    with open(path, "rb") as f:
+        return parse_skills(f.read(), path)
+
+
+def ingest_skills(skills: List[SkillRecord],
+                  llm_client: Optional["OpenAITextProcessor"] = None,
+                  vectordb_client: Optional["QdrantDBClient"] = None,
+                  collection_name: str = SKILLS_COLLECTION,
+                  embed_batch_size: int = 512,
+                  embed_concurrency: int = 4,
+                  upsert_batch_size: int = 256,
+                  delete_missing: bool = True,
+                  collection_config: Optional["CollectionConfig"] = None) -> IngestionReport:
+    """
+    Bring a collection in line with `skills`: embed only new or changed skills, upsert them in
+    bulk and delete points whose skill is no longer in the taxonomy.
+    """
+    from qdrant_client import models
+
+    llm_client = llm_client or get_llm_client()
+    vectordb_client = vectordb_client or get_vectordb_client()
+    started = time.perf_counter()
+    report = IngestionReport(collection=collection_name, total=len(skills))
+
+    existing: Dict[str, str] = {}
+    if vectordb_client.collection_exists(collection_name):
+        existing = {point_id: payload.get("text_hash")
+                    for point_id, payload in vectordb_client.iter_payloads(collection_name, fields=["text_hash"])}
+
+    pending = []
+    for skill in skills:
+        if skill.point_id not in existing:
+            report.new += 1
+            pending.append(skill)
+        elif existing[skill.point_id] != skill.text_hash:
+            report.changed += 1
+            pending.append(skill)
+        else:
+            report.unchanged += 1
+    logger.info(f"Skills: {report.new} new, {report.changed} changed, {report.unchanged} unchanged")
+
+    if pending:
+        embed_started = time.perf_counter()
+        batches = [pending[i:i + embed_batch_size] for i in range(0, len(pending), embed_batch_size)]
+        with ThreadPoolExecutor(max_workers=embed_concurrency) as pool:
+            vectors = [vector
+                       for batch_vectors in pool.map(lambda batch: llm_client.get_embeds([s.skill_en for s in batch]),
+                                                     batches)
+                       for vector in batch_vectors]
+        report.embed_seconds = time.perf_counter() - embed_started
+
+        if not vectordb_client.collection_exists(collection_name):
+            vectordb_client.create_collection(collection_name, len(vectors[0]),
+                                              config=collection_config or skills_collection_config())
+
+        upsert_started = time.perf_counter()
+        points = [
+            models.PointStruct(
+                id=skill.point_id,
+                vector=vector,
+                payload=skill.payload()
+            )
+            for skill, vector in zip(pending, vectors)
+        ]
+        vectordb_client.upsert_points(collection_name, points, batch_size=upsert_batch_size)
+        report.upsert_seconds = time.perf_counter() - upsert_started
+
+    if delete_missing and existing:
+        current = {skill.point_id for skill in skills}
+        removed = [point_id for point_id in existing if point_id not in current]
+        if removed:
+            delete_started = time.perf_counter()
+            report.deleted = vectordb_client.delete_points(collection_name, removed)
+            report.delete_seconds = time.perf_counter() - delete_started
+
+    report.total_seconds = time.perf_counter() - started
+    if report.embed_seconds:
+        report.embeddings_per_second = len(pending) / report.embed_seconds
+    if report.total_seconds:
+        report.skills_per_second = report.total / report.total_seconds
+    logger.info(f"Ingested {report.total} skills into {collection_name} in {report.total_seconds:.2f}s "
+                f"({report.new + report.changed} embedded, {report.deleted} deleted)")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load or refresh the skills collection from a taxonomy file.")
+    parser.add_argument("path", help="CSV, XLSX or JSON file with skill_id and skill_en columns")
+    parser.add_argument("--collection", default=SKILLS_COLLECTION)
+    parser.add_argument("--embed-batch-size", type=int, default=512)
+    parser.add_argument("--keep-missing", action="store_true", help="Do not delete skills absent from the file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    report = ingest_skills(read_skills_file(args.path),
+                           collection_name=args.collection,
+                           embed_batch_size=args.embed_batch_size,
+                           delete_missing=not args.keep_missing)
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
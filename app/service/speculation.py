@@ -0,0 +1,183 @@
+"""
+Speculative precomputation for uploaded course documents.
+
+Segmenting a video script into paragraphs and simplifying each paragraph take most of the
+time before a quiz can be generated. Once a document is uploaded and its skill and objective
+tags are entered, `Speculator.start` runs both steps for every detected video in the
+background while the user is still reviewing the form. Segmentation assigns the tags to
+paragraphs, so it runs with the same tags `paragraph_quizzes` uses when the user clicks
+generate, and editing a tag starts over. Results land in the artifact store, which
+`paragraph_quizzes` reads; only the quiz calls are left by then. Calls that are still in
+flight at that point are shared through the LLM client's single-flight coalescing instead
+of being made twice.
+
+Speculation runs in the bulk priority class on a background event loop. It stops after
+SPECULATIVE_MAX_CALLS LLM calls, skips documents longer than SPECULATIVE_MAX_CHARS and is
+cancelled when the document, its tags or the language change. Without an artifact store
+(ARTIFACT_STORE_PATH) there is nowhere to keep results, and nothing is precomputed.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.models.llm_response_model import QuizResponse
+from app.models.processing_models import ProcessedParagraph, SimplifyResults
+from app.schema.video_schema import MetaDataSchema, VideoRequestSchema
+from app.service.artifact_store import get_artifact_store
+from app.service.course_service import generate_quiz, get_paragraph, simplify_paragraph_v1
+from app.utils import deadline, priority
+from app.utils.metrics import metrics
+from app.utils.single_flight import canonical_hash
+
+logger = logging.getLogger(__name__)
+
+# Default of the Streamlit "precompute on upload" switch.
+SPECULATIVE_PRECOMPUTE = os.getenv("SPECULATIVE_PRECOMPUTE", "false").lower() in ("1", "true", "yes")
+
+RUNNING = "running"
+DONE = "done"
+CAPPED = "capped"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+def segmentation_request(content: str, skills: List[MetaDataSchema], objectives: List[MetaDataSchema],
+                         language: str) -> VideoRequestSchema:
+    """
+    The request a video is segmented with, both speculatively and at generation time.
+    """
+    return VideoRequestSchema(video=content, objective=objectives, skills=skills, language=language)
+
+
+async def paragraph_quizzes(content: str, skills: List[MetaDataSchema], objectives: List[MetaDataSchema],
+                            language: str) -> Tuple[List[SimplifyResults], QuizResponse]:
+    """
+    Simplified paragraphs of a video and one quiz over all of them, generated per paragraph
+    for the given tags. Segmentation and simplification come from the store when precomputed.
+    """
+    paragraphs = await get_paragraph(segmentation_request(content, skills, objectives, language), reuse=True)
+    requests = [VideoRequestSchema(video=p.paragraph, skills=skills, objective=objectives, language=language)
+                for p in paragraphs]
+    simplified, quizzes = await asyncio.gather(simplify_paragraph_v1(paragraphs, reuse=True),
+                                               generate_quiz(requests))
+    return simplified, QuizResponse(quiz=[question for quiz in quizzes for question in quiz.quiz])
+
+
+class Speculation:
+    """
+    Background precomputation of one document in one language.
+    """
+
+    def __init__(self, key: str, videos: List[Dict[str, str]], skills: List[MetaDataSchema],
+                 objectives: List[MetaDataSchema], language: str, max_calls: int):
+        self.key = key
+        self.videos = videos
+        self.skills = skills
+        self.objectives = objectives
+        self.language = language
+        self.max_calls = max_calls
+        self.calls = 0
+        self.completed = 0
+        self.status = RUNNING
+        self._token: Optional[deadline.CancelToken] = None
+        self.future: Optional[concurrent.futures.Future] = None
+
+    def _reserve(self, calls: int) -> bool:
+        if self.calls + calls > self.max_calls:
+            self.status = CAPPED
+            return False
+        self.calls += calls
+        metrics.increment("speculative_calls", calls)
+        return True
+
+    async def _video(self, content: str) -> None:
+        if not self._reserve(1):
+            return
+        paragraphs: List[ProcessedParagraph] = await get_paragraph(
+            segmentation_request(content, self.skills, self.objectives, self.language))
+        if not self._reserve(len(paragraphs)):
+            return
+        await simplify_paragraph_v1(paragraphs)
+        self.completed += 1
+
+    async def run(self) -> None:
+        with deadline.scope(None) as token, priority.scope(priority.BULK):
+            self._token = token
+            try:
+                await asyncio.gather(*(self._video(video["content"]) for video in self.videos))
+                if self.status == RUNNING:
+                    self.status = DONE
+            except (asyncio.CancelledError, deadline.RequestCancelled):
+                self.status = CANCELLED
+                raise
+            except Exception:
+                self.status = FAILED
+                logger.exception("Speculative precomputation failed")
+            finally:
+                metrics.increment("speculative_runs", result=self.status)
+                logger.info(f"Speculation {self.key[:12]} {self.status}: {self.completed}/{len(self.videos)} "
+                            f"videos, {self.calls} calls")
+
+    def cancel(self) -> None:
+        if self.status == RUNNING:
+            self.status = CANCELLED
+        if self._token is not None:
+            # Calls already handed to worker threads skip the network when they next check.
+            self._token.cancel("superseded")
+        if self.future is not None:
+            self.future.cancel()
+
+
+class Speculator:
+    def __init__(self, max_calls: int = 50, max_chars: int = 100000):
+        self.max_calls = max_calls
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "Speculator":
+        return cls(max_calls=int(os.getenv("SPECULATIVE_MAX_CALLS", "50")),
+                   max_chars=int(os.getenv("SPECULATIVE_MAX_CHARS", "100000")))
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="speculation", daemon=True).start()
+            return self._loop
+
+    def start(self, videos: List[Dict[str, str]], skills: List[MetaDataSchema], objectives: List[MetaDataSchema],
+              language: str, current: Optional[Speculation] = None) -> Optional[Speculation]:
+        """
+        Speculation for `videos` and their tags: `current` if it already covers them, otherwise a
+        new run, after cancelling `current`. None when there are no tags yet, the document is
+        over the size cap or no artifact store is configured.
+        """
+        key = canonical_hash("speculation", [video["content"] for video in videos], skills, objectives, language)
+        if current is not None:
+            if current.key == key:
+                return current
+            current.cancel()
+        if not videos or not skills or not objectives or get_artifact_store() is None:
+            return None
+        if sum(len(video["content"]) for video in videos) > self.max_chars:
+            return None
+        speculation = Speculation(key, videos, skills, objectives, language, self.max_calls)
+        speculation.future = asyncio.run_coroutine_threadsafe(speculation.run(), self._background_loop())
+        return speculation
+
+
+_speculator: Optional[Speculator] = None
+_speculator_lock = threading.Lock()
+
+
+def get_speculator() -> Speculator:
+    global _speculator
+    with _speculator_lock:
+        if _speculator is None:
+            _speculator = Speculator.from_env()
+        return _speculator
@@ -1,68 +1,47 @@
 import asyncio
-from typing import List
-from app.models.processing_models import QuizResults
-from app.models.translate_video_metadata import CourseWrapper, Course
-from app.service.course_service import llm_client
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from app.client.provider import get_llm_client, get_scheduler
+from app.models.llm_response_model import QuizMetaData
+from app.models.processing_models import QuizResults, SimplifyResults
+from app.models.translate_video_metadata import CourseWrapper, Course, Chapter
+from app.service.translation_store import TranslationKey, TranslationStore, get_translation_store, source_hash
+from app.utils.metrics import metrics
+from app.utils.tracing import span, traced
 
+if TYPE_CHECKING:
+    from app.client.llm_client import OpenAITextProcessor
 
-async def translate_video(video: List[QuizResults], language: str) -> List[QuizResults]:
-    """
-    Translate the video content to a different language.
-    """
+logger = logging.getLogger(__name__)
 
-    async def translate_single_item(video_item: QuizResults) -> QuizResults:
-        try:
-            # Run both synchronous translation calls in separate threads concurrently
-            quiz_future = asyncio.to_thread(llm_client.translate_quiz, str(video_item.quiz), language)
-            content_data = video_item.model_dump(exclude={'quiz'})
-            content_future = asyncio.to_thread(llm_client.translate_content, content_data, language)
-
-            translated_quiz, translated_content = await asyncio.gather(quiz_future, content_future)
-
-            return QuizResults(
-                video_id=video_item.video_id,
-                objective=translated_content.objective,
-                language=language,
-                paragraph_id=video_item.paragraph_id,
-                paragraph=translated_content.paragraph,
-                paragraph_level=video_item.paragraph_level,
-                start_word=translated_content.start_word,
-                end_word=translated_content.end_word,
-                skills=translated_content.skills,
-                simplify1_id=video_item.simplify1_id,
-                simplify1=translated_content.simplify1,
-                simplify1_first_word=translated_content.simplify1_first_word,
-                simplify1_last_word=translated_content.simplify1_last_word,
-                simplify2_id=video_item.simplify2_id,
-                simplify2=translated_content.simplify2,
-                simplify2_first_word=translated_content.simplify2_first_word,
-                simplify2_last_word=translated_content.simplify2_last_word,
-                simplify3_id=video_item.simplify3_id,
-                simplify3=translated_content.simplify3,
-                simplify3_first_word=translated_content.simplify3_first_word,
-                simplify3_last_word=translated_content.simplify3_last_word,
-                quiz=translated_quiz.quiz
-            )
-
-        except Exception as e:
-            raise e
-
-    return await asyncio.gather(*(translate_single_item(item) for item in video))
-
-
-async def translate_course_meta_data(process_video_request: CourseWrapper, language: str) -> CourseWrapper:
-    original_course = process_video_request.course
+TEXT_FIELDS = ("paragraph", "simplify1", "simplify2", "simplify3")
 
-    # Translate course name and description
-    translated_name = llm_client.translate_text(original_course.name, language)
-    translated_description = llm_client.translate_text(original_course.description, language)
 
-    # Translate chapters
-    translated_chapters = []
-    for chapter in original_course.chapters:
-        translated_chapter = llm_client.translate_chapter_meta(chapter, language)
-        translated_chapters.append(translated_chapter)
+def build_translated_item(video_item: QuizResults,
+                          translated_content: SimplifyResults,
+                          translated_quiz: List[QuizMetaData],
+                          language: str) -> QuizResults:
+    """
+    Combine the translated content and quiz of an item, keeping its level.
+    """
+    return QuizResults(
+        objective=translated_content.objective,
+        language=language,
+        paragraph=translated_content.paragraph,
+        paragraph_level=video_item.paragraph_level,
+        skills=translated_content.skills,
+        simplify1=translated_content.simplify1,
+        simplify2=translated_content.simplify2,
+        simplify3=translated_content.simplify3,
+        quiz=translated_quiz
+    )
 
+
+def build_translated_course(original_course: Course,
+                            translated_name: str,
+                            translated_description: str,
+                            translated_chapters: List[Chapter]) -> CourseWrapper:
     translated_course = Course(
         id=original_course.id,
         name=translated_name,
@@ -72,3 +51,250 @@ async def translate_course_meta_data(process_video_request: CourseWrapper, langu
 
     return CourseWrapper(course=translated_course)
 
+
+def _prepare_items(video: List[QuizResults]) -> List[Tuple[QuizResults, str, dict]]:
+    """
+    Serialize each source item once; the result is shared by every target language.
+    """
+    return [(item, str(item.quiz), item.model_dump(exclude={'quiz'})) for item in video]
+
+
+@traced("stage.translate_item")
+async def _translate_prepared_item(prepared: Tuple[QuizResults, str, dict], language: str,
+                                   llm_client: "OpenAITextProcessor") -> QuizResults:
+    video_item, quiz_text, content_data = prepared
+    scheduler = get_scheduler()
+    # Both translation calls for the item run concurrently through the shared scheduler
+    translated_quiz, translated_content = await asyncio.gather(
+        scheduler.run(llm_client.translate_quiz, quiz_text, language),
+        scheduler.run(llm_client.translate_content, content_data, language)
+    )
+    return build_translated_item(video_item, translated_content, translated_quiz.quiz, language)
+
+
+async def iter_translate_video_multi(video: List[QuizResults], languages: List[str],
+                                    llm_client: Optional["OpenAITextProcessor"] = None
+                                    ) -> AsyncIterator[Tuple[str, List[QuizResults]]]:
+    """
+    Translate into every language at once, yielding (language, items) as each language completes.
+    """
+    llm_client = llm_client or get_llm_client()
+    prepared = _prepare_items(video)
+
+    async def translate_language(language: str) -> Tuple[str, List[QuizResults]]:
+        with span("stage.translate_video", language=language, items=len(prepared)):
+            items = await asyncio.gather(*(_translate_prepared_item(p, language, llm_client) for p in prepared))
+        return language, list(items)
+
+    tasks = [asyncio.ensure_future(translate_language(language)) for language in dict.fromkeys(languages)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def translate_video_multi(video: List[QuizResults], languages: List[str],
+                                llm_client: Optional["OpenAITextProcessor"] = None) -> Dict[str, List[QuizResults]]:
+    results = {language: items async for language, items in iter_translate_video_multi(video, languages, llm_client)}
+    return {language: results[language] for language in dict.fromkeys(languages)}
+
+
+async def translate_video(video: List[QuizResults], language: str,
+                          llm_client: Optional["OpenAITextProcessor"] = None) -> List[QuizResults]:
+    """
+    Translate the video content to a different language.
+    """
+    return (await translate_video_multi(video, [language], llm_client))[language]
+
+
+@traced("stage.translate_course")
+async def _translate_course(original_course: Course, language: str,
+                            llm_client: "OpenAITextProcessor") -> CourseWrapper:
+    scheduler = get_scheduler()
+    translated_name, translated_description, *translated_chapters = await asyncio.gather(
+        scheduler.run(llm_client.translate_text, original_course.name, language),
+        scheduler.run(llm_client.translate_text, original_course.description, language),
+        *(scheduler.run(llm_client.translate_chapter_meta, chapter, language) for chapter in original_course.chapters)
+    )
+    return build_translated_course(original_course, translated_name, translated_description, translated_chapters)
+
+
+async def iter_translate_course_meta_multi(process_video_request: CourseWrapper, languages: List[str],
+                                           llm_client: Optional["OpenAITextProcessor"] = None
+                                           ) -> AsyncIterator[Tuple[str, CourseWrapper]]:
+    llm_client = llm_client or get_llm_client()
+    original_course = process_video_request.course
+
+    async def translate_language(language: str) -> Tuple[str, CourseWrapper]:
+        return language, await _translate_course(original_course, language, llm_client)
+
+    tasks = [asyncio.ensure_future(translate_language(language)) for language in dict.fromkeys(languages)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def translate_course_meta_multi(process_video_request: CourseWrapper, languages: List[str],
+                                      llm_client: Optional["OpenAITextProcessor"] = None) -> Dict[str, CourseWrapper]:
+    results = {language: course async for language, course
+               in iter_translate_course_meta_multi(process_video_request, languages, llm_client)}
+    return {language: results[language] for language in dict.fromkeys(languages)}
+
+
+async def translate_course_meta_data(process_video_request: CourseWrapper, language: str,
+                                     llm_client: Optional["OpenAITextProcessor"] = None) -> CourseWrapper:
+    return (await translate_course_meta_multi(process_video_request, [language], llm_client))[language]
+
+
+def translatable_fields(data: dict) -> Dict[str, str]:
+    """
+    Flatten the human-readable text of a dumped QuizResults item into {field path: text}.
+    """
+    fields = {name: data[name] for name in TEXT_FIELDS if isinstance(data.get(name), str)}
+    for group in ("objective", "skills"):
+        for i, entry in enumerate(data.get(group) or []):
+            fields[f"{group}.{i}.name"] = entry["name"]
+    for qi, question in enumerate(data.get("quiz") or []):
+        fields[f"quiz.{qi}.question"] = question["question"]
+        fields[f"quiz.{qi}.correct_answer"] = question["correct_answer"]
+        for oi, option in enumerate(question["options"]):
+            fields[f"quiz.{qi}.options.{oi}"] = option
+        for group in ("related_skills", "related_objectives"):
+            for i, entry in enumerate(question[group]):
+                fields[f"quiz.{qi}.{group}.{i}.name"] = entry["name"]
+    return {path: text for path, text in fields.items() if text and text.strip()}
+
+
+def _set_path(data: dict, path: str, value: str) -> None:
+    *parents, leaf = [int(part) if part.isdigit() else part for part in path.split(".")]
+    target = data
+    for part in parents:
+        target = target[part]
+    target[leaf] = value
+
+
+def _item_id(video_item: QuizResults, namespace: str) -> str:
+    """
+    Items are keyed by their source paragraph, so inserting or removing one leaves the others' keys intact.
+    """
+    return f"{namespace}:{source_hash(video_item.paragraph)}"
+
+
+@traced("stage.translate_fields")
+async def _translate_missing(texts: List[str], language: str, llm_client: "OpenAITextProcessor",
+                             max_fields_per_call: int) -> Dict[str, str]:
+    """
+    Translate unique source texts in chunks through the scheduler, retrying omitted ones once.
+    """
+    scheduler = get_scheduler()
+    translated: Dict[str, str] = {}
+
+    for attempt in range(2):
+        pending = [text for text in texts if text not in translated]
+        if not pending:
+            break
+        chunks = [pending[i:i + max_fields_per_call] for i in range(0, len(pending), max_fields_per_call)]
+        responses = await asyncio.gather(*(
+            scheduler.run(llm_client.translate_fields, {f"f{i}": text for i, text in enumerate(chunk)}, language)
+            for chunk in chunks
+        ))
+        for chunk, response in zip(chunks, responses):
+            for i, text in enumerate(chunk):
+                if f"f{i}" in response:
+                    translated[text] = response[f"f{i}"]
+
+    omitted = [text for text in texts if text not in translated]
+    if omitted:
+        raise ValueError(f"Translation omitted {len(omitted)} field(s)")
+    return translated
+
+
+@traced("stage.translate_video_delta")
+async def translate_video_delta(video: List[QuizResults], language: str,
+                                llm_client: Optional["OpenAITextProcessor"] = None,
+                                store: Optional[TranslationStore] = None,
+                                namespace: str = "default",
+                                max_fields_per_call: int = 60) -> List[QuizResults]:
+    """
+    Translate only fields whose source text changed since the last run for the same item,
+    reusing stored translations for everything else. Items are identified by `namespace`
+    and the hash of their source paragraph. Without a translation store (TRANSLATION_STORE_PATH)
+    every field is translated.
+    """
+    llm_client = llm_client or get_llm_client()
+    store = store or get_translation_store()
+
+    dumps = [item.model_dump() for item in video]
+    keyed: List[Dict[str, Tuple[TranslationKey, str]]] = []
+    for video_item, data in zip(video, dumps):
+        item_id = _item_id(video_item, namespace)
+        keyed.append({
+            path: ((item_id, path, source_hash(text), language), text)
+            for path, text in translatable_fields(data).items()
+        })
+
+    stored: Dict[TranslationKey, str] = {}
+    if store is not None:
+        with span("translation_store.lookup"):
+            stored = await asyncio.to_thread(store.get_many, [key for fields in keyed for key, _ in fields.values()])
+    changed = [(key, text) for fields in keyed for key, text in fields.values() if key not in stored]
+    # Identical source text across fields or items is translated once.
+    missing = list(dict.fromkeys(text for _, text in changed))
+    metrics.increment("delta_translation_fields_reused", len(stored), language=language)
+    metrics.increment("delta_translation_fields_translated", len(changed), language=language)
+    logger.info(f"Delta translation to {language}: {len(stored)} fields reused, "
+                f"{len(changed)} changed ({len(missing)} unique texts)")
+
+    translated = await _translate_missing(missing, language, llm_client, max_fields_per_call) if missing else {}
+
+    new_entries = {key: translated[text] for key, text in changed}
+    if store is not None:
+        with span("translation_store.save", entries=len(new_entries)):
+            await asyncio.to_thread(store.put_many, new_entries)
+    stored.update(new_entries)
+
+    results = []
+    with span("validate.items", items=len(dumps)):
+        for data, fields in zip(dumps, keyed):
+            for path, (key, _) in fields.items():
+                _set_path(data, path, stored[key])
+            data["language"] = language
+            results.append(QuizResults.model_validate(data))
+    return results
+
+
+async def iter_translate_video_stream(items: AsyncIterator[QuizResults], language: str,
+                                      llm_client: Optional["OpenAITextProcessor"] = None,
+                                      max_in_flight: int = 8,
+                                      delta: bool = False,
+                                      namespace: str = "default") -> AsyncIterator[QuizResults]:
+    """
+    Translate items as they arrive, yielding results in input order. At most `max_in_flight`
+    items are held at once; the source is not read further until the oldest one is yielded.
+    """
+    llm_client = llm_client or get_llm_client()
+    pending: Deque[asyncio.Future] = deque()
+
+    def translate(item: QuizResults) -> asyncio.Future:
+        if delta:
+            async def translate_delta() -> QuizResults:
+                results = await translate_video_delta([item], language, llm_client=llm_client, namespace=namespace)
+                return results[0]
+            return asyncio.ensure_future(translate_delta())
+        return asyncio.ensure_future(_translate_prepared_item(_prepare_items([item])[0], language, llm_client))
+
+    try:
+        async for item in items:
+            pending.append(translate(item))
+            if len(pending) >= max_in_flight:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+TranslationKey = Tuple[str, str, str, str]  # (item id, field path, source hash, language)
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TranslationStore:
+    """
+    SQLite-backed translation memory keyed by (item id, field path, source text hash, language).
+
+    Every distinct source text of a field gets its own row, so an edit adds a new version
+    instead of overwriting the previous translation.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS translations (
+                item_id TEXT NOT NULL,
+                field_path TEXT NOT NULL,
+                source_hash TEXT NOT NULL,
+                language TEXT NOT NULL,
+                translated_text TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (item_id, field_path, source_hash, language)
+            );
+            CREATE INDEX IF NOT EXISTS translations_latest
+                ON translations (item_id, field_path, language, version);
+        """)
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[TranslationKey]) -> Dict[TranslationKey, str]:
+        keys = list(keys)
+        found: Dict[TranslationKey, str] = {}
+        with self._lock:
+            # Bounded chunks keep the statement under SQLite's variable limit.
+            for start in range(0, len(keys), 200):
+                chunk = keys[start:start + 200]
+                clause = " OR ".join(["(item_id=? AND field_path=? AND source_hash=? AND language=?)"] * len(chunk))
+                params = [value for key in chunk for value in key]
+                rows = self._conn.execute(
+                    f"SELECT item_id, field_path, source_hash, language, translated_text "
+                    f"FROM translations WHERE {clause}", params)
+                for item_id, field_path, hashed, language, text in rows:
+                    found[(item_id, field_path, hashed, language)] = text
+        return found
+
+    def put_many(self, entries: Dict[TranslationKey, str]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            for (item_id, field_path, hashed, language), text in entries.items():
+                self._conn.execute("""
+                    INSERT INTO translations
+                        (item_id, field_path, source_hash, language, translated_text, version, created_at)
+                    VALUES (?, ?, ?, ?, ?,
+                        COALESCE((SELECT MAX(version) FROM translations
+                                  WHERE item_id=? AND field_path=? AND language=?), 0) + 1,
+                        ?)
+                    ON CONFLICT (item_id, field_path, source_hash, language)
+                    DO UPDATE SET translated_text=excluded.translated_text, created_at=excluded.created_at
+                """, (item_id, field_path, hashed, language, text, item_id, field_path, language, now))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[TranslationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_translation_store() -> Optional[TranslationStore]:
+    """
+    The process-wide store, or None unless TRANSLATION_STORE_PATH names its database file.
+    """
+    global _store
+    path = os.getenv("TRANSLATION_STORE_PATH")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = TranslationStore(path)
+        return _store
@@ -0,0 +1,310 @@
+"""
+Admission control for endpoints that fan out into many LLM calls.
+
+Each request is priced in work units before it starts: the LLM calls it will make and
+the tokens they will use, estimated from its size. Admitted work stays outstanding until
+the request finishes. The time to drain all outstanding work is estimated from the
+scheduler's capacity (LLM_MAX_CONCURRENCY slots at the observed call latency) and, if
+ADMISSION_TOKENS_PER_MINUTE is set, from the token rate. A request is admitted when the
+drain time with it included stays within ADMISSION_TARGET_SECONDS. Bulk requests only
+get ADMISSION_BULK_SHARE of that budget, which leaves headroom for interactive ones.
+
+A request that does not fit waits in a FIFO queue if the drain estimate says room should
+free up within ADMISSION_QUEUE_SECONDS. Otherwise it is rejected with `Overloaded`, which
+endpoints turn into a 429 with a Retry-After computed from the same estimate. Rejecting
+early keeps the requests already accepted inside their deadline, instead of slowing every
+request together until they all time out.
+
+A request is always admitted when nothing is outstanding, so oversized requests still run.
+The controller belongs to the API's event loop.
+"""
+import asyncio
+import collections
+import math
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, NamedTuple, \
+    Optional, Tuple
+
+from app.utils import priority as priorities
+from app.utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from app.models.processing_models import QuizResults
+    from app.models.translate_video_metadata import CourseWrapper
+    from app.schema.video_schema import VideoRequestSchema
+    from app.utils.scheduler import LLMScheduler
+
+CHARS_PER_TOKEN = 4
+# System prompt and schema tokens every call sends on top of the request's own text.
+PROMPT_OVERHEAD_TOKENS = 800
+# Characters of script per paragraph when get_paragraph splits a video.
+PARAGRAPH_CHARS = 1500
+
+
+class Work(NamedTuple):
+    calls: int
+    tokens: int
+
+    def __add__(self, other: "Work") -> "Work":
+        return Work(self.calls + other.calls, self.tokens + other.tokens)
+
+
+NO_WORK = Work(0, 0)
+
+
+def estimate(calls: int, chars: int, output_ratio: float = 1.0) -> Work:
+    """
+    `calls` LLM calls reading `chars` characters in total and writing `output_ratio` times as much.
+    """
+    text_tokens = chars / CHARS_PER_TOKEN
+    return Work(calls, int(calls * PROMPT_OVERHEAD_TOKENS + text_tokens * (1 + output_ratio)))
+
+
+def quiz_work(videos: Iterable["VideoRequestSchema"]) -> Work:
+    """
+    generate_quiz: one call per video.
+    """
+    videos = list(videos)
+    return estimate(len(videos), sum(len(v.video) for v in videos), output_ratio=0.5)
+
+
+def paragraphs_work(video: "VideoRequestSchema") -> Work:
+    """
+    get_paragraph then simplify and quiz per paragraph (two calls each, the unfused upper bound).
+    """
+    chars = len(video.video)
+    paragraphs = max(1, math.ceil(chars / PARAGRAPH_CHARS))
+    return estimate(1, chars) + estimate(2 * paragraphs, 2 * chars, output_ratio=0.75)
+
+
+def translation_work(items: Iterable["QuizResults"], languages: Iterable[str]) -> Work:
+    """
+    Two calls (quiz and content) per item and language; delta runs may need fewer.
+    """
+    items = list(items)
+    languages = list(dict.fromkeys(languages))
+    chars = sum(len(item.model_dump_json()) for item in items)
+    return estimate(2 * len(items) * len(languages), chars * len(languages))
+
+
+def course_work(course: "CourseWrapper", languages: Iterable[str]) -> Work:
+    """
+    Name, description and one call per chapter, for each language.
+    """
+    languages = list(dict.fromkeys(languages))
+    calls = (2 + len(course.course.chapters)) * len(languages)
+    return estimate(calls, len(course.model_dump_json()) * len(languages))
+
+
+class Overloaded(Exception):
+    """The request was not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, scheduler_factory: Callable[[], "LLMScheduler"],
+                 target_seconds: float = 60.0,
+                 bulk_share: float = 0.75,
+                 tokens_per_minute: float = 0.0,
+                 default_call_seconds: float = 10.0,
+                 queue_seconds: float = 5.0,
+                 max_retry_after: int = 300,
+                 enabled: bool = True):
+        self._scheduler_factory = scheduler_factory
+        self.target_seconds = target_seconds
+        self.bulk_share = min(max(bulk_share, 0.0), 1.0)
+        self.tokens_per_minute = tokens_per_minute
+        self.default_call_seconds = default_call_seconds
+        self.queue_seconds = queue_seconds
+        self.max_retry_after = max_retry_after
+        self.enabled = enabled
+        self.outstanding: Dict[str, Work] = {c: NO_WORK for c in priorities.CLASSES}
+        self._waiters: Deque[Tuple[Work, str, asyncio.Future]] = collections.deque()
+
+    @classmethod
+    def from_env(cls, scheduler_factory: Callable[[], "LLMScheduler"]) -> "AdmissionController":
+        return cls(scheduler_factory,
+                   target_seconds=float(os.getenv("ADMISSION_TARGET_SECONDS", "60")),
+                   bulk_share=float(os.getenv("ADMISSION_BULK_SHARE", "0.75")),
+                   tokens_per_minute=float(os.getenv("ADMISSION_TOKENS_PER_MINUTE", "0")),
+                   default_call_seconds=float(os.getenv("ADMISSION_CALL_SECONDS", "10")),
+                   queue_seconds=float(os.getenv("ADMISSION_QUEUE_SECONDS", "5")),
+                   max_retry_after=int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "300")),
+                   enabled=os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes"))
+
+    def _total(self) -> Work:
+        return sum(self.outstanding.values(), NO_WORK)
+
+    def drain_seconds(self, work: Work) -> float:
+        """
+        Estimated seconds for the LLM tier to get through `work`.
+        """
+        scheduler = self._scheduler_factory()
+        call_seconds = scheduler.call_seconds or self.default_call_seconds
+        seconds = work.calls * call_seconds / scheduler.max_concurrency
+        if self.tokens_per_minute > 0:
+            seconds = max(seconds, work.tokens * 60 / self.tokens_per_minute)
+        return seconds
+
+    def _budget(self, cls: str) -> float:
+        return self.target_seconds * (self.bulk_share if cls == priorities.BULK else 1.0)
+
+    def _overflow(self, work: Work, cls: str) -> float:
+        """
+        Seconds of outstanding work that must drain before `work` fits; 0 when it fits now.
+        """
+        total = self._total()
+        if total == NO_WORK:
+            return 0.0
+        return max(0.0, self.drain_seconds(total + work) - self._budget(cls))
+
+    def _grant(self, work: Work, cls: str) -> None:
+        self.outstanding[cls] += work
+        self._publish()
+
+    def _publish(self) -> None:
+        for cls, work in self.outstanding.items():
+            metrics.set_gauge("admission_outstanding_calls", work.calls, priority=cls)
+            metrics.set_gauge("admission_outstanding_tokens", work.tokens, priority=cls)
+
+    def _wake(self) -> None:
+        # FIFO: later requests wait behind the head even if they would fit.
+        while self._waiters:
+            work, cls, waiter = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if self._overflow(work, cls) > 0:
+                return
+            self._waiters.popleft()
+            self._grant(work, cls)
+            waiter.set_result(None)
+
+    def _reject(self, endpoint: str, cls: str, overflow: float) -> Overloaded:
+        retry_after = min(self.max_retry_after, max(1, math.ceil(overflow)))
+        metrics.increment("admission_decisions", endpoint=endpoint, priority=cls, result="rejected")
+        metrics.observe("admission_retry_after_seconds", retry_after, priority=cls)
+        return Overloaded(f"Server is at capacity; retry after {retry_after} seconds", retry_after)
+
+    async def acquire(self, work: Work, endpoint: str, cls: Optional[str] = None) -> str:
+        """
+        Wait until `work` is admitted and return the class it was charged to, or raise Overloaded.
+        """
+        cls = cls or priorities.current()
+        if not self.enabled:
+            self._grant(work, cls)
+            return cls
+        # Requests already queued go first, so they count towards this one's wait.
+        queued = sum((w for w, _, waiter in self._waiters if not waiter.done()), NO_WORK)
+        overflow = self._overflow(work + queued, cls)
+        if overflow == 0 and not self._waiters:
+            self._grant(work, cls)
+            metrics.increment("admission_decisions", endpoint=endpoint, priority=cls, result="admitted")
+            return cls
+        if overflow > self.queue_seconds:
+            raise self._reject(endpoint, cls, overflow)
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (work, cls, waiter)
+        self._waiters.append(entry)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_seconds)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                raise self._reject(endpoint, cls, self._overflow(work, cls))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted in the same tick we were cancelled; give it back.
+                self.release(work, cls)
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if entry in self._waiters and waiter.done():
+                # Gave up while queued; whoever was behind may fit now.
+                self._waiters.remove(entry)
+                self._wake()
+            metrics.observe("admission_queue_seconds", time.perf_counter() - started, priority=cls)
+        metrics.increment("admission_decisions", endpoint=endpoint, priority=cls, result="queued")
+        return cls
+
+    def release(self, work: Work, cls: str) -> None:
+        self.outstanding[cls] = Work(max(0, self.outstanding[cls].calls - work.calls),
+                                     max(0, self.outstanding[cls].tokens - work.tokens))
+        self._publish()
+        self._wake()
+
+    async def run(self, work: Work, endpoint: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Admit `work`, then await `factory()` while it counts as outstanding.
+        """
+        cls = await self.acquire(work, endpoint)
+        try:
+            return await factory()
+        finally:
+            self.release(work, cls)
+
+    def hold(self, work: Work, cls: str, iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """
+        Wrap a streaming body admitted with `acquire` so `work` is released when the stream
+        ends, fails or is dropped before it was ever iterated (e.g. the client went away).
+        """
+        loop = asyncio.get_running_loop()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release(work, cls)
+
+        def release_soon() -> None:
+            try:
+                loop.call_soon_threadsafe(release)
+            except RuntimeError:
+                pass  # Loop closed; nothing is left to admit.
+
+        async def held() -> AsyncIterator[Any]:
+            try:
+                async for item in iterator:
+                    yield item
+            finally:
+                release()
+
+        stream = held()
+        weakref.finalize(stream, release_soon)
+        return stream
+
+    def stats(self) -> dict:
+        total = self._total()
+        scheduler = self._scheduler_factory()
+        return {"enabled": self.enabled,
+                "target_seconds": self.target_seconds,
+                "bulk_share": self.bulk_share,
+                "tokens_per_minute": self.tokens_per_minute,
+                "call_seconds": scheduler.call_seconds or self.default_call_seconds,
+                "drain_seconds": self.drain_seconds(total),
+                "waiting": sum(1 for _, _, waiter in self._waiters if not waiter.done()),
+                "outstanding": {c: work._asdict() for c, work in self.outstanding.items()}}
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            from app.client.provider import get_scheduler
+
+            _controller = AdmissionController.from_env(get_scheduler)
+        return _controller
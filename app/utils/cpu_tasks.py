@@ -0,0 +1,88 @@
+"""
+CPU-bound tasks for the process pool (app.utils.process_pool).
+
+Everything here is a module-level function over picklable payloads, and heavy libraries are
+imported inside the functions, so a spawned worker only pays for what it runs.
+"""
+import io
+import re
+from typing import Any, Dict, List, Union
+
+VIDEO_TITLE = re.compile(r'(Video\s+\d+)')  # Matches "Video 1", "Video 2", etc.
+SECTION_START = re.compile(r'^\s*Video\s+\S+', flags=re.MULTILINE)
+
+# Column-oriented frame: Arrow IPC stream bytes when pyarrow is installed, else {column: values}.
+FramePayload = Union[bytes, Dict[str, List[Any]]]
+
+
+def docx_text(data: bytes) -> str:
+    from docx import Document
+
+    doc = Document(io.BytesIO(data))
+    return '\n'.join(para.text for para in doc.paragraphs)
+
+
+def split_sections(text: str) -> List[str]:
+    """
+    Sections of a document, split at lines starting with "Video <name>".
+    """
+    return [s.strip() for s in SECTION_START.split(text) if s.strip()]
+
+
+def docx_sections(data: bytes) -> List[str]:
+    return split_sections(docx_text(data))
+
+
+def split_videos(text: str) -> List[Dict[str, str]]:
+    """
+    {"title", "content"} per "Video <n>" heading in the text.
+    """
+    splits = VIDEO_TITLE.split(text)
+    return [{"title": splits[i].strip(), "content": splits[i + 1].strip() if i + 1 < len(splits) else ""}
+            for i in range(1, len(splits), 2)]
+
+
+def docx_videos(data: bytes) -> List[Dict[str, str]]:
+    return split_videos(docx_text(data))
+
+
+def frame_payload(df) -> FramePayload:
+    """
+    Compact, picklable form of a DataFrame to send to a worker.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return df.to_dict("list")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_payload(payload: FramePayload):
+    import pandas as pd
+
+    if isinstance(payload, bytes):
+        import pyarrow as pa
+
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    return pd.DataFrame(payload)
+
+
+def excel_bytes(payload: FramePayload, sheet_name: str = 'Quiz_Data', max_width: int = 50) -> bytes:
+    """
+    .xlsx file of the frame, with each column sized to its longest value.
+    """
+    import pandas as pd
+
+    df = frame_from_payload(payload)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+        worksheet = writer.sheets[sheet_name]
+        for column in worksheet.columns:
+            longest = max((len(str(cell.value)) for cell in column if cell.value is not None), default=0)
+            worksheet.column_dimensions[column[0].column_letter].width = min(longest + 2, max_width)
+    return output.getvalue()
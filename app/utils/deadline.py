@@ -0,0 +1,216 @@
+"""
+Per-request deadlines and cancellation.
+
+The current request's CancelToken lives in a context variable, so it follows work into
+executor threads (asyncio.to_thread and LLMScheduler.run copy the context). Blocking
+clients call `request_options`/`timeout` right before each network call: a cancelled or
+expired request skips the call, otherwise the remaining budget becomes the call timeout.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.utils.metrics import metrics
+
+TIMEOUT_HEADER = b"x-request-timeout"
+
+
+class RequestCancelled(Exception):
+    """The request this work belongs to was cancelled."""
+
+
+class DeadlineExceeded(RequestCancelled, TimeoutError):
+    """The request ran out of time."""
+
+
+class CancelToken:
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+
+_current: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("request_cancel_token", default=None)
+
+
+def current() -> Optional[CancelToken]:
+    return _current.get()
+
+
+@contextmanager
+def scope(seconds: Optional[float]) -> Iterator[CancelToken]:
+    """
+    Run the block as a request with `seconds` of budget (None for no deadline).
+    """
+    token = CancelToken(None if seconds is None else time.monotonic() + seconds)
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def fork() -> CancelToken:
+    """
+    Give the current context its own token with the same deadline, so work shared between
+    requests is not cancelled when only the request that started it goes away.
+    """
+    parent = _current.get()
+    token = CancelToken(parent.deadline if parent else None)
+    _current.set(token)
+    return token
+
+
+def remaining() -> Optional[float]:
+    token = _current.get()
+    return token.remaining() if token else None
+
+
+def check(operation: str, cost: float = 0) -> None:
+    """
+    Raise if the current request was cancelled or is past its deadline, counting the skipped
+    call and its estimated cost (e.g. prompt characters) as saved work.
+    """
+    token = _current.get()
+    if token is None:
+        return
+    reason = token.reason if token.cancelled else None
+    if reason is None and token.deadline is not None and token.remaining() <= 0:
+        reason = "deadline"
+    if reason is None:
+        return
+    metrics.increment("cancelled_calls", operation=operation, reason=reason)
+    if cost:
+        metrics.increment("cancelled_work_saved", cost, operation=operation)
+    if reason == "deadline":
+        raise DeadlineExceeded(f"Request deadline exceeded before {operation}")
+    raise RequestCancelled(f"Request {reason} before {operation}")
+
+
+def timeout(operation: str, cost: float = 0) -> Optional[float]:
+    """
+    Check the request and return the seconds left for the next call, or None without a deadline.
+    """
+    check(operation, cost)
+    return remaining()
+
+
+def request_options(operation: str, cost: float = 0) -> dict:
+    """
+    Per-call SDK options carrying the remaining budget as `timeout`; empty without a deadline.
+    """
+    seconds = timeout(operation, cost)
+    return {} if seconds is None else {"timeout": seconds}
+
+
+def parse_timeout(value: Optional[str], default: float, maximum: float) -> float:
+    try:
+        seconds = float(value) if value else default
+    except ValueError:
+        seconds = default
+    return min(seconds, maximum) if seconds > 0 else default
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving every HTTP request a deadline, from the X-Request-Timeout header
+    (seconds) or REQUEST_TIMEOUT_SECONDS. The deadline bounds the time to the response
+    headers: the handler is cancelled with a 504 if it has not started a response by then,
+    and once it has, the deadline is lifted so streaming bodies run to completion. The
+    handler is cancelled whenever the client disconnects.
+
+    The app reads the request body from `receive` itself, at its own pace, so handlers that
+    stream the body keep their backpressure. Only after the last body message does the
+    middleware take over `receive` and forward messages to the app, so it sees the
+    disconnect without competing with handlers that also listen for it. A disconnect that
+    arrives while the body is being read is seen on the way through.
+    """
+
+    def __init__(self, app, default_timeout: Optional[float] = None, max_timeout: Optional[float] = None):
+        self.app = app
+        self.default_timeout = default_timeout or float(os.getenv("REQUEST_TIMEOUT_SECONDS", "300"))
+        self.max_timeout = max_timeout or float(os.getenv("REQUEST_MAX_TIMEOUT_SECONDS", "900"))
+
+    async def __call__(self, scope_, receive, send):
+        if scope_["type"] != "http":
+            return await self.app(scope_, receive, send)
+
+        header = dict(scope_.get("headers") or []).get(TIMEOUT_HEADER)
+        seconds = parse_timeout(header.decode("latin-1") if header else None, self.default_timeout, self.max_timeout)
+        messages: asyncio.Queue = asyncio.Queue()
+        body_read = asyncio.Event()
+        disconnected = False
+        started = False
+
+        async def app_receive():
+            nonlocal disconnected
+            if body_read.is_set():
+                return await messages.get()
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected = True
+                body_read.set()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def pump() -> None:
+            await body_read.wait()
+            if disconnected:
+                return
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def tracked_send(message) -> None:
+            nonlocal started
+            if not started and message["type"] == "http.response.start":
+                started = True
+                # Headers are out: work feeding the body is no longer on the clock.
+                token.deadline = None
+            await send(message)
+
+        with scope(seconds) as token:
+            handler = asyncio.ensure_future(self.app(scope_, app_receive, tracked_send))
+            listener = asyncio.ensure_future(pump())
+            try:
+                done, _ = await asyncio.wait({handler, listener}, timeout=seconds,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done and started:
+                    done, _ = await asyncio.wait({handler, listener}, return_when=asyncio.FIRST_COMPLETED)
+                if handler in done:
+                    return handler.result()
+                reason = "disconnect" if listener in done else "deadline"
+                token.cancel(reason)
+                handler.cancel()
+                await asyncio.gather(handler, return_exceptions=True)
+                metrics.increment("requests_cancelled", reason=reason, path=scope_.get("path", ""))
+                if reason == "deadline" and not started:
+                    body = json.dumps({"detail": f"Request exceeded its {seconds:g}s deadline"}).encode()
+                    await send({"type": "http.response.start", "status": 504,
+                                "headers": [(b"content-type", b"application/json"),
+                                            (b"content-length", str(len(body)).encode())]})
+                    await send({"type": "http.response.body", "body": body})
+            finally:
+                listener.cancel()
+                if not handler.done():
+                    handler.cancel()
@@ -0,0 +1,53 @@
+"""
+Values bound to the event loop they were created on.
+
+Async clients pool connections (or gRPC channels) that only work on the loop that opened
+them. Streamlit runs every click in a fresh `asyncio.run` loop and speculation runs on a
+loop of its own, so such clients are kept one per loop. Entries are keyed by the loop
+object, never its id, so a new loop cannot pick up a dead one's client. Entries of loops
+that have been closed are dropped whenever a value for another loop is created; their
+connections cannot be closed from a loop that is gone, so they are left to the GC.
+"""
+import asyncio
+import threading
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LoopLocal(Generic[T]):
+    """
+    One value per running event loop (plus one for code outside any loop), built on first use.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._values: Dict[Optional[asyncio.AbstractEventLoop], T] = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        loop = running_loop()
+        with self._lock:
+            value = self._values.get(loop)
+            if value is None:
+                for closed in [other for other in self._values if other is not None and other.is_closed()]:
+                    del self._values[closed]
+                value = self._values[loop] = self._factory()
+            return value
+
+    def current(self) -> Optional[T]:
+        """
+        The running loop's value if it has been built, without building it.
+        """
+        return self._values.get(running_loop())
+
+    def values(self) -> List[T]:
+        with self._lock:
+            return list(self._values.values())
@@ -0,0 +1,40 @@
+from typing import AsyncIterator, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = 8 * 2 ** 20) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Split a byte stream into (line number, line) pairs, skipping blank lines. Only the
+    current partial line is buffered.
+    """
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"Line {number + 1} is longer than {max_line_bytes} bytes")
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for endpoints that keep reading the request body while responding.
+
+    The stock response listens for a disconnect by calling receive(), which would steal body
+    chunks from the handler. DeadlineMiddleware already cancels the handler on disconnect.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,76 @@
+"""
+Request priority classes for LLM work.
+
+Interactive work (the Streamlit editor, a single video's quiz) and bulk work (multi-language
+translation batches) share one LLMScheduler. The class of the current request lives in a
+context variable, like the request deadline, so it follows work into tasks and executor
+threads. HTTP callers set it with the X-Priority header; code sets it with `scope` or by
+passing `priority=` to `LLMScheduler.run`.
+"""
+import contextvars
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+CLASSES = (INTERACTIVE, BULK)
+
+PRIORITY_HEADER = b"x-priority"
+
+_current: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_priority", default=None)
+
+
+def parse(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip().lower()
+    return value if value in CLASSES else None
+
+
+DEFAULT_PRIORITY = parse(os.getenv("DEFAULT_REQUEST_PRIORITY")) or INTERACTIVE
+
+
+def current() -> str:
+    return _current.get() or DEFAULT_PRIORITY
+
+
+@contextmanager
+def scope(priority: str) -> Iterator[str]:
+    """
+    Run the block, and the LLM calls it schedules, in the given class.
+    """
+    if priority not in CLASSES:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {CLASSES}")
+    reset = _current.set(priority)
+    try:
+        yield priority
+    finally:
+        _current.reset(reset)
+
+
+def prefer(priority: str) -> None:
+    """
+    Use `priority` for the rest of the current task unless the caller already chose a class.
+    Endpoints that are bulk by nature call this so X-Priority can still override them.
+    """
+    if _current.get() is None:
+        _current.set(priority)
+
+
+class PriorityMiddleware:
+    """
+    ASGI middleware that runs each request in the class named by its X-Priority header.
+    Missing or unknown values leave the class unset, so `prefer` and DEFAULT_REQUEST_PRIORITY apply.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope_, receive, send):
+        if scope_["type"] != "http":
+            return await self.app(scope_, receive, send)
+        header = dict(scope_.get("headers") or []).get(PRIORITY_HEADER)
+        priority = parse(header.decode("latin-1") if header else None)
+        if priority is None:
+            return await self.app(scope_, receive, send)
+        with scope(priority):
+            await self.app(scope_, receive, send)
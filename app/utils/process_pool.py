@@ -0,0 +1,94 @@
+"""
+Process pool for CPU-bound steps (document parsing, Excel export, large dumps).
+
+Work that holds the GIL for long stalls the event loop, or every other Streamlit session,
+even from a thread. These steps run in worker processes instead. Task functions live at
+module level (see app.utils.cpu_tasks) and take compact, picklable payloads: bytes, dicts
+of columns or Arrow IPC buffers rather than pydantic models or file objects.
+
+PROCESS_POOL_WORKERS sets the pool size (0 runs tasks inline, in a thread for `run_cpu`).
+Workers are started with PROCESS_POOL_START_METHOD (spawn by default, since forking a
+process that already runs threads is unsafe) and replaced after MAX_TASKS_PER_CHILD tasks.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.utils.metrics import metrics
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pid: Optional[int] = None
+
+
+def pool_size() -> int:
+    return int(os.getenv("PROCESS_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    The process-wide pool, created on first use; None when PROCESS_POOL_WORKERS=0.
+    """
+    global _pool, _pid
+    with _lock:
+        if _pid != os.getpid():
+            # A pool inherited through fork belongs to the parent.
+            _pool, _pid = None, os.getpid()
+        if _pool is not None and getattr(_pool, "_broken", False):
+            # A worker died (e.g. killed for memory); the pool refuses new work, so start over.
+            metrics.increment("process_pool_restarts")
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None and pool_size() > 0:
+            context = multiprocessing.get_context(os.getenv("PROCESS_POOL_START_METHOD", "spawn"))
+            max_tasks = int(os.getenv("PROCESS_POOL_MAX_TASKS_PER_CHILD", "0")) or None
+            _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=context,
+                                        max_tasks_per_child=max_tasks)
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _lock:
+        if _pool is not None and _pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _label(fn: Callable, task: Optional[str]) -> str:
+    return task or getattr(fn, "__name__", "task")
+
+
+def run_sync(fn: Callable[..., Any], *args: Any, task: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Run `fn` in the pool and wait for it, for synchronous callers such as Streamlit.
+    """
+    label = _label(fn, task)
+    pool = get_process_pool()
+    start = time.perf_counter()
+    try:
+        if pool is None:
+            return fn(*args, **kwargs)
+        return pool.submit(fn, *args, **kwargs).result()
+    finally:
+        metrics.observe("process_pool_seconds", time.perf_counter() - start, task=label)
+
+
+async def run_cpu(fn: Callable[..., Any], *args: Any, task: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Run `fn` in the pool without blocking the event loop.
+    """
+    label = _label(fn, task)
+    pool = get_process_pool()
+    start = time.perf_counter()
+    try:
+        if pool is None:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+    finally:
+        metrics.observe("process_pool_seconds", time.perf_counter() - start, task=label)
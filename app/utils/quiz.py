@@ -1,5 +1,17 @@
+import functools
+import os
 import uuid
 from copy import copy
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from pydantic import TypeAdapter
+
+OUTPUTS = ("dicts", "models", "columns", "arrow")
+
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+# Where the 32 hex digits of a UUID go in its 36-character form.
+_UUID_GROUPS = ((0, 8, 0), (8, 12, 9), (12, 16, 14), (16, 20, 19), (20, 32, 24))
 
 
 def process_answers(answers, correct_id, new_correct_id, question_id):
@@ -41,3 +53,153 @@ def process_quiz_questions(quiz, paragraph_id):
         dumped["paragraph_id"] = paragraph_id
         quiz_with_paragraph_id.append(dumped)
     return quiz_with_paragraph_id
+
+
+def uuid4_batch(count: int) -> List[str]:
+    """
+    `count` random (version 4) UUID strings, formatted together instead of one uuid4() at a time.
+    """
+    if count <= 0:
+        return []
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    digits = np.empty((count, 32), dtype=np.uint8)
+    digits[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    digits[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+    text = np.full((count, 36), ord("-"), dtype=np.uint8)
+    for start, end, at in _UUID_GROUPS:
+        text[:, at:at + end - start] = digits[:, start:end]
+    joined = text.tobytes().decode("ascii")
+    return [joined[i:i + 36] for i in range(0, 36 * count, 36)]
+
+
+@functools.lru_cache(maxsize=None)
+def _list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+class _Columns:
+    """
+    Flat view of a batch of quizzes: one row per question (alternatives included, pointing
+    at their parent) and one per answer, pointing at its question.
+    """
+
+    def __init__(self, quizzes: Sequence[Sequence[Any]], paragraph_ids: Sequence[str], as_dicts: bool):
+        get = dict.__getitem__ if as_dicts else getattr
+        self.questions: List[Any] = []
+        self.parent: List[int] = []
+        self.paragraph: List[int] = []
+        self.position: List[int] = []
+        self.old_correct: List[Any] = []
+        self.answers: List[Any] = []
+        self.answer_question: List[int] = []
+        self.old_answer: List[Any] = []
+
+        def add(question: Any, parent: int, paragraph: int, position: int) -> int:
+            row = len(self.questions)
+            self.questions.append(question)
+            self.parent.append(parent)
+            self.paragraph.append(paragraph)
+            self.position.append(position)
+            self.old_correct.append(get(question, "correct_answer_id"))
+            for answer in get(question, "answer"):
+                self.answers.append(answer)
+                self.answer_question.append(row)
+                self.old_answer.append(get(answer, "answer_id"))
+            return row
+
+        for paragraph, quiz in enumerate(quizzes):
+            for position, question in enumerate(quiz):
+                row = add(question, -1, paragraph, position)
+                for alt_position, alternative in enumerate(get(question, "alternative_questions")):
+                    add(alternative, row, paragraph, alt_position)
+
+        # New IDs for every question and correct answer; an answer keeps the correct-answer ID
+        # if it was the correct one, as process_answers does, and gets a fresh ID otherwise.
+        self.question_ids = np.array(uuid4_batch(len(self.questions)), dtype=object)
+        self.correct_ids = np.array(uuid4_batch(len(self.questions)), dtype=object)
+        rows = np.asarray(self.answer_question, dtype=np.intp)
+        old_answer = np.empty(len(self.answers), dtype=object)
+        old_answer[:] = self.old_answer
+        old_correct = np.empty(len(self.questions), dtype=object)
+        old_correct[:] = self.old_correct
+        self.is_correct = (old_answer == old_correct[rows]) if len(rows) else np.zeros(0, dtype=bool)
+        self.answer_ids = np.empty(len(self.answers), dtype=object)
+        self.answer_ids[self.is_correct] = self.correct_ids[rows[self.is_correct]]
+        self.answer_ids[~self.is_correct] = uuid4_batch(int((~self.is_correct).sum()))
+        self.answer_question_ids = self.question_ids[rows] if len(rows) else np.empty(0, dtype=object)
+        self.paragraph_ids = [paragraph_ids[p] for p in self.paragraph]
+
+    def write(self, as_dicts: bool) -> None:
+        """
+        Set the new IDs on the questions, answers and skills, and paragraph_id on top-level dicts.
+        """
+        set_ = dict.__setitem__ if as_dicts else setattr
+        get = dict.__getitem__ if as_dicts else getattr
+        for question, question_id, correct_id, parent, paragraph_id in zip(
+                self.questions, self.question_ids, self.correct_ids, self.parent, self.paragraph_ids):
+            set_(question, "question_id", question_id)
+            set_(question, "correct_answer_id", correct_id)
+            if parent < 0:
+                for skill in get(question, "question_skills_and_objective"):
+                    set_(skill, "question_id", question_id)
+                if as_dicts:
+                    question["paragraph_id"] = paragraph_id
+        for answer, answer_id, question_id in zip(self.answers, self.answer_ids, self.answer_question_ids):
+            set_(answer, "answer_id", answer_id)
+            set_(answer, "question_id", question_id)
+
+    def batches(self) -> Dict[str, Dict[str, list]]:
+        question_ids = self.question_ids.tolist()
+        return {
+            "questions": {
+                "question_id": question_ids,
+                "parent_question_id": [question_ids[p] if p >= 0 else None for p in self.parent],
+                "paragraph_id": self.paragraph_ids,
+                "position": self.position,
+                "correct_answer_id": self.correct_ids.tolist(),
+            },
+            "answers": {
+                "answer_id": self.answer_ids.tolist(),
+                "question_id": self.answer_question_ids.tolist(),
+                "is_correct": self.is_correct.tolist(),
+            },
+        }
+
+
+def process_quiz_batch(quizzes: Sequence[Sequence[Any]], paragraph_ids: Sequence[str], output: str = "dicts"):
+    """
+    process_quiz_questions for many paragraphs at once: quizzes[i] belongs to paragraph_ids[i].
+
+    Questions may be models or dicts of the same shape. IDs are generated in bulk and rewired
+    over a flat, columnar view of all questions, alternatives and answers. Models are dumped
+    in one call per type instead of once per question. `output` selects the result:
+
+    - "dicts": top-level question dicts with new IDs and paragraph_id, like process_quiz_questions.
+      Dict input is updated in place; model input is left unchanged.
+    - "models": the input models (or dicts), updated in place, without paragraph_id.
+    - "columns": {"questions": {...}, "answers": {...}} lists of IDs and relations. The input is
+      not touched; rows follow input order, alternatives right after their question.
+    - "arrow": the same tables as pyarrow Tables.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output {output!r}; expected one of {OUTPUTS}")
+    if len(quizzes) != len(paragraph_ids):
+        raise ValueError("quizzes and paragraph_ids differ in length")
+
+    if output == "dicts":
+        quizzes = [quiz if not quiz or isinstance(quiz[0], dict) else _list_adapter(type(quiz[0])).dump_python(quiz)
+                   for quiz in quizzes]
+    as_dicts = any(quiz and isinstance(quiz[0], dict) for quiz in quizzes)
+    columns = _Columns(quizzes, paragraph_ids, as_dicts)
+
+    if output in ("dicts", "models"):
+        columns.write(as_dicts)
+        return [question for quiz in quizzes for question in quiz]
+    batches = columns.batches()
+    if output == "columns":
+        return batches
+    import pyarrow as pa
+
+    return {name: pa.table(table) for name, table in batches.items()}
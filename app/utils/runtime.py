@@ -0,0 +1,61 @@
+import asyncio
+import os
+import resource
+import threading
+import time
+from typing import Optional
+
+from app.utils.metrics import metrics
+
+
+def rss_bytes() -> int:
+    """
+    Current resident set size; falls back to the peak where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def process_stats() -> dict:
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "threads": threading.active_count(),
+        "cpu_seconds": time.process_time(),
+    }
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a short sleep. Sustained lag means
+    something is blocking the loop and every request on this worker waits for it.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            metrics.observe("event_loop_lag_seconds", lag)
+            metrics.set_gauge("event_loop_lag_seconds", lag)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+loop_lag = LoopLagMonitor()
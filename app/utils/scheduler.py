@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import contextvars
+import functools
+import threading
+import time
+import weakref
+from concurrent.futures import Executor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app.utils import deadline, priority as priorities, tracing
+from app.utils.metrics import metrics
+
+
+class _PriorityGate:
+    """
+    Concurrency slots for one event loop, handed out by class.
+
+    Free slots go to the waiting class with the lowest pass (stride scheduling), so under
+    contention classes are served in proportion to their weights. Bulk work never holds the
+    slots reserved for interactive work, and a bulk call that has waited longer than
+    `aging_seconds` is served next regardless of weights, so neither class starves.
+    """
+
+    def __init__(self, scheduler: "LLMScheduler"):
+        self.scheduler = scheduler
+        self.queues: Dict[str, Deque[Tuple[float, asyncio.Future]]] = {c: collections.deque() for c in priorities.CLASSES}
+        self.running: Dict[str, int] = {c: 0 for c in priorities.CLASSES}
+        self.passes: Dict[str, float] = {c: 0.0 for c in priorities.CLASSES}
+        self.clock = 0.0
+
+    def _has_room(self, cls: str) -> bool:
+        return sum(self.running.values()) < self.scheduler.max_concurrency \
+            and self.running[cls] < self.scheduler.limits[cls]
+
+    def _grant(self, cls: str) -> None:
+        self.running[cls] += 1
+        self.clock = self.passes[cls]
+        self.passes[cls] += 1 / self.scheduler.weights[cls]
+
+    def _next_class(self) -> Optional[str]:
+        eligible = [c for c in priorities.CLASSES if self.queues[c] and self._has_room(c)]
+        if not eligible:
+            return None
+        now = time.perf_counter()
+        aged = [c for c in eligible if now - self.queues[c][0][0] >= self.scheduler.aging_seconds]
+        if aged:
+            cls = min(aged, key=lambda c: self.queues[c][0][0])
+            if cls != priorities.INTERACTIVE:
+                metrics.increment("scheduler_aged_grants", priority=cls)
+            return cls
+        return min(eligible, key=lambda c: self.passes[c])
+
+    def _dispatch(self) -> None:
+        while True:
+            cls = self._next_class()
+            if cls is None:
+                return
+            _, waiter = self.queues[cls].popleft()
+            if waiter.done():
+                continue
+            self._grant(cls)
+            waiter.set_result(None)
+
+    async def acquire(self, cls: str) -> None:
+        if not self.queues[cls] and self._has_room(cls):
+            self._grant(cls)
+            return
+        if not self.queues[cls]:
+            # A class returning from idle does not get credit for the time it was away.
+            self.passes[cls] = max(self.passes[cls], self.clock)
+        entry = (time.perf_counter(), asyncio.get_running_loop().create_future())
+        self.queues[cls].append(entry)
+        try:
+            await entry[1]
+        except asyncio.CancelledError:
+            if entry[1].done() and not entry[1].cancelled():
+                # Granted a slot in the same tick we were cancelled; give it back.
+                self.release(cls)
+            else:
+                try:
+                    self.queues[cls].remove(entry)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, cls: str) -> None:
+        self.running[cls] -= 1
+        self._dispatch()
+
+
+class LLMScheduler:
+    """
+    Process-wide gate for blocking LLM work. Every call dispatched through `run` shares one
+    concurrency budget, whichever request or language it belongs to, and runs on the shared
+    executor with the caller's context variables.
+
+    Calls are queued by priority class (see app.utils.priority): interactive and bulk split
+    the budget by `weights`, `reserved_interactive` slots are never given to bulk work, and
+    bulk calls queued longer than `aging_seconds` jump the queue.
+    """
+
+    def __init__(self, max_concurrency: int, executor_factory: Callable[[], Executor],
+                 weights: Optional[Dict[str, float]] = None,
+                 reserved_interactive: int = 0,
+                 aging_seconds: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self._executor_factory = executor_factory
+        self.weights = {priorities.INTERACTIVE: 4.0, priorities.BULK: 1.0, **(weights or {})}
+        self.reserved_interactive = min(max(reserved_interactive, 0), max_concurrency - 1)
+        self.limits = {priorities.INTERACTIVE: max_concurrency,
+                       priorities.BULK: max_concurrency - self.reserved_interactive}
+        self.aging_seconds = aging_seconds
+        self._lock = threading.Lock()
+        # asyncio primitives are bound to a loop; Streamlit runs a fresh loop per interaction.
+        self._gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PriorityGate]" = \
+            weakref.WeakKeyDictionary()
+        self.running = {c: 0 for c in priorities.CLASSES}
+        self.waiting = {c: 0 for c in priorities.CLASSES}
+        # Moving average of call durations, None until the first call completes.
+        self.call_seconds: Optional[float] = None
+
+    def _gate(self) -> _PriorityGate:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            gate = self._gates.get(loop)
+            if gate is None:
+                gate = self._gates[loop] = _PriorityGate(self)
+            return gate
+
+    async def run(self, fn: Callable[..., Any], *args: Any, task: Optional[str] = None,
+                  priority: Optional[str] = None, **kwargs: Any) -> Any:
+        label = task or getattr(fn, "__name__", "call")
+        cls = priorities.parse(priority) or priorities.current()
+        gate = self._gate()
+        queued = time.perf_counter()
+        acquired = False
+        self.waiting[cls] += 1
+        try:
+            with tracing.span("scheduler.queue", task=label, priority=cls):
+                await gate.acquire(cls)
+            acquired = True
+            self.waiting[cls] -= 1
+            try:
+                metrics.observe("scheduler_wait_seconds", time.perf_counter() - queued, task=label, priority=cls)
+                # A request cancelled while queued never takes a worker thread.
+                deadline.check(label)
+                self.running[cls] += 1
+                started = time.perf_counter()
+                try:
+                    context = contextvars.copy_context()
+                    call = functools.partial(context.run, fn, *args, **kwargs)
+                    return await asyncio.get_running_loop().run_in_executor(self._executor_factory(), call)
+                finally:
+                    self.running[cls] -= 1
+                    self._record_call(time.perf_counter() - started)
+            finally:
+                gate.release(cls)
+        except asyncio.CancelledError:
+            if not acquired:
+                metrics.increment("cancelled_calls", operation=label, reason="queued")
+            raise
+        finally:
+            if not acquired:
+                self.waiting[cls] -= 1
+
+    def _record_call(self, seconds: float, alpha: float = 0.1) -> None:
+        previous = self.call_seconds
+        self.call_seconds = seconds if previous is None else previous + alpha * (seconds - previous)
+
+    def stats(self) -> dict:
+        return {"max_concurrency": self.max_concurrency,
+                "call_seconds": self.call_seconds,
+                "running": sum(self.running.values()),
+                "waiting": sum(self.waiting.values()),
+                "classes": {c: {"running": self.running[c], "waiting": self.waiting[c],
+                                "weight": self.weights[c], "limit": self.limits[c]}
+                            for c in priorities.CLASSES},
+                "aging_seconds": self.aging_seconds}
@@ -0,0 +1,297 @@
+"""
+Content negotiation for request and response bodies.
+
+Requests may be JSON (parsed with orjson) or MessagePack (Content-Type: application/msgpack),
+optionally gzip or brotli compressed (Content-Encoding). Endpoints that return large
+pydantic structures encode them with `negotiated_response`. That function uses a
+precompiled serializer and skips FastAPI's response re-validation. The body is sent as
+JSON or MessagePack according to Accept, and compressed according to Accept-Encoding
+once it passes RESPONSE_COMPRESSION_MIN_BYTES.
+
+Large payloads are handled in a worker thread rather than on the event loop: responses with
+at least RESPONSE_OFFLOAD_MIN_ITEMS items (paragraphs, questions, chapters and videos) are
+dumped and compressed there, and request bodies of at least REQUEST_OFFLOAD_MIN_BYTES are
+decompressed, parsed and validated there against the route's body type. A thread, not the
+process pool: the values are pydantic models, and pickling them to a worker process costs
+about as much as the dump itself.
+
+msgpack and Brotli are pinned in requirements.txt. An install without them still serves
+JSON with gzip.
+"""
+import asyncio
+import gzip
+import os
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.llm_response_model import QuizResponse
+from app.models.processing_models import QuizResults
+from app.models.translate_video_metadata import CourseWrapper
+from app.utils.metrics import metrics
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+MAX_REQUEST_BYTES = int(os.getenv("REQUEST_MAX_BODY_BYTES", str(256 * 2 ** 20)))
+RESPONSE_OFFLOAD_MIN_ITEMS = int(os.getenv("RESPONSE_OFFLOAD_MIN_ITEMS", "64"))
+REQUEST_OFFLOAD_MIN_BYTES = int(os.getenv("REQUEST_OFFLOAD_MIN_BYTES", str(256 * 2 ** 10)))
+
+
+class Serializer:
+    """
+    Pydantic serializer and validator built once for a type.
+    """
+
+    def __init__(self, type_: Any, items: Callable[[Any], int] = lambda value: 1):
+        self.adapter = TypeAdapter(type_)
+        # Rough size of a value, compared against RESPONSE_OFFLOAD_MIN_ITEMS.
+        self.items = items
+
+    def dump_json(self, value: Any) -> bytes:
+        return self.adapter.dump_json(value)
+
+    def dump_msgpack(self, value: Any) -> bytes:
+        return msgpack.packb(self.adapter.dump_python(value, mode="json"))
+
+    def load_json(self, data: bytes) -> Any:
+        return self.adapter.validate_json(data)
+
+    def load_msgpack(self, data: bytes) -> Any:
+        return self.adapter.validate_python(msgpack.unpackb(data))
+
+
+def _course_items(course: CourseWrapper) -> int:
+    return 1 + sum(1 + len(chapter.videos) for chapter in course.course.chapters)
+
+
+QUIZ_RESULTS = Serializer(List[QuizResults], items=lambda results: sum(1 + len(r.quiz) for r in results))
+QUIZ_RESPONSE = Serializer(QuizResponse, items=lambda response: len(response.quiz))
+COURSE = Serializer(CourseWrapper, items=_course_items)
+QUIZ_RESULTS_BY_LANGUAGE = Serializer(Dict[str, List[QuizResults]],
+                                      items=lambda by_language: sum(QUIZ_RESULTS.items(results)
+                                                                    for results in by_language.values()))
+COURSE_BY_LANGUAGE = Serializer(Dict[str, CourseWrapper],
+                                items=lambda by_language: sum(map(_course_items, by_language.values())))
+
+
+def _media_type(value: Optional[str]) -> str:
+    return (value or "").split(";", 1)[0].strip().lower()
+
+
+def _accepts(header: str) -> List[str]:
+    """
+    Tokens of an Accept/Accept-Encoding header in preference order, dropping q=0.
+    """
+    ranked = []
+    for position, part in enumerate(header.split(",")):
+        token, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if token and quality > 0:
+            ranked.append((-quality, position, token.lower()))
+    return [token for _, _, token in sorted(ranked)]
+
+
+def decompress(body: bytes, encoding: str) -> bytes:
+    if encoding in ("", "identity"):
+        return body
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        wbits = 16 + zlib.MAX_WBITS if encoding != "deflate" else zlib.MAX_WBITS
+        decompressor = zlib.decompressobj(wbits)
+        data = decompressor.decompress(body, MAX_REQUEST_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"Decompressed body exceeds {MAX_REQUEST_BYTES} bytes")
+        return data
+    if encoding == "br" and brotli is not None:
+        data = brotli.decompress(body)
+        if len(data) > MAX_REQUEST_BYTES:
+            raise ValueError(f"Decompressed body exceeds {MAX_REQUEST_BYTES} bytes")
+        return data
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+
+async def decompress_stream(chunks: AsyncIterator[bytes], encoding: str,
+                            max_chunk_bytes: int = 2 ** 20) -> AsyncIterator[bytes]:
+    """
+    `decompress` for a body that is read as it arrives. Each compressed chunk is inflated in
+    pieces of at most `max_chunk_bytes`, so a small chunk cannot expand all at once.
+    """
+    if encoding in ("", "identity"):
+        async for chunk in chunks:
+            yield chunk
+        return
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding != "deflate" else zlib.MAX_WBITS)
+        async for chunk in chunks:
+            while chunk:
+                data = decompressor.decompress(chunk, max_chunk_bytes)
+                chunk = decompressor.unconsumed_tail
+                if data:
+                    yield data
+        if not decompressor.eof:
+            raise ValueError("Compressed body ended early")
+        return
+    if encoding == "br" and brotli is not None:
+        decompressor = brotli.Decompressor()
+        async for chunk in chunks:
+            data = decompressor.process(chunk)
+            if data:
+                yield data
+        if not decompressor.is_finished():
+            raise ValueError("Compressed body ended early")
+        return
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def response_encoding(accept_encoding: str) -> Optional[str]:
+    for token in _accepts(accept_encoding):
+        if token == "br" and brotli is not None:
+            return "br"
+        if token in ("gzip", "*"):
+            return "gzip"
+    return None
+
+
+def wants_msgpack(accept: str) -> bool:
+    if msgpack is None:
+        return False
+    for token in _accepts(accept):
+        if token in MSGPACK_MEDIA_TYPES:
+            return True
+        if token in (JSON_MEDIA_TYPE, "*/*", "application/*"):
+            return False
+    return False
+
+
+async def negotiated_response(request: Request, serializer: Serializer, value: Any,
+                              status_code: int = 200) -> Response:
+    msgpack_body = wants_msgpack(request.headers.get("accept", ""))
+    encoding = response_encoding(request.headers.get("accept-encoding", ""))
+
+    def encode() -> Tuple[bytes, bool]:
+        body = serializer.dump_msgpack(value) if msgpack_body else serializer.dump_json(value)
+        if encoding and len(body) >= COMPRESSION_MIN_BYTES:
+            return compress(body, encoding), True
+        return body, False
+
+    if serializer.items(value) >= RESPONSE_OFFLOAD_MIN_ITEMS:
+        metrics.increment("serialization_offloaded", direction="response")
+        body, compressed = await asyncio.to_thread(encode)
+    else:
+        body, compressed = encode()
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if compressed:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, headers=headers,
+                    media_type=MSGPACK_MEDIA_TYPES[0] if msgpack_body else JSON_MEDIA_TYPE)
+
+
+class NegotiatedRequest(Request):
+    """
+    Request whose body is decompressed and whose `json()` decodes JSON with orjson or
+    MessagePack, depending on the original Content-Type. `stream()` is decompressed as it
+    is read, for endpoints that consume the body incrementally. Bodies of at least
+    REQUEST_OFFLOAD_MIN_BYTES are decompressed, decoded and validated against `body_type` in
+    a worker thread; FastAPI's own validation then accepts the model instance as is.
+    """
+
+    def __init__(self, scope, receive, msgpack_body: bool = False, body_type: Optional[TypeAdapter] = None):
+        super().__init__(scope, receive)
+        self.msgpack_body = msgpack_body
+        self.body_type = body_type
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        # Once body() has run, the base class replays the already decoded body.
+        encoding = "" if hasattr(self, "_body") else self.headers.get("content-encoding", "").strip().lower()
+        async for chunk in decompress_stream(super().stream(), encoding):
+            yield chunk
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_decoded_body"):
+            # The raw body; self.stream() would decode it already.
+            body = b"".join([chunk async for chunk in super().stream()])
+            encoding = self.headers.get("content-encoding", "").strip().lower()
+            if encoding and len(body) >= REQUEST_OFFLOAD_MIN_BYTES:
+                self._decoded_body = await asyncio.to_thread(decompress, body, encoding)
+            else:
+                self._decoded_body = decompress(body, encoding)
+            self._body = self._decoded_body
+        return self._decoded_body
+
+    def _decode(self, body: bytes) -> Any:
+        value = msgpack.unpackb(body) if self.msgpack_body else orjson.loads(body)
+        if self.body_type is None:
+            return value
+        try:
+            return self.body_type.validate_python(value)
+        except ValidationError:
+            # Hand FastAPI the raw value so it reports the 422 in its usual shape.
+            return value
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            if len(body) >= REQUEST_OFFLOAD_MIN_BYTES:
+                metrics.increment("serialization_offloaded", direction="request")
+                self._json = await asyncio.to_thread(self._decode, body)
+            else:
+                self._json = msgpack.unpackb(body) if self.msgpack_body else orjson.loads(body)
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route class that hands endpoints a NegotiatedRequest. MessagePack bodies are presented
+    to FastAPI as JSON so the usual body validation applies.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        # Embedded bodies are validated field by field, so only a single plain body is
+        # validated ahead of FastAPI.
+        body_type = (TypeAdapter(self.body_field.field_info.annotation)
+                     if self.body_field is not None and not self._embed_body_fields else None)
+
+        async def negotiated_handler(request: Request) -> Response:
+            scope = request.scope
+            msgpack_body = _media_type(request.headers.get("content-type")) in MSGPACK_MEDIA_TYPES
+            if msgpack_body:
+                if msgpack is None:
+                    return Response("MessagePack support is not installed", status_code=415)
+                scope = {**scope, "headers": [(k, JSON_MEDIA_TYPE.encode() if k == b"content-type" else v)
+                                              for k, v in scope["headers"]]}
+            # Decoding errors surface through FastAPI's body parsing as 400/422 responses.
+            return await handler(NegotiatedRequest(scope, request.receive, msgpack_body=msgpack_body,
+                                                   body_type=body_type))
+
+        return negotiated_handler
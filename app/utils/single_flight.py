@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from app.utils import deadline
+from app.utils.metrics import metrics
+
+
+def _canonical_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    return str(value)
+
+
+def canonical_hash(*parts: Any) -> str:
+    """
+    Stable content hash of JSON-like values and pydantic models, independent of dict key order.
+    """
+    payload = json.dumps(parts, default=_canonical_default, sort_keys=True,
+                         separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls made from threads: the first caller for a key runs
+    the function, later callers for the same key block on its result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            metrics.increment("single_flight_coalesced", scope=self.name)
+            try:
+                return future.result(timeout=deadline.remaining())
+            except deadline.RequestCancelled:
+                # The leader's request went away; this caller is still live, so it runs the call itself.
+                deadline.check(self.name)
+                return self.do(key, fn, *args, **kwargs)
+            except TimeoutError:
+                raise deadline.DeadlineExceeded(f"Request deadline exceeded waiting on {self.name}")
+
+        metrics.increment("single_flight_calls", scope=self.name)
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task, token: deadline.CancelToken):
+        self.task = task
+        self.token = token
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces identical concurrent coroutines on one event loop. Waiters attach to the
+    in-flight task; a waiter leaving does not cancel the work unless it was the last one.
+    The task runs under its own cancel token, inheriting the first caller's deadline.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight: Optional[_Flight] = self._flights.get(key)
+        if flight is None:
+            context = contextvars.copy_context()
+            token = context.run(deadline.fork)
+            flight = _Flight(context.run(asyncio.ensure_future, factory()), token)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, k=key, f=flight: self._forget(k, f))
+            metrics.increment("single_flight_calls", scope=self.name)
+        else:
+            metrics.increment("single_flight_coalesced", scope=self.name)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone waiting on this result has gone away.
+                flight.token.cancel("abandoned")
+                flight.task.cancel()
+                self._forget(key, flight)
+                metrics.increment("single_flight_cancelled", scope=self.name)
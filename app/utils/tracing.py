@@ -0,0 +1,332 @@
+"""
+Per-request span tracing and sampling profiles.
+
+A Trace is attached to the request context only when the request is sampled (X-Trace
+header or TRACE_SAMPLE_RATE). `span()` checks one context variable and returns a shared
+no-op otherwise, so instrumented code costs next to nothing on untraced requests. Spans
+nest through context variables, which asyncio tasks, asyncio.to_thread and LLMScheduler
+carry into child tasks and worker threads.
+
+Finished traces are kept in memory (see `recent_traces`) and, when TRACE_DIR is set,
+written there as Chrome trace files (chrome://tracing, Perfetto). A request sent with
+X-Profile also runs a sampling profiler over the threads its spans occupy. The folded
+stacks are saved if the request ran longer than PROFILE_SLOW_SECONDS.
+"""
+import asyncio
+import collections
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+TRACE_HEADER = b"x-trace"
+PROFILE_HEADER = b"x-profile"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "thread_id", "start", "end", "attrs")
+
+    def __init__(self, name: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attrs = attrs
+
+
+class Trace:
+    def __init__(self, name: str, trace_id: Optional[str] = None, profile: bool = False):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.finished: Optional[float] = None
+        self.spans: List[Span] = []
+        self._ids = iter(range(1, sys.maxsize))
+        self._lock = threading.Lock()
+        # thread id -> open spans; only maintained while profiling
+        self.active_threads: Optional[Dict[int, int]] = {} if profile else None
+        self.profile: Optional["SamplingProfiler"] = None
+
+    def open(self, name: str, parent: Optional[Span], attrs: Dict[str, Any]) -> Span:
+        with self._lock:
+            span = Span(name, next(self._ids), parent.span_id if parent else None, attrs)
+            self.spans.append(span)
+            if self.active_threads is not None:
+                self.active_threads[span.thread_id] = self.active_threads.get(span.thread_id, 0) + 1
+        return span
+
+    def close(self, span: Span) -> None:
+        span.end = time.perf_counter()
+        if self.active_threads is not None:
+            with self._lock:
+                count = self.active_threads.get(span.thread_id, 0) - 1
+                if count > 0:
+                    self.active_threads[span.thread_id] = count
+                else:
+                    self.active_threads.pop(span.thread_id, None)
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def to_chrome(self) -> dict:
+        """
+        Chrome trace event format: one complete ("X") event per span, threads numbered in order of appearance.
+        """
+        pid = os.getpid()
+        threads: Dict[int, int] = {}
+        events = []
+        for span in list(self.spans):
+            tid = threads.setdefault(span.thread_id, len(threads) + 1)
+            end = span.end if span.end is not None else time.perf_counter()
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (span.start - self.started) * 1e6,
+                "dur": (end - span.start) * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": {"span_id": span.span_id, "parent_id": span.parent_id, **span.attrs},
+            })
+        events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": f"thread-{thread_id}"}} for thread_id, tid in threads.items())
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"trace_id": self.trace_id, "name": self.name, "started_at": self.wall_started}}
+
+    def summary(self) -> dict:
+        return {"trace_id": self.trace_id, "name": self.name, "started_at": self.wall_started,
+                "duration_seconds": self.duration, "spans": len(self.spans),
+                "profiled": self.profile is not None}
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("trace", "name", "attrs", "span", "_reset")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> "_ActiveSpan":
+        self.span = self.trace.open(self.name, _span.get(), self.attrs)
+        self._reset = _span.set(self.span)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        self.trace.close(self.span)
+        _span.reset(self._reset)
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        self.span.attrs.update(attrs)
+
+
+def span(name: str, **attrs: Any):
+    """
+    Time a block as a child of the current span; a no-op outside traced requests.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return _ActiveSpan(trace, name, attrs)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator form of `span` for sync and async functions.
+    """
+    def decorator(fn: Callable) -> Callable:
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the threads a trace's spans are running on, every `interval`
+    seconds, and aggregates them as folded stacks (flamegraph.pl / speedscope input).
+    The event-loop thread is shared, so its samples can include other requests' work.
+    """
+
+    def __init__(self, trace: Trace, interval: float = 0.005, max_depth: int = 64):
+        self.trace = trace
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{trace.trace_id}", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.trace.active_threads or ()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+                    self.samples += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in
+                       sorted(self.stacks.items(), key=lambda item: item[1], reverse=True))
+
+
+_recent: Deque[Trace] = collections.deque(maxlen=int(os.getenv("TRACE_KEEP", "50")))
+
+
+def recent_traces() -> List[Trace]:
+    return list(_recent)
+
+
+def find_trace(trace_id: str) -> Optional[Trace]:
+    return next((trace for trace in _recent if trace.trace_id == trace_id), None)
+
+
+def write_trace(trace: Trace, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"trace-{trace.trace_id}.json")
+    with open(path, "w") as f:
+        json.dump(trace.to_chrome(), f)
+    return path
+
+
+def write_profile(trace: Trace, directory: str) -> Optional[str]:
+    if trace.profile is None or not trace.profile.samples:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"profile-{trace.trace_id}.folded")
+    with open(path, "w") as f:
+        f.write(trace.profile.folded())
+    return path
+
+
+def _enabled(value: Optional[bytes]) -> bool:
+    return value is not None and value.lower() not in (b"0", b"false", b"no", b"")
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces sampled requests under a root "http" span and returns the
+    trace ID in X-Trace-Id. TRACE_SAMPLE_RATE and PROFILE_SAMPLE_RATE sample requests that
+    do not send the headers.
+    """
+
+    def __init__(self, app,
+                 sample_rate: Optional[float] = None,
+                 profile_rate: Optional[float] = None,
+                 profile_interval: Optional[float] = None,
+                 profile_slow_seconds: Optional[float] = None,
+                 directory: Optional[str] = None):
+        self.app = app
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+        self.profile_rate = profile_rate if profile_rate is not None else float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.profile_interval = profile_interval or float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.005"))
+        self.profile_slow_seconds = profile_slow_seconds if profile_slow_seconds is not None \
+            else float(os.getenv("PROFILE_SLOW_SECONDS", "0"))
+        self.directory = directory or os.getenv("TRACE_DIR") or None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        profile = _enabled(headers.get(PROFILE_HEADER)) or \
+            (self.profile_rate > 0 and random.random() < self.profile_rate)
+        if not (profile or _enabled(headers.get(TRACE_HEADER))
+                or (self.sample_rate > 0 and random.random() < self.sample_rate)):
+            return await self.app(scope, receive, send)
+
+        trace = Trace(f"{scope['method']} {scope['path']}", profile=profile)
+
+        async def traced_send(message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message,
+                           "headers": [*message.get("headers", []), (b"x-trace-id", trace.trace_id.encode())]}
+            await send(message)
+
+        reset = _trace.set(trace)
+        if profile:
+            trace.profile = SamplingProfiler(trace, self.profile_interval)
+        try:
+            with span("http", method=scope["method"], path=scope["path"]):
+                if trace.profile is not None:
+                    trace.profile.start()
+                await self.app(scope, receive, traced_send)
+        finally:
+            _trace.reset(reset)
+            trace.finished = time.perf_counter()
+            if trace.profile is not None:
+                trace.profile.stop()
+            _recent.append(trace)
+            if self.directory:
+                await asyncio.to_thread(self._export, trace)
+
+    def _export(self, trace: Trace) -> None:
+        write_trace(trace, self.directory)
+        if trace.duration >= self.profile_slow_seconds:
+            write_profile(trace, self.directory)
@@ -0,0 +1,104 @@
+"""
+Per-paragraph latency, calls and tokens of the fused simplify+quiz stage against the split
+simplify and generate_quiz calls (app.service.course_service.simplify_and_quiz).
+
+Every paragraph is processed as its own concurrent request through the shared scheduler, so
+latencies are what a caller waiting on one paragraph sees. By default the fake LLM is used,
+with latency growing with prompt and output size; --live uses the configured OpenAI client
+and costs real tokens.
+
+Run from the repository root:
+    python benchmarks/fused_stage.py --paragraphs 20 --repeat 3
+    python benchmarks/fused_stage.py --live --paragraphs 5 --repeat 1
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.client import provider  # noqa: E402
+from app.client.fake_llm import FakeTextProcessor, LatencyModel  # noqa: E402
+from app.models.processing_models import ProcessedParagraph  # noqa: E402
+from app.service.course_service import simplify_and_quiz  # noqa: E402
+from app.utils.metrics import metrics, percentile  # noqa: E402
+from load_test import PayloadFactory  # noqa: E402
+
+
+def counter_total(counters: Dict[str, float], name: str) -> float:
+    return sum(value for key, value in counters.items() if key == name or key.startswith(name + "{"))
+
+
+async def run_mode(paragraphs: List[ProcessedParagraph], fused: bool, llm_client) -> dict:
+    metrics.reset()
+
+    async def timed(paragraph: ProcessedParagraph) -> float:
+        start = time.perf_counter()
+        await simplify_and_quiz([paragraph], llm_client=llm_client, fused=fused)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(p) for p in paragraphs))
+    wall = time.perf_counter() - start
+    counters = metrics.snapshot()["counters"]
+    calls = sum(summary["count"] for key, summary in metrics.snapshot()["summaries"].items()
+                if key.startswith("scheduler_wait_seconds"))
+    count = len(paragraphs)
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "wall": wall,
+        "calls": calls / count,
+        "prompt_tokens": counter_total(counters, "llm_prompt_tokens") / count,
+        "completion_tokens": counter_total(counters, "llm_completion_tokens") / count,
+        "fallbacks": counters.get("fused_stage_calls{result=fallback}", 0),
+    }
+
+
+async def bench(args) -> None:
+    if args.live:
+        llm_client = provider.get_llm_client()
+    else:
+        llm_client = FakeTextProcessor(LatencyModel(base=args.llm_latency, jitter=args.llm_jitter,
+                                                    per_1k_prompt_chars=args.per_1k_prompt_chars,
+                                                    per_1k_completion_chars=args.per_1k_completion_chars),
+                                       seed=args.seed)
+    factory_args = argparse.Namespace(objectives=(1, 3), skills=(1, 4), questions=(3, 8))
+    factory = PayloadFactory(factory_args, args.seed)
+    paragraphs = [ProcessedParagraph.model_validate(factory.quiz_item()) for _ in range(args.paragraphs)]
+
+    results = {"split": [], "fused": []}
+    for _ in range(args.repeat):
+        for mode in results:
+            results[mode].append(await run_mode(paragraphs, mode == "fused", llm_client))
+
+    columns = ("p50", "p95", "wall", "calls", "prompt_tokens", "completion_tokens", "fallbacks")
+    print(f"\n{args.paragraphs} paragraphs, median of {args.repeat} runs ({'live' if args.live else 'fake'} LLM)")
+    print(f"{'mode':<8}" + "".join(f"{column:>19}" for column in columns))
+    for mode, runs in results.items():
+        row = {column: statistics.median(run[column] for run in runs) for column in columns}
+        print(f"{mode:<8}" + "".join(f"{row[column]:>19.2f}" for column in columns))
+    print("Latencies in seconds per paragraph; calls and tokens per paragraph.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--live", action="store_true", help="Call the real model configured in the environment")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Fake LLM seconds per call before size costs")
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--per-1k-prompt-chars", type=float, default=0.05)
+    parser.add_argument("--per-1k-completion-chars", type=float, default=1.0,
+                        help="Fake LLM seconds per 1000 generated characters")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
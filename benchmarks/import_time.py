@@ -0,0 +1,66 @@
+"""
+Cold-start benchmark for API workers.
+
+Each sample runs in a fresh interpreter and measures
+  lazy:  importing the module (what a worker pays at boot now)
+  eager: importing the module and building every client, which is what importing
+         app.service.course_service used to do
+
+Run from the repository root:
+    python benchmarks/import_time.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    "lazy": "import {module}",
+    "eager": (
+        "import {module}\n"
+        "from app.client import provider\n"
+        "provider.get_llm_client()\n"
+        "provider.get_executor()\n"
+        "try:\n"
+        "    provider.get_vectordb_client()\n"
+        "except RuntimeError:\n"
+        "    pass\n"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "{body}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def sample(module: str, mode: str) -> float:
+    code = TIMER.format(body=SNIPPETS[mode].format(module=module))
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-benchmark"))
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", action="append",
+                        help="Module to import (default: wsgi and app.service.course_service)")
+    args = parser.parse_args()
+
+    modules = args.module or ["wsgi", "app.service.course_service"]
+    print(f"{'module':<32}{'mode':<8}{'median ms':>12}{'min ms':>10}")
+    for module in modules:
+        for mode in SNIPPETS:
+            samples = [sample(module, mode) * 1000 for _ in range(args.runs)]
+            print(f"{module:<32}{mode:<8}{statistics.median(samples):>12.1f}{min(samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Load generator for the FastAPI service in wsgi.py.
+
+Drives /process_video, /translate_video/{language} and /translate_course_meta/{language}
+with generated payloads; the translate_video_multi scenario (not in the default mix) sends
+POST /translate_video with --multi-languages targets. Concurrency follows a ramp profile, and every LLM call goes to
+FakeTextProcessor, which only simulates latency. The report covers per-endpoint throughput,
+latency percentiles and error rates, one row per concurrency level (to locate the saturation
+point), and server-side RSS, threads, scheduler queue and event-loop lag sampled from /metrics.
+
+In-process (default). The app runs on this event loop behind httpx.ASGITransport, so the
+measured loop lag includes the generator's own work:
+    python benchmarks/load_test.py --profile step --concurrency 64 --step 8 --step-seconds 15
+
+Over localhost. Start a server with the fake LLM (needs uvicorn), then point the generator at it:
+    python benchmarks/load_test.py --serve --port 8000 --llm-latency 1.2
+    python benchmarks/load_test.py --url http://localhost:8000 --profile linear --duration 120
+
+Translation uses ?delta=true by default: with unique payloads every field is still a cache
+miss, and a fresh translation store is used per in-process run. Pass --translate-mode full
+for the two-call path.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.client.fake_llm import WORDS, FakeTextProcessor, LatencyModel  # noqa: E402
+from app.utils.metrics import percentile  # noqa: E402
+
+LANGUAGES = ("Arabic", "French", "Spanish", "German")
+LEVELS = ("Remember", "Understand", "Apply", "Analyze", "Evaluate", "Create")
+
+
+def _range(value: str) -> Tuple[int, int]:
+    low, _, high = value.partition("-")
+    return int(low), int(high or low)
+
+
+class PayloadFactory:
+    """
+    Random request bodies shaped like production traffic.
+    """
+
+    def __init__(self, args, seed: int):
+        self.args = args
+        self.rng = random.Random(seed)
+
+    def text(self, words: Tuple[int, int]) -> str:
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(*words)))
+
+    def names(self, count: Tuple[int, int]) -> List[Dict[str, str]]:
+        return [{"name": self.text((2, 6))} for _ in range(self.rng.randint(*count))]
+
+    def question(self) -> dict:
+        true_false = self.rng.random() < 0.3
+        options = ["True", "False"] if true_false else [self.text((2, 8)) for _ in range(4)]
+        return {
+            "question": self.text((8, 25)),
+            "question_type": "true_false" if true_false else "multiple_choice",
+            "post_assessment": self.rng.random() < 0.5,
+            "question_level": str(self.rng.randint(1, 6)),
+            "options": options,
+            "correct_answer": self.rng.choice(options),
+            "related_skills": self.names((1, 2)),
+            "related_objectives": self.names((1, 2)),
+            "alternative_questions": False,
+        }
+
+    def process_video(self) -> dict:
+        return {
+            "video": self.text(self.args.script_words),
+            "objective": self.names(self.args.objectives),
+            "skills": self.names(self.args.skills),
+            "language": "English",
+        }
+
+    def quiz_item(self) -> dict:
+        return {
+            "objective": self.names(self.args.objectives),
+            "skills": self.names(self.args.skills),
+            "language": "English",
+            "paragraph": self.text((80, 200)),
+            "paragraph_level": {"name": self.rng.choice(LEVELS)},
+            "simplify1": self.text((60, 150)),
+            "simplify2": self.text((40, 120)),
+            "simplify3": self.text((30, 90)),
+            "quiz": [self.question() for _ in range(self.rng.randint(*self.args.questions))],
+        }
+
+    def translate_video(self) -> list:
+        return [self.quiz_item() for _ in range(self.rng.randint(*self.args.items))]
+
+    def translate_video_multi(self) -> dict:
+        return {"languages": self.rng.sample(LANGUAGES, self.args.multi_languages), "items": self.translate_video()}
+
+    def translate_course_meta(self) -> dict:
+        return {"course": {
+            "id": f"course-{self.rng.getrandbits(32):08x}",
+            "name": self.text((3, 8)),
+            "description": self.text((30, 80)),
+            "chapters": [{
+                "id": f"chapter-{c}",
+                "name": self.text((3, 8)),
+                "description": self.text((15, 40)),
+                "videos": [{"id": f"video-{c}-{v}", "name": self.text((3, 8)), "description": self.text((10, 30))}
+                           for v in range(self.rng.randint(*self.args.videos))],
+            } for c in range(self.rng.randint(*self.args.chapters))],
+        }}
+
+
+def scenarios(args, factory: PayloadFactory) -> Dict[str, Callable[[], Tuple[str, object]]]:
+    delta = "?delta=true" if args.translate_mode == "delta" else ""
+    return {
+        "process_video": lambda: ("/process_video", factory.process_video()),
+        "translate_video": lambda: (f"/translate_video/{factory.rng.choice(LANGUAGES)}{delta}",
+                                    factory.translate_video()),
+        "translate_video_multi": lambda: ("/translate_video", factory.translate_video_multi()),
+        "translate_course_meta": lambda: (f"/translate_course_meta/{factory.rng.choice(LANGUAGES)}",
+                                          factory.translate_course_meta()),
+    }
+
+
+def target_concurrency(args, elapsed: float) -> int:
+    if args.profile == "constant":
+        return args.concurrency
+    if args.profile == "linear":
+        return max(1, math.ceil(args.concurrency * min(1.0, elapsed / args.duration)))
+    if args.profile == "step":
+        return min(args.concurrency, args.step * (1 + int(elapsed // args.step_seconds)))
+    # spike: a quarter of the load, full load through the middle third of the run
+    third = args.duration / 3
+    return args.concurrency if third <= elapsed < 2 * third else max(1, args.concurrency // 4)
+
+
+@dataclass
+class Result:
+    scenario: str
+    started: float
+    latency: float
+    status: int
+    concurrency: int
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 300
+
+
+class LoadTest:
+    def __init__(self, args, client: httpx.AsyncClient):
+        self.args = args
+        self.client = client
+        self.factory = PayloadFactory(args, args.seed)
+        self.scenarios = scenarios(args, self.factory)
+        self.weights = self._weights(args.mix)
+        self.pool: Dict[str, List[Tuple[str, object]]] = {}
+        self.results: List[Result] = []
+        self.samples: List[dict] = []
+        self.started = 0.0
+
+    def _weights(self, mix: str) -> Dict[str, float]:
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            if name.strip() not in self.scenarios:
+                raise SystemExit(f"Unknown scenario {name!r}; choose from {', '.join(self.scenarios)}")
+            weights[name.strip()] = float(weight or 1)
+        return weights
+
+    def request_for(self, scenario: str) -> Tuple[str, object]:
+        if not self.args.payload_pool:
+            return self.scenarios[scenario]()
+        # A bounded pool of repeated bodies exercises coalescing and the delta store.
+        pool = self.pool.setdefault(scenario, [])
+        if len(pool) < self.args.payload_pool:
+            pool.append(self.scenarios[scenario]())
+            return pool[-1]
+        return self.factory.rng.choice(pool)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    async def worker(self, index: int) -> None:
+        headers = {"X-Request-Timeout": str(self.args.deadline)} if self.args.deadline else {}
+        while self.elapsed() < self.args.duration:
+            concurrency = target_concurrency(self.args, self.elapsed())
+            if index >= concurrency:
+                await asyncio.sleep(0.05)
+                continue
+            scenario = self.factory.rng.choices(list(self.weights), weights=list(self.weights.values()))[0]
+            path, body = self.request_for(scenario)
+            started = self.elapsed()
+            try:
+                response = await self.client.post(path, json=body, headers=headers)
+                error = None if response.is_success else response.text[:200]
+                status = response.status_code
+            except Exception as e:
+                error, status = f"{type(e).__name__}: {e}", 0
+            self.results.append(Result(scenario, started, self.elapsed() - started, status, concurrency, error))
+
+    async def sampler(self) -> None:
+        while self.elapsed() < self.args.duration:
+            try:
+                snapshot = (await self.client.get("/metrics")).json()
+                self.samples.append({
+                    "at": self.elapsed(),
+                    "concurrency": target_concurrency(self.args, self.elapsed()),
+                    "process": snapshot.get("process", {}),
+                    "scheduler": snapshot.get("scheduler", {}),
+                    "loop_lag": snapshot.get("gauges", {}).get("event_loop_lag_seconds", 0.0),
+                })
+            except Exception as e:
+                print(f"metrics sample failed: {e}", file=sys.stderr)
+            await asyncio.sleep(self.args.sample_interval)
+
+    async def run(self) -> None:
+        self.started = time.perf_counter()
+        await asyncio.gather(self.sampler(), *(self.worker(i) for i in range(self.args.concurrency)))
+
+
+def summarize(results: List[Result], seconds: float) -> dict:
+    latencies = [r.latency for r in results if r.ok]
+    errors = sum(1 for r in results if not r.ok)
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": errors / len(results) if results else 0.0,
+        "throughput_rps": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def by_concurrency(test: LoadTest) -> List[dict]:
+    """
+    One row per concurrency level, with throughput over the time spent at that level.
+    """
+    levels: Dict[int, List[Result]] = {}
+    for result in test.results:
+        levels.setdefault(result.concurrency, []).append(result)
+    rows = []
+    for level in sorted(levels):
+        group = levels[level]
+        window = max(r.started + r.latency for r in group) - min(r.started for r in group)
+        rows.append({"concurrency": level, **summarize(group, window)})
+    return rows
+
+
+def saturation_point(rows: List[dict], gain: float = 1.05) -> Optional[int]:
+    """
+    First concurrency level whose throughput is less than `gain` times the previous level's.
+    """
+    for previous, row in zip(rows, rows[1:]):
+        if row["throughput_rps"] < previous["throughput_rps"] * gain:
+            return previous["concurrency"]
+    return None
+
+
+def server_summary(samples: List[dict]) -> dict:
+    lags = [sample["loop_lag"] for sample in samples]
+    return {
+        "peak_rss_mb": max((s["process"].get("rss_bytes", 0) for s in samples), default=0) / 2 ** 20,
+        "peak_threads": max((s["process"].get("threads", 0) for s in samples), default=0),
+        "peak_scheduler_waiting": max((s["scheduler"].get("waiting", 0) for s in samples), default=0),
+        "loop_lag_p99_ms": percentile(lags, 99) * 1000,
+        "loop_lag_max_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def print_table(title: str, rows: List[dict], key: str) -> None:
+    print(f"\n{title}")
+    print(f"{key:<24}{'reqs':>7}{'err%':>7}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in rows:
+        print(f"{str(row[key]):<24}{row['requests']:>7}{row['error_rate'] * 100:>7.1f}{row['throughput_rps']:>9.2f}"
+              f"{row['p50_ms']:>10.0f}{row['p90_ms']:>10.0f}{row['p99_ms']:>10.0f}{row['max_ms']:>10.0f}")
+
+
+def report(test: LoadTest) -> dict:
+    duration = test.args.duration
+    scenarios_rows = [{"scenario": name, **summarize([r for r in test.results if r.scenario == name], duration)}
+                      for name in test.weights]
+    levels = by_concurrency(test)
+    summary = {
+        "overall": summarize(test.results, duration),
+        "scenarios": scenarios_rows,
+        "concurrency_levels": levels,
+        "saturation_concurrency": saturation_point(levels),
+        "server": server_summary(test.samples),
+        "errors": sorted({r.error for r in test.results if r.error})[:10],
+    }
+
+    print_table("By scenario", scenarios_rows, "scenario")
+    print_table("By concurrency", levels, "concurrency")
+    server = summary["server"]
+    print(f"\nServer: peak RSS {server['peak_rss_mb']:.0f} MB, peak threads {server['peak_threads']}, "
+          f"peak scheduler queue {server['peak_scheduler_waiting']}, "
+          f"loop lag p99 {server['loop_lag_p99_ms']:.1f} ms (max {server['loop_lag_max_ms']:.1f} ms)")
+    if summary["saturation_concurrency"] is not None:
+        print(f"Throughput stops scaling after concurrency {summary['saturation_concurrency']}")
+    for error in summary["errors"]:
+        print(f"error: {error}")
+    return summary
+
+
+def fake_llm(args) -> FakeTextProcessor:
+    # Admission prices requests at this latency until real calls have been observed.
+    os.environ.setdefault("ADMISSION_CALL_SECONDS", str(args.llm_latency))
+    return FakeTextProcessor(LatencyModel(base=args.llm_latency, jitter=args.llm_jitter,
+                                          error_rate=args.llm_error_rate), seed=args.seed)
+
+
+async def run_in_process(args) -> LoadTest:
+    store_dir = tempfile.mkdtemp()
+    os.environ.setdefault("TRANSLATION_STORE_PATH", os.path.join(store_dir, "load_test.sqlite3"))
+    os.environ.setdefault("ARTIFACT_STORE_PATH", os.path.join(store_dir, "load_test_artifacts.sqlite3"))
+    from app.client import provider
+
+    provider.configure(llm_client=fake_llm(args))
+    import wsgi
+
+    transport = httpx.ASGITransport(app=wsgi.app)
+    async with wsgi.app.router.lifespan_context(wsgi.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            test = LoadTest(args, client)
+            await test.run()
+    return test
+
+
+async def run_remote(args) -> LoadTest:
+    limits = httpx.Limits(max_connections=args.concurrency + 1, max_keepalive_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, timeout=None, limits=limits) as client:
+        test = LoadTest(args, client)
+        await test.run()
+    return test
+
+
+def serve(args) -> None:
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("--serve needs uvicorn: pip install uvicorn")
+    from app.client import provider
+
+    provider.configure(llm_client=fake_llm(args))
+    import wsgi
+
+    uvicorn.run(wsgi.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--serve", action="store_true", help="Run the app with the fake LLM on --port and exit")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--profile", choices=("constant", "linear", "step", "spike"), default="step")
+    parser.add_argument("--concurrency", type=int, default=32, help="Peak concurrent clients")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load")
+    parser.add_argument("--step", type=int, default=4, help="Clients added per step (step profile)")
+    parser.add_argument("--step-seconds", type=float, default=10)
+    parser.add_argument("--mix", default="process_video=2,translate_video=1,translate_course_meta=1",
+                        help="Scenario weights")
+    parser.add_argument("--translate-mode", choices=("delta", "full"), default="delta")
+    parser.add_argument("--payload-pool", type=int, default=0,
+                        help="Reuse this many bodies per scenario (0: every request is unique)")
+    parser.add_argument("--deadline", type=float, help="X-Request-Timeout sent with every request")
+    parser.add_argument("--script-words", type=_range, default=(300, 1500), help="Script length range, e.g. 300-1500")
+    parser.add_argument("--objectives", type=_range, default=(1, 3))
+    parser.add_argument("--skills", type=_range, default=(1, 4))
+    parser.add_argument("--items", type=_range, default=(2, 8), help="Paragraphs per translate_video request")
+    parser.add_argument("--multi-languages", type=int, default=3, choices=range(1, len(LANGUAGES) + 1),
+                        help="Target languages per translate_video_multi request")
+    parser.add_argument("--questions", type=_range, default=(3, 8), help="Questions per paragraph")
+    parser.add_argument("--chapters", type=_range, default=(3, 12))
+    parser.add_argument("--videos", type=_range, default=(2, 6), help="Videos per chapter")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Median fake LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the full report to this file")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    test = asyncio.run(run_remote(args) if args.url else run_in_process(args))
+    summary = report(test)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), **summary, "results": [asdict(r) for r in test.results]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+REST vs gRPC latency of QdrantDBClient / AsyncQdrantDBClient.
+
+Start a local Qdrant stand-in first, e.g.
+    docker run --rm -p 6333:6333 -p 6334:6334 qdrant/qdrant
+then run from the repository root:
+    python benchmarks/qdrant_transport.py --host http://localhost --points 2000 --queries 500
+
+A throwaway collection is created and dropped for every transport.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Callable, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.client.vector_db import AsyncQdrantDBClient, QdrantDBClient  # noqa: E402
+
+DIMENSION = 1536
+
+
+def _vector(rng: random.Random) -> List[float]:
+    return [rng.random() for _ in range(DIMENSION)]
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"{label:<28}{len(samples):>7}{statistics.median(samples) * 1000:>11.2f}{p95 * 1000:>11.2f}")
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_sync(args, prefer_grpc: bool) -> None:
+    rng = random.Random(0)
+    label = "grpc" if prefer_grpc else "rest"
+    client = QdrantDBClient(args.host, port=args.port, grpc_port=args.grpc_port, prefer_grpc=prefer_grpc)
+    collection = f"bench_{label}_{uuid.uuid4().hex[:8]}"
+    client.create_collection(collection, DIMENSION)
+    try:
+        upserts = [_timed(lambda: client.insert_point(collection, str(uuid.uuid4()), _vector(rng),
+                                                      {"skill_id": str(i)}))
+                   for i in range(args.points)]
+        queries = [_timed(lambda: client.query(collection, _vector(rng), limit=1))
+                   for _ in range(args.queries)]
+    finally:
+        client.client.delete_collection(collection)
+        client.close()
+    _report(f"sync {label} upsert", upserts)
+    _report(f"sync {label} query", queries)
+
+
+async def bench_async(args, prefer_grpc: bool) -> None:
+    rng = random.Random(0)
+    label = "grpc" if prefer_grpc else "rest"
+    client = AsyncQdrantDBClient(args.host, port=args.port, grpc_port=args.grpc_port, prefer_grpc=prefer_grpc)
+    collection = f"bench_async_{label}_{uuid.uuid4().hex[:8]}"
+    await client.create_collection(collection, DIMENSION)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def timed(coro_factory) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await coro_factory()
+            return time.perf_counter() - start
+
+    try:
+        upserts = await asyncio.gather(*(
+            timed(lambda i=i: client.insert_point(collection, str(uuid.uuid4()), _vector(rng), {"skill_id": str(i)}))
+            for i in range(args.points)))
+        queries = await asyncio.gather(*(
+            timed(lambda: client.query(collection, _vector(rng), limit=1)) for _ in range(args.queries)))
+    finally:
+        await client.client.delete_collection(collection)
+        await client.close()
+    _report(f"async {label} upsert", list(upserts))
+    _report(f"async {label} query", list(queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="http://localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight calls for the async runs")
+    args = parser.parse_args()
+
+    print(f"{'transport / op':<28}{'calls':>7}{'p50 ms':>11}{'p95 ms':>11}")
+    for prefer_grpc in (False, True):
+        bench_sync(args, prefer_grpc)
+        asyncio.run(bench_async(args, prefer_grpc))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Quiz post-processing (new question, answer and correct-answer IDs plus paragraph_id) for bulk
+course exports: app.utils.quiz.process_quiz_questions, called once per paragraph, against
+process_quiz_batch over all paragraphs in each of its output modes (arrow only with pyarrow).
+
+Questions use the export shape those functions expect (question_id, correct_answer_id,
+answer, question_skills_and_objective, alternative_questions), defined here since the
+pipeline's own models do not carry IDs. Each run gets fresh copies; copying is not timed.
+The first run also checks that both paths rewire IDs the same way.
+
+Run from the repository root:
+    python benchmarks/quiz_ids.py --paragraphs 100 1000 --questions 10 --repeat 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+from pydantic import BaseModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils.quiz import process_quiz_batch, process_quiz_questions  # noqa: E402
+
+try:
+    import pyarrow
+except ImportError:  # The arrow row is skipped.
+    pyarrow = None
+
+
+class Answer(BaseModel):
+    answer_id: str
+    question_id: str
+    answer: str
+
+
+class SkillLink(BaseModel):
+    question_id: str
+    name: str
+
+
+class AlternativeQuestion(BaseModel):
+    question_id: str
+    question: str
+    correct_answer_id: str
+    answer: List[Answer]
+
+
+class Question(BaseModel):
+    question_id: str
+    question: str
+    correct_answer_id: str
+    answer: List[Answer]
+    question_skills_and_objective: List[SkillLink]
+    alternative_questions: List[AlternativeQuestion]
+
+
+def make_question(rng: random.Random, index: int, alternatives: int) -> Question:
+    def answers(prefix: str) -> List[Answer]:
+        return [Answer(answer_id=f"{prefix}-a{i}", question_id=prefix, answer=f"option {i}") for i in range(4)]
+
+    qid = f"q{index}"
+    return Question(
+        question_id=qid,
+        question=f"Question {index}?",
+        correct_answer_id=f"{qid}-a{rng.randrange(4)}",
+        answer=answers(qid),
+        question_skills_and_objective=[SkillLink(question_id=qid, name=f"skill {i}") for i in range(2)],
+        alternative_questions=[AlternativeQuestion(question_id=f"{qid}.{j}", question=f"Alternative {j}?",
+                                                   correct_answer_id=f"{qid}.{j}-a{rng.randrange(4)}",
+                                                   answer=answers(f"{qid}.{j}"))
+                               for j in range(alternatives)],
+    )
+
+
+def check(reference: List[dict], batched: List[dict]) -> None:
+    """
+    Same structure, and in both the correct answer carries correct_answer_id and every
+    answer points at its question.
+    """
+    assert len(reference) == len(batched)
+    for expected, actual in zip(reference, batched):
+        assert expected["paragraph_id"] == actual["paragraph_id"]
+        for question, other in [(expected, actual)] + list(zip(expected["alternative_questions"],
+                                                               actual["alternative_questions"])):
+            for answer, other_answer in zip(question["answer"], other["answer"]):
+                assert (answer["answer_id"] == question["correct_answer_id"]) == \
+                       (other_answer["answer_id"] == other["correct_answer_id"])
+                assert other_answer["question_id"] == other["question_id"]
+        assert all(skill["question_id"] == actual["question_id"] for skill in actual["question_skills_and_objective"])
+
+
+def timed(fn: Callable[[object], object], setup: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        data = setup()
+        start = time.perf_counter()
+        fn(data)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def bench(paragraphs: int, questions: int, alternatives: int, repeat: int, seed: int) -> None:
+    rng = random.Random(seed)
+    source = [[make_question(rng, p * questions + q, alternatives) for q in range(questions)]
+              for p in range(paragraphs)]
+    paragraph_ids = [f"p{p}" for p in range(paragraphs)]
+
+    def fresh() -> List[List[Question]]:
+        return [[question.model_copy(deep=True) for question in quiz] for quiz in source]
+
+    def fresh_dicts() -> List[List[dict]]:
+        return [[question.model_dump() for question in quiz] for quiz in source]
+
+    def per_paragraph(quizzes) -> List[dict]:
+        return [item for quiz, pid in zip(quizzes, paragraph_ids) for item in process_quiz_questions(quiz, pid)]
+
+    check(per_paragraph(fresh()), process_quiz_batch(fresh(), paragraph_ids))
+
+    rows = [
+        ("process_quiz_questions", per_paragraph, fresh),
+        ("batch -> dicts", lambda q: process_quiz_batch(q, paragraph_ids, "dicts"), fresh),
+        ("batch -> models", lambda q: process_quiz_batch(q, paragraph_ids, "models"), fresh),
+        ("batch -> columns", lambda q: process_quiz_batch(q, paragraph_ids, "columns"), fresh),
+        ("batch dicts in place", lambda q: process_quiz_batch(q, paragraph_ids, "dicts"), fresh_dicts),
+    ]
+    if pyarrow is not None:
+        rows.append(("batch -> arrow", lambda q: process_quiz_batch(q, paragraph_ids, "arrow"), fresh))
+    total = paragraphs * questions * (1 + alternatives)
+    print(f"\n{paragraphs} paragraphs, {total} questions with alternatives, {total * 4} answers")
+    print(f"{'path':<26}{'ms':>10}{'speedup':>10}")
+    baseline = None
+    for name, fn, setup in rows:
+        ms = timed(fn, setup, repeat)
+        baseline = baseline or ms
+        print(f"{name:<26}{ms:>10.1f}{baseline / ms:>9.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--questions", type=int, default=10, help="Questions per paragraph")
+    parser.add_argument("--alternatives", type=int, default=1, help="Alternative questions per question")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for paragraphs in args.paragraphs:
+        bench(paragraphs, args.questions, args.alternatives, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Per-call CPU overhead of structured outputs, without the network call.
+
+"sdk parse" is what `client.beta.chat.completions.parse(response_format=Model)` does around
+each request: build the strict JSON schema from the model, then validate the content and
+wrap it in a ParsedChatCompletion. "registry" is the path OpenAITextProcessor takes now:
+cached request parameter, then the cached TypeAdapter (app.client.response_formats).
+Completions are generated from the schemas by the fake LLM.
+
+Run from the repository root:
+    python benchmarks/response_formats.py --repeat 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openai import NOT_GIVEN  # noqa: E402
+from openai.lib._parsing._completions import parse_chat_completion, type_to_response_format_param  # noqa: E402
+from openai.types.chat import ChatCompletion  # noqa: E402
+
+from app.client.fake_llm import FakeOpenAI, LatencyModel  # noqa: E402
+from app.client.response_formats import _formats, response_format, warm  # noqa: E402
+
+
+def completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "bench",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content, "refusal": None}}],
+    })
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    warm()
+    fake = FakeOpenAI(LatencyModel(base=0, jitter=0), seed=args.seed)
+    rng = random.Random(args.seed)
+    messages = [{"role": "user", "content": '[{"path": "name", "text": "Course"}]'}]
+
+    print(f"{'response format':<24}{'bytes':>8}{'sdk parse us':>14}{'registry us':>13}{'speedup':>9}")
+    for model in list(_formats):
+        fmt = response_format(model)
+        content = fake.structured_content(rng, messages, fmt.param)
+        response = completion(content)
+
+        def sdk() -> object:
+            type_to_response_format_param(model)
+            return parse_chat_completion(response_format=model, input_tools=NOT_GIVEN,
+                                         chat_completion=response).choices[0].message.parsed
+
+        def registry() -> object:
+            return response_format(model).parse_completion(response)
+
+        before, after = timed(sdk, args.repeat), timed(registry, args.repeat)
+        print(f"{model.__name__:<24}{len(content):>8}{before:>14.1f}{after:>13.1f}{before / after:>8.1f}x")
+    print("Median microseconds per call.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Encode/decode time and bytes on the wire for translate_video payloads (List[QuizResults]).
+
+Compares the path FastAPI takes by default (pydantic dump to Python, then json.dumps; json.loads,
+then validation) with orjson, the precompiled serializers in app.utils.serialization and
+MessagePack, and the size and cost of gzip/brotli on top. MessagePack and brotli rows are
+skipped when the packages are not installed.
+
+Run from the repository root:
+    python benchmarks/serialization.py --items 10 100 500 --repeat 20
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+import orjson
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.models.processing_models import QuizResults  # noqa: E402
+from app.utils.serialization import BROTLI_QUALITY, GZIP_LEVEL, QUIZ_RESULTS, brotli, msgpack  # noqa: E402
+from load_test import PayloadFactory  # noqa: E402
+
+
+def payload(items: int, seed: int) -> List[QuizResults]:
+    args = argparse.Namespace(objectives=(1, 3), skills=(1, 4), questions=(3, 8))
+    factory = PayloadFactory(args, seed)
+    return [QuizResults.model_validate(factory.quiz_item()) for _ in range(items)]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def bench(items: int, repeat: int, seed: int) -> None:
+    value = payload(items, seed)
+    adapter = QUIZ_RESULTS.adapter
+    json_body = QUIZ_RESULTS.dump_json(value)
+
+    rows = [
+        ("fastapi default (json)",
+         lambda: json.dumps(adapter.dump_python(value, mode="json"), ensure_ascii=False, separators=(",", ":")).encode(),
+         lambda: adapter.validate_python(json.loads(json_body))),
+        ("orjson",
+         lambda: orjson.dumps(adapter.dump_python(value, mode="json")),
+         lambda: adapter.validate_python(orjson.loads(json_body))),
+        ("precompiled json",
+         lambda: QUIZ_RESULTS.dump_json(value),
+         lambda: QUIZ_RESULTS.load_json(json_body)),
+    ]
+    bodies = {"json": json_body}
+    if msgpack is not None:
+        msgpack_body = bodies["msgpack"] = QUIZ_RESULTS.dump_msgpack(value)
+        rows.append(("msgpack",
+                     lambda: QUIZ_RESULTS.dump_msgpack(value),
+                     lambda: QUIZ_RESULTS.load_msgpack(msgpack_body)))
+
+    print(f"\n{items} items, {len(json_body) / 1024:.0f} KiB of JSON")
+    print(f"{'format':<28}{'encode ms':>11}{'decode ms':>11}")
+    for name, encode, decode in rows:
+        print(f"{name:<28}{timed(encode, repeat):>11.2f}{timed(decode, repeat):>11.2f}")
+
+    print(f"{'wire':<28}{'bytes':>11}{'ratio':>8}{'compress ms':>13}")
+    for format_name, body in bodies.items():
+        print(f"{format_name:<28}{len(body):>11}{1.0:>8.2f}{'':>13}")
+        compressors = {"gzip": lambda b=body: gzip.compress(b, compresslevel=GZIP_LEVEL)}
+        if brotli is not None:
+            compressors["br"] = lambda b=body: brotli.compress(b, quality=BROTLI_QUALITY)
+        for encoding, compress in compressors.items():
+            size = len(compress())
+            print(f"{format_name + ' + ' + encoding:<28}{size:>11}{size / len(body):>8.2f}"
+                  f"{timed(compress, repeat):>13.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 500], help="Paragraphs per payload")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for items in args.items:
+        bench(items, args.repeat, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 import streamlit as st
 import pandas as pd
 import asyncio
-import re
+import logging
 from typing import List, Dict, Any
-import io
 from datetime import datetime
 from streamlit_tags import st_tags
-from docx import Document
 
 # Import your actual schemas and service
 from app.schema.video_schema import VideoRequestSchema, MetaDataSchema
 from app.models.llm_response_model import QuizResponse
 from app.service.course_service import generate_quiz
+from app.service.speculation import SPECULATIVE_PRECOMPUTE, get_speculator, paragraph_quizzes
 from app.contant_manager import question_generation_prompt
+from app.utils import priority
+from app.utils.cpu_tasks import docx_videos, excel_bytes, frame_payload, split_videos
+from app.utils.process_pool import run_sync
 
 def convert_quiz_to_dataframe(quiz_response: QuizResponse, video_number: str) -> pd.DataFrame:
     data = []
@@ -49,42 +51,19 @@ def convert_dataframe_to_quiz(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return quiz_data
 
 def create_excel_download(df: pd.DataFrame) -> bytes:
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Quiz_Data', index=False)
-        worksheet = writer.sheets['Quiz_Data']
-        for column in worksheet.columns:
-            max_length = 0
-            column_name = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            worksheet.column_dimensions[column_name].width = min(max_length + 2, 50)
-    return output.getvalue()
+    # Built in a worker process so other sessions keep running while a large sheet is written.
+    return run_sync(excel_bytes, frame_payload(df))
 
 def extract_videos_from_text(text: str) -> List[Dict[str, str]]:
-    pattern = r'(Video\s+\d+)'  # Matches "Video 1", "Video 2", etc.
-    splits = re.split(pattern, text)
-    videos = []
-    i = 1
-    while i < len(splits):
-        title = splits[i].strip()
-        content = splits[i + 1].strip() if i + 1 < len(splits) else ""
-        videos.append({"title": title, "content": content})
-        i += 2
-    return videos
-
-def read_docx_text(file) -> str:
-    doc = Document(file)
-    full_text = []
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    return '\n'.join(full_text)
+    return split_videos(text)
+
+async def generate_paragraph_quizzes(videos: List[Dict[str, str]], skills: List[MetaDataSchema],
+                                    objectives: List[MetaDataSchema], language: str):
+    return await asyncio.gather(*(paragraph_quizzes(video["content"], skills, objectives, language)
+                                  for video in videos))
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     st.set_page_config(page_title="Quiz Generator", page_icon="📝", layout="wide")
     st.title("📝 Quiz Generator")
     st.markdown("Generate quizzes from multi-video course documents, edit them, and download as Excel")
@@ -93,6 +72,10 @@ def main():
         st.session_state.quiz_data = None
     if 'edited_df' not in st.session_state:
         st.session_state.edited_df = None
+    if 'speculation' not in st.session_state:
+        st.session_state.speculation = None
+    if 'simplified' not in st.session_state:
+        st.session_state.simplified = None
 
     with st.sidebar:
         st.header("📋 Quiz Configuration")
@@ -102,10 +85,10 @@ def main():
         if uploaded_file:
             try:
                 if uploaded_file.name.endswith(".docx"):
-                    file_text = read_docx_text(uploaded_file)
+                    # Parsing and splitting happen in one worker call; only the sections come back.
+                    videos = run_sync(docx_videos, uploaded_file.getvalue())
                 else:
-                    file_text = uploaded_file.read().decode("utf-8")
-                videos = extract_videos_from_text(file_text)
+                    videos = extract_videos_from_text(uploaded_file.read().decode("utf-8"))
                 st.success(f"✅ Detected {len(videos)} video(s): {[video['title'] for video in videos]}")
             except Exception as e:
                 st.error(f"❌ Failed to read file: {e}")
@@ -139,6 +122,26 @@ def main():
             index=0
         )
 
+        speculative = st.checkbox(
+            "⚡ Precompute on upload",
+            value=SPECULATIVE_PRECOMPUTE,
+            help="Split and simplify each video in the background once skills and objectives are "
+                 "entered; quizzes are then generated per paragraph"
+        )
+        skills = [MetaDataSchema(name=s.strip()) for s in skills_input if s.strip()]
+        objectives = [MetaDataSchema(name=o.strip()) for o in objectives_input if o.strip()]
+        if speculative and videos:
+            # Cancels the previous run when the document, tags or language changed.
+            st.session_state.speculation = get_speculator().start(videos, skills, objectives, language,
+                                                                  st.session_state.speculation)
+            speculation = st.session_state.speculation
+            if speculation is not None:
+                st.caption(f"⚡ Precomputed {speculation.completed}/{len(speculation.videos)} video(s) "
+                           f"({speculation.status})")
+        elif st.session_state.speculation is not None:
+            st.session_state.speculation.cancel()
+            st.session_state.speculation = None
+
         generate_button = st.button("🔄 Generate Quiz", type="primary", use_container_width=True)
         if st.button("📜 Show Prompt", use_container_width=True):
             st.code(question_generation_prompt, language="python")
@@ -149,8 +152,6 @@ def main():
                 raise ValueError("No videos detected in uploaded file")
 
             all_dfs = []
-            skills = [MetaDataSchema(name=s.strip()) for s in skills_input if s.strip()]
-            objectives = [MetaDataSchema(name=o.strip()) for o in objectives_input if o.strip()]
 
             with st.spinner("🤖 Generating quizzes for all videos..."):
                 requests = [
@@ -162,7 +163,17 @@ def main():
                     )
                     for video in videos
                 ]
-                quiz_responses = asyncio.run(generate_quiz(requests))  # Batch processing
+                # The editor is waiting on these; they go ahead of bulk API work in the LLM scheduler.
+                with priority.scope(priority.INTERACTIVE):
+                    if speculative:
+                        # Paragraphs and simplifications come from the precomputation when it got to them.
+                        results = asyncio.run(generate_paragraph_quizzes(videos, skills, objectives, language))
+                        quiz_responses = [quiz for _, quiz in results]
+                        st.session_state.simplified = {video["title"]: simplified
+                                                       for video, (simplified, _) in zip(videos, results)}
+                    else:
+                        quiz_responses = asyncio.run(generate_quiz(requests))  # Batch processing
+                        st.session_state.simplified = None
 
                 for video, quiz_response in zip(videos, quiz_responses):
                     df = convert_quiz_to_dataframe(quiz_response, video["title"])
@@ -238,6 +249,14 @@ def main():
                 use_container_width=True
             )
 
+        if st.session_state.simplified:
+            with st.expander("📖 Simplified Paragraphs"):
+                for title, paragraphs in st.session_state.simplified.items():
+                    st.markdown(f"### {title}")
+                    for paragraph in paragraphs:
+                        st.markdown(paragraph.simplify1)
+                        st.markdown("---")
+
         with st.expander("👀 Preview Quiz Questions"):
             for _, row in edited_df.iterrows():
                 st.markdown(f"**[{row['Video']}] Question {int(row['Question_ID'])}:** {row['Question']}")
@@ -1,41 +1,368 @@
-from typing import List, Any, Coroutine
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, AsyncIterator, Coroutine, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, UploadFile
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 
+from app.client.provider import get_llm_client, get_router, get_scheduler, get_vectordb_client, http_pool_stats
 from app.models.llm_response_model import QuizResponse
-from app.models.processing_models import QuizResults
+from app.models.processing_models import QuizResults, StoredQuestion
 from app.models.translate_video_metadata import CourseWrapper
+from app.schema.translate_schema import MultiTranslateCourseRequest, MultiTranslateVideoRequest
 from app.schema.video_schema import VideoRequestSchema
-from app.service.course_service import generate_quiz, get_paragraph, simplify_paragraph_v1
-from app.service.translate_service import translate_video, translate_course_meta_data
+from app.service.artifact_store import get_artifact_store
+from app.service.course_service import generate_quiz, get_paragraph, simplify_and_quiz, simplify_paragraph_v1
+from app.service.semantic_cache import get_semantic_cache
+from app.service.skill_ingestion import IngestionReport, ingest_skills, parse_skills
+from app.service.translate_service import translate_video, translate_course_meta_data, translate_video_multi, \
+    iter_translate_video_multi, translate_course_meta_multi, iter_translate_course_meta_multi, translate_video_delta, \
+    iter_translate_video_stream
+from app.utils import priority
+from app.utils.admission import Overloaded, Work, course_work, estimate, get_admission, paragraphs_work, quiz_work, \
+    translation_work
+from app.utils.deadline import DeadlineMiddleware, RequestCancelled
+from app.utils.metrics import metrics
+from app.utils.ndjson import NDJSON_MEDIA_TYPE, DuplexStreamingResponse, iter_lines
+from app.utils.runtime import loop_lag, process_stats
+from app.utils.process_pool import run_cpu, shutdown as shutdown_process_pool
+from app.utils.serialization import COURSE, COURSE_BY_LANGUAGE, QUIZ_RESPONSE, QUIZ_RESULTS, \
+    QUIZ_RESULTS_BY_LANGUAGE, NegotiatedRoute, negotiated_response
+from app.utils.single_flight import AsyncSingleFlight, canonical_hash
+from app.utils.tracing import TracingMiddleware, find_trace, recent_traces
 
-app = FastAPI(root_path="/aicourseprocessing")
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    loop_lag.start()
+    # Build structured-output schemas and validators once, before the first LLM call needs them.
+    from app.client.response_formats import warm as warm_response_formats
+    await asyncio.to_thread(warm_response_formats)
+    yield
+    loop_lag.stop()
+    shutdown_process_pool()
+
+
+app = FastAPI(root_path="/aicourseprocessing", lifespan=lifespan, default_response_class=ORJSONResponse)
+# Request bodies may be msgpack and/or gzip/brotli compressed; see app.utils.serialization.
+app.router.route_class = NegotiatedRoute
+# Requests get a deadline (X-Request-Timeout or REQUEST_TIMEOUT_SECONDS) and are cancelled on disconnect.
+app.add_middleware(DeadlineMiddleware)
+# X-Priority: interactive|bulk selects the request's class in the LLM scheduler. It sits outside the
+# deadline middleware, which runs the handler in a task that inherits the class.
+app.add_middleware(priority.PriorityMiddleware)
+# Outermost, so the deadline handling and everything below it is inside the request's trace.
+app.add_middleware(TracingMiddleware)
+
+# Identical request bodies arriving while the first is still running share its result.
+request_flight = AsyncSingleFlight("endpoint")
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(_: Request, e: Overloaded) -> ORJSONResponse:
+    # Endpoints re-raise Overloaded past their catch-all 500 so it ends up here.
+    return ORJSONResponse({"detail": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+
+
+async def admitted_stream(work: Work, endpoint: str, body: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Admit a streaming response before it starts; its work counts as outstanding until the stream ends.
+    """
+    admission = get_admission()
+    cls = await admission.acquire(work, endpoint)
+    return admission.hold(work, cls, body)
 
 
 # List[QuizResults]
 
 @app.post("/process_video")
-async def process_video(process_video_request: VideoRequestSchema) -> QuizResponse:
+async def process_video(process_video_request: VideoRequestSchema, request: Request, reuse: bool = False,
+                        llm_client=Depends(get_llm_client)) -> QuizResponse:
+    """
+    With reuse=true a quiz already stored for identical content, prompt and model is returned
+    (requires ARTIFACT_STORE_PATH).
+    """
+    try:
+        quiz = await request_flight.do(
+            canonical_hash("process_video", reuse, process_video_request),
+            lambda: get_admission().run(quiz_work([process_video_request]), "process_video",
+                                        lambda: generate_quiz([process_video_request], llm_client=llm_client,
+                                                              reuse=reuse))
+        )
+        return await negotiated_response(request, QUIZ_RESPONSE, quiz[0])
+    except Overloaded:
+        raise
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/process_video/paragraphs")
+async def process_video_paragraphs(process_video_request: VideoRequestSchema, request: Request,
+                                   fused: Optional[bool] = None,
+                                   llm_client=Depends(get_llm_client)) -> List[QuizResults]:
+    """
+    Full pipeline: split the script into paragraphs, then simplify and quiz each one. With
+    fused=true (default FUSED_SIMPLIFY_QUIZ) each paragraph takes one call instead of two.
+    """
     try:
-        quiz = await generate_quiz(process_video_request)
-        return quiz
+        async def run() -> List[QuizResults]:
+            paragraphs = await get_paragraph(process_video_request, llm_client=llm_client)
+            return await simplify_and_quiz(paragraphs, llm_client=llm_client, fused=fused)
+
+        results = await request_flight.do(
+            canonical_hash("process_video_paragraphs", fused, process_video_request),
+            lambda: get_admission().run(paragraphs_work(process_video_request), "process_video_paragraphs", run)
+        )
+        return await negotiated_response(request, QUIZ_RESULTS, results)
+    except Overloaded:
+        raise
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/translate_video/{language}")
-async def translate_script(process_video_request: List[QuizResults], language: str) -> List[QuizResults]:
+async def translate_script(process_video_request: List[QuizResults], language: str, request: Request,
+                           delta: bool = False, namespace: str = "default",
+                           llm_client=Depends(get_llm_client)) -> List[QuizResults]:
+    """
+    With delta=true only fields whose source changed since the last run are sent to the model.
+    """
     try:
-        paragraph_list = await translate_video(process_video_request, language)
-        return paragraph_list
+        if delta:
+            paragraph_list = await request_flight.do(
+                canonical_hash("translate_video_delta", language, namespace, process_video_request),
+                lambda: get_admission().run(translation_work(process_video_request, [language]), "translate_video",
+                                            lambda: translate_video_delta(process_video_request, language,
+                                                                          llm_client=llm_client,
+                                                                          namespace=namespace))
+            )
+            return await negotiated_response(request, QUIZ_RESULTS, paragraph_list)
+        paragraph_list = await request_flight.do(
+            canonical_hash("translate_video", language, process_video_request),
+            lambda: get_admission().run(translation_work(process_video_request, [language]), "translate_video",
+                                        lambda: translate_video(process_video_request, language,
+                                                                llm_client=llm_client))
+        )
+        return await negotiated_response(request, QUIZ_RESULTS, paragraph_list)
+    except Overloaded:
+        raise
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/translate_video/{language}/stream", response_class=DuplexStreamingResponse)
+async def translate_script_stream(request: Request, language: str,
+                                  delta: bool = False, namespace: str = "default",
+                                  max_in_flight: int = Query(8, ge=1, le=64),
+                                  llm_client=Depends(get_llm_client)) -> DuplexStreamingResponse:
+    """
+    NDJSON in and out: one QuizResults per line, optionally gzip, deflate or brotli compressed
+    (Content-Encoding). Each line is validated and translated as it arrives, results come
+    back in input order, and at most `max_in_flight` items are held at once. An invalid line
+    or failed item ends the stream with an {"error": ...} line.
+
+    Clients should read the response while still uploading; one that only reads after
+    sending the whole body can stall once the output fills the socket buffers.
+    """
+    priority.prefer(priority.BULK)
+
+    async def items():
+        async for number, line in iter_lines(request.stream()):
+            try:
+                yield QuizResults.model_validate_json(line)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: {e}")
+
+    async def lines():
+        try:
+            async for item in iter_translate_video_stream(items(), language, llm_client=llm_client,
+                                                          max_in_flight=max_in_flight, delta=delta,
+                                                          namespace=namespace):
+                yield item.model_dump_json() + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    # The item count is unknown up front; admit what the stream can have in flight at once.
+    body = await admitted_stream(estimate(2 * max_in_flight, 0), "translate_video_stream", lines())
+    return DuplexStreamingResponse(body, media_type=NDJSON_MEDIA_TYPE)
+
+
 @app.post("/translate_course_meta/{language}")
-async def translate_course_meta(process_video_request: CourseWrapper, language: str) -> CourseWrapper:
+async def translate_course_meta(process_video_request: CourseWrapper, language: str, request: Request,
+                                llm_client=Depends(get_llm_client)) -> CourseWrapper:
     try:
-        paragraph_list = await translate_course_meta_data(process_video_request, language)
-        return paragraph_list
+        paragraph_list = await request_flight.do(
+            canonical_hash("translate_course_meta", language, process_video_request),
+            lambda: get_admission().run(course_work(process_video_request, [language]), "translate_course_meta",
+                                        lambda: translate_course_meta_data(process_video_request, language,
+                                                                           llm_client=llm_client))
+        )
+        return await negotiated_response(request, COURSE, paragraph_list)
+    except Overloaded:
+        raise
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/translate_video", response_model=None)
+async def translate_script_multi(request: MultiTranslateVideoRequest, http_request: Request, stream: bool = False,
+                                 llm_client=Depends(get_llm_client)
+                                 ) -> Dict[str, List[QuizResults]] | StreamingResponse:
+    """
+    Translate into several languages at once. With stream=true, NDJSON lines of
+    {"language", "items"} are sent as each language completes.
+    """
+    priority.prefer(priority.BULK)
+    if stream:
+        async def lines():
+            async for language, items in iter_translate_video_multi(request.items, request.languages,
+                                                                    llm_client=llm_client):
+                yield json.dumps({"language": language,
+                                  "items": [item.model_dump(mode="json") for item in items]}) + "\n"
+
+        body = await admitted_stream(translation_work(request.items, request.languages), "translate_video_multi",
+                                     lines())
+        return StreamingResponse(body, media_type="application/x-ndjson")
+    try:
+        results = await request_flight.do(
+            canonical_hash("translate_video_multi", request),
+            lambda: get_admission().run(translation_work(request.items, request.languages), "translate_video_multi",
+                                        lambda: translate_video_multi(request.items, request.languages,
+                                                                      llm_client=llm_client))
+        )
+        return await negotiated_response(http_request, QUIZ_RESULTS_BY_LANGUAGE, results)
+    except Overloaded:
+        raise
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/translate_course_meta", response_model=None)
+async def translate_course_meta_multi_languages(request: MultiTranslateCourseRequest, http_request: Request,
+                                                stream: bool = False,
+                                                llm_client=Depends(get_llm_client)
+                                                ) -> Dict[str, CourseWrapper] | StreamingResponse:
+    priority.prefer(priority.BULK)
+    if stream:
+        async def lines():
+            async for language, course in iter_translate_course_meta_multi(request.course, request.languages,
+                                                                           llm_client=llm_client):
+                yield json.dumps({"language": language, "course": course.model_dump(mode="json")}) + "\n"
+
+        body = await admitted_stream(course_work(request.course, request.languages), "translate_course_meta_multi",
+                                     lines())
+        return StreamingResponse(body, media_type="application/x-ndjson")
+    try:
+        results = await request_flight.do(
+            canonical_hash("translate_course_meta_multi", request),
+            lambda: get_admission().run(course_work(request.course, request.languages),
+                                        "translate_course_meta_multi",
+                                        lambda: translate_course_meta_multi(request.course, request.languages,
+                                                                            llm_client=llm_client))
+        )
+        return await negotiated_response(http_request, COURSE_BY_LANGUAGE, results)
+    except Overloaded:
+        raise
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/skills/ingest")
+async def ingest_skills_file(file: UploadFile, delete_missing: bool = True,
+                             llm_client=Depends(get_llm_client),
+                             vectordb_client=Depends(get_vectordb_client)) -> IngestionReport:
+    try:
+        skills = await run_cpu(parse_skills, await file.read(), file.filename or "")
+        return await asyncio.to_thread(ingest_skills, skills, llm_client=llm_client,
+                                       vectordb_client=vectordb_client, delete_missing=delete_missing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RequestCancelled as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/questions")
+async def get_questions(video_id: Optional[str] = None,
+                        skill: Optional[str] = None,
+                        objective: Optional[str] = None,
+                        level: Optional[str] = None,
+                        language: Optional[str] = None,
+                        post_assessment: Optional[bool] = None,
+                        latest: bool = True,
+                        limit: int = Query(100, ge=1, le=1000),
+                        offset: int = Query(0, ge=0),
+                        store=Depends(get_artifact_store)) -> List[StoredQuestion]:
+    """
+    Question bank from the artifact store; every given filter must match.
+    """
+    if store is None:
+        raise HTTPException(status_code=404, detail="The artifact store is not enabled; set ARTIFACT_STORE_PATH")
+    try:
+        return await asyncio.to_thread(store.questions, video=video_id, skill=skill, objective=objective,
+                                       level=level, language=language, post_assessment=post_assessment,
+                                       latest=latest, limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/metrics")
+async def get_metrics(router=Depends(get_router)) -> dict:
+    semantic_cache = get_semantic_cache()
+    return {
+        **metrics.snapshot(),
+        "requests_in_flight": request_flight.in_flight(),
+        "llm_routes": router.stats(),
+        "http_pools": http_pool_stats(),
+        "scheduler": get_scheduler().stats(),
+        "admission": get_admission().stats(),
+        "process": process_stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+    }
+
+
+@app.get("/traces")
+async def list_traces() -> List[dict]:
+    """
+    Recently finished traces; send X-Trace: 1 (or X-Profile: 1) with a request to trace it.
+    """
+    return [trace.summary() for trace in reversed(recent_traces())]
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str) -> dict:
+    """
+    The trace in Chrome trace format; save the response and open it in chrome://tracing or Perfetto.
+    """
+    trace = find_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_chrome()
+
+
+@app.get("/traces/{trace_id}/profile", response_class=PlainTextResponse)
+async def get_trace_profile(trace_id: str) -> str:
+    """
+    Folded stacks from the sampling profiler, for flamegraph.pl or speedscope.
+    """
+    trace = find_trace(trace_id)
+    if trace is None or trace.profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return trace.profile.folded()